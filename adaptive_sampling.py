@@ -0,0 +1,204 @@
+from statistics import NormalDist
+
+import numpy as np
+
+from feature_columns import AUDIO_FEATURE_COLUMNS
+
+
+def critical_value(confidence):
+    """Two-sided normal critical value, e.g. 1.96 for 0.95"""
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+class RunningMoments:
+    """Streaming mean/variance of several columns plus their covariance with one target
+
+    Batches are merged with Chan et al.'s parallel form of Welford's update,
+    so adding a round of tracks is a few vectorized operations and never
+    revisits earlier rows.
+    """
+
+    def __init__(self, columns):
+        self.n = 0
+        self.mean = np.zeros(columns)
+        self.m2 = np.zeros(columns)
+        self.target_mean = 0.0
+        self.target_m2 = 0.0
+        self.comoment = np.zeros(columns)
+
+    def add(self, x, y):
+        """x: (rows × columns) values, y: (rows,) target"""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        m = len(y)
+        if not m:
+            return
+        batch_mean = x.mean(axis=0)
+        batch_target_mean = y.mean()
+        dx = x - batch_mean
+        dy = y - batch_target_mean
+        batch_m2 = (dx * dx).sum(axis=0)
+        batch_target_m2 = (dy * dy).sum()
+        batch_comoment = dx.T @ dy
+
+        n = self.n + m
+        delta = batch_mean - self.mean
+        target_delta = batch_target_mean - self.target_mean
+        weight = self.n * m / n
+        self.m2 += batch_m2 + delta * delta * weight
+        self.target_m2 += batch_target_m2 + target_delta * target_delta * weight
+        self.comoment += batch_comoment + delta * target_delta * weight
+        self.mean += delta * m / n
+        self.target_mean += target_delta * m / n
+        self.n = n
+
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else np.full_like(self.m2, np.nan)
+
+    def target_variance(self):
+        return self.target_m2 / (self.n - 1) if self.n > 1 else np.nan
+
+    def correlation(self):
+        """Pearson r of every column with the target"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.comoment / np.sqrt(self.m2 * self.target_m2)
+
+
+class Stratum:
+    """Running estimates for one category"""
+
+    def __init__(self, name, columns):
+        self.name = name
+        self.moments = RunningMoments(len(columns))
+        self.seen = set()
+        self.playlists = 0
+        self.rounds = 0
+        self.exhausted = False
+
+    def add(self, track_ids, features, popularity):
+        """Add tracks not sampled in this stratum before; returns how many were new"""
+        keep = [i for i, track_id in enumerate(track_ids) if track_id not in self.seen]
+        self.seen.update(track_ids[i] for i in keep)
+        if keep:
+            self.moments.add(np.asarray(features)[keep], np.asarray(popularity)[keep])
+        return len(keep)
+
+    def popularity_interval(self, z):
+        """(mean, half-width) of mean popularity"""
+        moments = self.moments
+        if moments.n < 2:
+            return moments.target_mean, np.inf
+        return moments.target_mean, z * np.sqrt(moments.target_variance() / moments.n)
+
+    def correlation_intervals(self, z):
+        """(r, low, high) per feature via the Fisher z-transform"""
+        n = self.moments.n
+        r = self.moments.correlation()
+        if n <= 3:
+            return r, np.full_like(r, -1.0), np.full_like(r, 1.0)
+        center = np.arctanh(np.clip(r, -0.999999, 0.999999))
+        spread = z / np.sqrt(n - 3)
+        return r, np.tanh(center - spread), np.tanh(center + spread)
+
+
+class AdaptiveSampler:
+    """Stratified sampling that stops each category once its estimates are precise enough
+
+    Categories are collected in rounds of playlists_per_round playlists.
+    After each round every stratum's estimates are updated incrementally,
+    and a stratum stops once it has min_tracks tracks, its mean-popularity
+    interval is narrower than popularity_width and every feature's
+    popularity-correlation interval is narrower than correlation_width. It
+    also stops when its category runs out of playlists or reaches
+    max_playlists. Intervals treat tracks as independent draws, which
+    playlist-level sampling only approximates, so targets are best kept a
+    little tighter than the precision actually needed.
+    """
+
+    def __init__(self, popularity_width=6.0, correlation_width=0.3, confidence=0.95, min_tracks=50,
+                 playlists_per_round=2, max_playlists=50, columns=None):
+        self.popularity_width = popularity_width
+        self.correlation_width = correlation_width
+        self.confidence = confidence
+        self.z = critical_value(confidence)
+        self.min_tracks = min_tracks
+        self.playlists_per_round = playlists_per_round
+        self.max_playlists = max_playlists
+        self.columns = list(columns or AUDIO_FEATURE_COLUMNS)
+        self.strata = {}
+
+    def stratum(self, category):
+        if category not in self.strata:
+            self.strata[category] = Stratum(category, self.columns)
+        return self.strata[category]
+
+    def add(self, category, track_ids, features, popularity):
+        """Feed one round's tracks for a category (features: rows in self.columns order)"""
+        return self.stratum(category).add(track_ids, features, popularity)
+
+    def add_records(self, category, tracks, audio_features):
+        """Feed raw track and /audio-features objects; tracks without features are skipped"""
+        rows = [(track['id'], audio_features[track['id']], track.get('popularity')) for track in tracks
+                if audio_features.get(track['id']) and track.get('popularity') is not None]
+        rows = [(track_id, [features.get(column) for column in self.columns], popularity)
+                for track_id, features, popularity in rows
+                if all(features.get(column) is not None for column in self.columns)]
+        if not rows:
+            return 0
+        track_ids, features, popularity = zip(*rows)
+        return self.add(category, list(track_ids), features, popularity)
+
+    def converged(self, category):
+        stratum = self.stratum(category)
+        if stratum.moments.n < self.min_tracks:
+            return False
+        _, half_width = stratum.popularity_interval(self.z)
+        if 2 * half_width > self.popularity_width:
+            return False
+        _, low, high = stratum.correlation_intervals(self.z)
+        return bool(np.all(high - low <= self.correlation_width))
+
+    def finished(self, category):
+        stratum = self.stratum(category)
+        return stratum.exhausted or stratum.playlists >= self.max_playlists or self.converged(category)
+
+    def active(self):
+        """Categories that still need another round"""
+        return [category for category in self.strata if not self.finished(category)]
+
+    def next_round(self, category):
+        """How many playlists to request for this category now"""
+        stratum = self.stratum(category)
+        stratum.rounds += 1
+        return min(self.playlists_per_round, self.max_playlists - stratum.playlists)
+
+    def report(self):
+        report = {}
+        for category, stratum in self.strata.items():
+            mean, half_width = stratum.popularity_interval(self.z)
+            r, low, high = stratum.correlation_intervals(self.z)
+            report[category] = {
+                'tracks': stratum.moments.n,
+                'playlists': stratum.playlists,
+                'rounds': stratum.rounds,
+                'converged': self.converged(category),
+                'exhausted': stratum.exhausted,
+                'popularity_mean': float(mean),
+                'popularity_interval_width': float(2 * half_width),
+                'feature_means': dict(zip(self.columns, stratum.moments.mean.tolist())),
+                'popularity_correlations': {
+                    column: {'r': float(r[i]), 'low': float(low[i]), 'high': float(high[i])}
+                    for i, column in enumerate(self.columns)
+                },
+            }
+        return report
+
+    def print_report(self):
+        print(f"\n🎯 Adaptive Sampling ({self.confidence:.0%} intervals, targets: popularity ±{self.popularity_width / 2:g}, "
+              f"correlation width {self.correlation_width:g}):")
+        for category, stats in sorted(self.report().items()):
+            status = 'converged' if stats['converged'] else 'exhausted' if stats['exhausted'] else 'stopped at cap'
+            widest = max((c['high'] - c['low'] for c in stats['popularity_correlations'].values()), default=float('nan'))
+            print(f"   • {category}: {stats['tracks']:,} tracks from {stats['playlists']} playlists, "
+                  f"popularity {stats['popularity_mean']:.1f} ±{stats['popularity_interval_width'] / 2:.1f}, "
+                  f"widest r interval {widest:.2f} ({status})")
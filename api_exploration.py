@@ -1,53 +1,54 @@
-import os
-import requests
 import json
 from dotenv import load_dotenv
-import time
+from audio_analytics import describe_audio_features
+from batch_coalescer import BatchCoalescer, BatchRequestFailed
+from pagination import iter_categories, iter_playlist_tracks
+from spotify_client import get_shared_client
+from token_manager import TokenManager
 
 # Load environment variables
 load_dotenv()
 
 class SpotifyAPIExplorer:
-    def __init__(self):
-        self.client_id = os.getenv('SPOTIFY_CLIENT_ID')
-        self.client_secret = os.getenv('SPOTIFY_CLIENT_SECRET')
-        self.access_token = None
-        self.base_url = 'https://api.spotify.com/v1'
+    def __init__(self, http_client=None):
+        self.http = http_client or get_shared_client()
+        if self.http.token_manager is None:
+            self.http.token_manager = TokenManager(http_client=self.http)
+        self.tokens = self.http.token_manager
+        self.base_url = self.http.base_url
+        # Single-ID lookups are coalesced into /artists?ids= and /audio-features?ids= calls
+        self.batcher = BatchCoalescer(self.make_request)
+
+    def close(self):
+        """Stop the batch coalescer's threads"""
+        self.batcher.close()
+
+    def lookup(self, kind, item_id):
+        """One coalesced lookup; None if it failed or Spotify doesn't know the ID"""
+        try:
+            return self.batcher.get(kind, item_id)
+        except BatchRequestFailed as e:
+            print(f"❌ {str(e)}")
+            return None
         
     def get_access_token(self):
-        """Get access token for Spotify API"""
+        """Get access token for Spotify API (shared, cached on disk, refreshed before expiry)"""
         print("🔑 Getting access token...")
         
-        auth_url = 'https://accounts.spotify.com/api/token'
-        auth_headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-        auth_data = {
-            'grant_type': 'client_credentials',
-            'client_id': self.client_id,
-            'client_secret': self.client_secret
-        }
-        
-        response = requests.post(auth_url, headers=auth_headers, data=auth_data)
-        
-        if response.status_code == 200:
-            token_data = response.json()
-            self.access_token = token_data['access_token']
+        if self.tokens.get_token():
             print("✅ Access token obtained successfully!")
             return True
-        else:
-            print(f"❌ Failed to get access token: {response.status_code}")
-            return False
+        return False
     
     def make_request(self, endpoint):
         """Make a request to Spotify API with proper headers"""
-        if not self.access_token:
+        if not self.tokens.token:
             print("❌ No access token available")
             return None
-            
-        headers = {'Authorization': f'Bearer {self.access_token}'}
-        url = f"{self.base_url}{endpoint}"
         
         try:
-            response = requests.get(url, headers=headers)
+            # The client adds the Authorization header and replays once on a 401
+            response = self.http.get(endpoint)
             if response.status_code == 200:
                 return response.json()
             else:
@@ -107,7 +108,7 @@ class SpotifyAPIExplorer:
         
         # Get artist details
         print("\n1️⃣ Getting detailed artist information...")
-        artist_data = self.make_request(f"/artists/{self.taylor_swift_id}")
+        artist_data = self.lookup('artists', self.taylor_swift_id)
         
         if artist_data:
             print(f"   ✅ Artist: {artist_data['name']}")
@@ -145,24 +146,28 @@ class SpotifyAPIExplorer:
             print(f"   📝 Description: {playlist_data['description'][:100]}...")
             print(f"   👤 Owner: {playlist_data['owner']['display_name']}")
         
-        # Get playlist tracks (first few)
-        print("\n2️⃣ Getting playlist tracks (first 5)...")
-        tracks_data = self.make_request(f"/playlists/{playlist_id}/tracks?limit=5")
+        # Stream every track in the playlist, page by page
+        print("\n2️⃣ Streaming all playlist tracks (showing first 5)...")
+        tracks = iter_playlist_tracks(self.make_request, playlist_id)
+        
+        track_count = 0
+        for item in tracks:
+            if item and item.get('track'):  # Check if track data exists
+                track = item['track']
+                track_count += 1
+                if track_count > 5:
+                    continue
+                
+                artists = ', '.join([artist['name'] for artist in track.get('artists', [])])
+                track_name = track.get('name', 'Unknown Track')
+                popularity = track.get('popularity', 0)
+                album_name = track.get('album', {}).get('name', 'Unknown Album')
+                
+                print(f"   {track_count}. {track_name} by {artists}")
+                print(f"      ⭐ Popularity: {popularity}/100")
+                print(f"      💿 Album: {album_name}")
         
-        if tracks_data and 'items' in tracks_data:
-            print(f"   ✅ Found tracks:")
-            for i, item in enumerate(tracks_data['items'], 1):
-                if item and item.get('track'):  # Check if track data exists
-                    track = item['track']
-                    if track:  # Additional check for track data
-                        artists = ', '.join([artist['name'] for artist in track.get('artists', [])])
-                        track_name = track.get('name', 'Unknown Track')
-                        popularity = track.get('popularity', 0)
-                        album_name = track.get('album', {}).get('name', 'Unknown Album')
-                        
-                        print(f"   {i}. {track_name} by {artists}")
-                        print(f"      ⭐ Popularity: {popularity}/100")
-                        print(f"      💿 Album: {album_name}")
+        print(f"   ✅ Streamed {track_count} tracks across {tracks.pages} pages")
     
     def explore_audio_features_endpoint(self):
         """Test getting audio features for tracks - this is GOLD for your analysis!"""
@@ -182,7 +187,7 @@ class SpotifyAPIExplorer:
             
             # Get audio features
             print("\n2️⃣ Getting audio features...")
-            features_data = self.make_request(f"/audio-features/{track_id}")
+            features_data = self.lookup('audio_features', track_id)
             
             if features_data:
                 print("   ✅ Audio Features Analysis:")
@@ -196,14 +201,8 @@ class SpotifyAPIExplorer:
                 print(f"      ⏰ Duration: {features_data['duration_ms']/1000:.1f} seconds")
                 
                 print("\n   📊 What this means for your analysis:")
-                if features_data['danceability'] > 0.7:
-                    print("      - High danceability - good for party playlists")
-                if features_data['energy'] > 0.7:
-                    print("      - High energy - good for workout playlists")
-                if features_data['valence'] > 0.6:
-                    print("      - Positive mood - good for happy/upbeat playlists")
-                else:
-                    print("      - Lower valence - might be more emotional/sad")
+                for note in describe_audio_features(features_data):
+                    print(f"      - {note}")
     
     def explore_categories_endpoint(self):
         """Test getting available playlist categories"""
@@ -212,11 +211,11 @@ class SpotifyAPIExplorer:
         print("="*60)
         
         print("\n1️⃣ Getting available playlist categories...")
-        categories_data = self.make_request("/browse/categories?limit=20")
+        categories = list(iter_categories(self.make_request))
         
-        if categories_data and 'categories' in categories_data:
-            print(f"   ✅ Found {len(categories_data['categories']['items'])} categories:")
-            for i, category in enumerate(categories_data['categories']['items'], 1):
+        if categories:
+            print(f"   ✅ Found {len(categories)} categories:")
+            for i, category in enumerate(categories, 1):
                 print(f"   {i:2d}. {category['name']} (ID: {category['id']})")
             
             # Get playlists from a specific category (e.g., 'pop')
@@ -249,22 +248,29 @@ class SpotifyAPIExplorer:
         # Get access token first
         if not self.get_access_token():
             print("❌ Cannot proceed without access token")
+            self.close()
             return
         
         # Run all explorations
-        self.explore_search_endpoint()
-        time.sleep(1)  # Be nice to the API
-        
-        self.explore_artist_endpoint()
-        time.sleep(1)
-        
-        self.explore_playlist_endpoint()
-        time.sleep(1)
-        
-        self.explore_audio_features_endpoint()
-        time.sleep(1)
+        # Pacing and retries are handled by the client's adaptive rate limiter
+        try:
+            self.explore_search_endpoint()
+            
+            self.explore_artist_endpoint()
+            
+            self.explore_playlist_endpoint()
+            
+            self.explore_audio_features_endpoint()
+            
+            self.explore_categories_endpoint()
+        finally:
+            self.close()
         
-        self.explore_categories_endpoint()
+        self.http.metrics.print_stats()
+        self.http.print_connection_stats()
+        self.http.rate_limiter.print_stats()
+        if self.http.cache:
+            self.http.cache.print_stats()
         
         print("\n" + "="*60)
         print("🎉 EXPLORATION COMPLETE!")
@@ -0,0 +1,809 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from batch_coalescer import BATCH_ENDPOINTS, BatchCoalescer
+from pagination import iter_categories, with_query
+from spotify_client import get_shared_client
+from track_store import playlist_track_row
+
+# Stage order from create_data_collection_strategy; each stage feeds the next
+STAGES = ['categories', 'playlists', 'tracks', 'artists', 'audio_features']
+# Playlist pages between checkpoints - each one flushes the store, i.e. writes a file per partition
+CHECKPOINT_PAGES = 50
+# Optional collaborators that can't be combined, and why
+INCOMPATIBLE_OPTIONS = [
+    ('normalizer', 'corpus', "With a normalizer, entities already go to the store as Arrow tables - don't also pass a corpus"),
+    ('sampler', 'normalizer', "Adaptive sampling reads popularity and features from results - don't combine it with a normalizer"),
+    ('sampler', 'corpus', "Adaptive sampling reads popularity and features from results - don't combine it with a corpus"),
+    ('sampler', 'work_queue', "Adaptive sampling decides which playlists to crawl itself - don't combine it with a work queue"),
+    # Playlists done in an earlier run would be skipped and feed nothing to the fresh strata
+    ('sampler', 'state', "Adaptive sampling starts its estimates from zero each run - don't combine it with a crawl state"),
+]
+
+
+def check_options(**options):
+    """Raise ValueError for a combination of collector options that doesn't work together"""
+    if options.get('state') is not None and options.get('store') is None:
+        raise ValueError("Resumable crawls need a store to persist what was collected")
+    for first, second, reason in INCOMPATIBLE_OPTIONS:
+        if options.get(first) is not None and options.get(second) is not None:
+            raise ValueError(reason)
+
+
+class ResultsSink:
+    """Keeps collected entities as raw JSON dicts in AsyncCollector.results"""
+
+    def __init__(self, results):
+        self.results = results
+
+    def add_playlist(self, playlist_id, playlist, category_id):
+        playlist['category_id'] = category_id
+        self.results['playlists'][playlist_id] = playlist
+
+    def add_playlist_track(self, playlist_id, position, track):
+        self.results['playlist_tracks'].append((playlist_id, track['id'], position))
+
+    def add_track(self, track):
+        self.results['tracks'][track['id']] = track
+
+    def add_lookup(self, stage, item_id, result):
+        self.results[stage][item_id] = result
+
+
+class CorpusSink:
+    """Keeps collected entities in compact form in an EntityCorpus"""
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+
+    def add_playlist(self, playlist_id, playlist, category_id):
+        self.corpus.add_playlist(playlist, category_id)
+
+    def add_playlist_track(self, playlist_id, position, track):
+        self.corpus.add_playlist_track(playlist_id, position, track)
+
+    def add_track(self, track):
+        # The corpus takes tracks with their playlist membership
+        pass
+
+    def add_lookup(self, stage, item_id, result):
+        if stage == 'artists':
+            self.corpus.add_artist(result)
+        else:
+            self.corpus.add_audio_features(result)
+
+
+class LocalDispatch:
+    """Sends discovered categories and playlists to this collector's own stage queues"""
+
+    def __init__(self, queues):
+        self.queues = queues
+
+    async def add_category(self, category_id):
+        await self.queues['categories'].put(category_id)
+
+    async def add_playlists(self, category_id, playlist_ids):
+        for playlist_id in playlist_ids:
+            await self.queues['playlists'].put((category_id, playlist_id))
+
+
+class WorkQueueDispatch:
+    """Sends them to a crawl_coordinator.WorkQueue shared with other workers"""
+
+    def __init__(self, work_queue):
+        self.work_queue = work_queue
+
+    async def add_category(self, category_id):
+        # Every worker seeds the same categories; the queue keeps one task each
+        self.work_queue.add('categories', [category_id])
+
+    async def add_playlists(self, category_id, playlist_ids):
+        # The queue hands each playlist to a single worker
+        self.work_queue.add('playlists', playlist_ids, category_id)
+
+
+class SamplerDispatch(LocalDispatch):
+    """Registers categories with an AdaptiveSampler, whose rounds request their playlists"""
+
+    def __init__(self, queues, sampler):
+        super().__init__(queues)
+        self.sampler = sampler
+
+    async def add_category(self, category_id):
+        self.sampler.stratum(category_id)
+
+
+class AsyncCollector:
+    """Concurrent category → playlist → track → artist → audio-feature crawl
+
+    Every stage has its own bounded queue and worker set, so tracks for
+    playlist N are fetched while audio features for playlist N-1 are still
+    in flight. A global semaphore caps in-flight requests, including the
+    batch coalescer's; the requests themselves go through the shared
+    client, so the adaptive rate limiter holds slots while throttled and
+    full queues push back on upstream stages. Artist and audio-feature
+    lookups are coalesced into multi-ID requests.
+
+    With a NormalizerPool, playlist pages and multi-ID responses are handed
+    over as raw bytes and decoded/flattened on worker processes; their rows
+    go straight to the store as Arrow tables, and results only keeps IDs
+    (results['tracks'] maps each track ID to its category; found artists
+    and audio features map to True). With an EntityCorpus, playlists, tracks,
+    artists and audio features are kept there in compact form instead of
+    as raw JSON dicts in results. With an AdaptiveSampler, categories are
+    crawled a few playlists per round and each one stops once its
+    popularity and audio-feature estimates have converged.
+    """
+
+    def __init__(self, http_client=None, concurrency=8,
+                 workers_per_stage=4, queue_size=200, playlists_per_category=20,
+                 tracks_page_size=100, store=None, state=None, normalizer=None, corpus=None,
+                 seen_index=None, aggregates=None, work_queue=None, scheduler=None, sampler=None,
+                 checkpoint_pages=CHECKPOINT_PAGES, aggregate_interval=30):
+        # Authorization (and 401 refresh) comes from the client's token manager
+        self.http = http_client or get_shared_client()
+        self.concurrency = concurrency
+        self.workers_per_stage = workers_per_stage
+        self.queue_size = queue_size
+        self.playlists_per_category = playlists_per_category
+        self.tracks_page_size = tracks_page_size
+        check_options(store=store, state=state, normalizer=normalizer, corpus=corpus,
+                      work_queue=work_queue, sampler=sampler)
+        # Optional ColumnarStore - rows are appended as each stage produces them
+        self.store = store
+        self.entity_categories = {}
+        # Optional CrawlState - checkpoints progress so an interrupted crawl resumes
+        self.state = state
+        self.checkpoint_pages = checkpoint_pages
+        self.pending_checkpoints = []
+        self.normalizer = normalizer
+        # Optional EntityCorpus - keeps compact entities instead of raw JSON dicts in results
+        self.corpus = corpus
+        # Optional SeenIndex - entities fetched recently (this run or an earlier one) are skipped
+        self.seen_index = seen_index
+        # Optional DashboardAggregates over a RelationalStore store - refreshed every
+        # aggregate_interval seconds while playlists land, and once more at the end
+        self.aggregates = aggregates
+        self.aggregate_interval = aggregate_interval
+        # Optional crawl_coordinator.WorkQueue - categories and playlists are claimed from it, shared with other workers
+        self.work_queue = work_queue
+        # Optional RequestScheduler wrapping http.get - orders requests by COLLECTION_PLAN priority
+        self.scheduler = scheduler
+        # Optional adaptive_sampling.AdaptiveSampler - needs full track and audio-feature dicts in results
+        self.sampler = sampler
+        self.enrichment_pending = {'artists': [], 'audio_features': []}
+        self.enrichment_tasks = []
+
+        self.results = {
+            'categories': {},
+            'playlists': {},
+            'playlist_tracks': [],
+            'tracks': {},
+            'artists': {},
+            'audio_features': {},
+        }
+        self.sink = CorpusSink(corpus) if corpus is not None else ResultsSink(self.results)
+        # Popularity/followers of every entity seen this run, fresh or not - {kind: {id: {metric: value}}}.
+        # Tracks of playlists skipped as unchanged aren't seen, so they get no entry
+        self.snapshots = {'artists': {}, 'tracks': {}, 'playlists': {}}
+        self.stats = {stage: 0 for stage in STAGES}
+        self.stats['requests'] = 0
+        self.stats['errors'] = 0
+        # Lookups Spotify answered with null - unknown IDs, not failures
+        self.stats['not_found'] = 0
+        self.stats['unchanged_playlists'] = 0
+        self.stats['fresh_skipped'] = 0
+        # Stats are bumped from the event loop and from request/coalescer threads
+        self.stats_lock = threading.Lock()
+        # Shared by every request path - the loop's executor and the coalescer's threads
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.seen_playlists = set()
+        self.seen_tracks = set()
+        self.seen_artists = set()
+        self.seen_albums = set()
+        self.lookups = []
+
+    def count(self, **deltas):
+        with self.stats_lock:
+            for name, delta in deltas.items():
+                self.stats[name] += delta
+
+    def fetch_raw_sync(self, endpoint):
+        """Blocking fetch returning the undecoded response body (None on failure)"""
+        with self.slots:
+            if self.scheduler:
+                response = self.scheduler.get(endpoint)
+                if response is None:
+                    # Shed: over the stage's budget or past the deadline
+                    return None
+            else:
+                response = self.http.get(endpoint)
+        if response.status_code != 200:
+            self.count(requests=1, errors=1)
+            return None
+        self.count(requests=1)
+        return response.content
+
+    def fetch_sync(self, endpoint):
+        """Blocking fetch used by the batch coalescer's own threads"""
+        content = self.fetch_raw_sync(endpoint)
+        return None if content is None else json.loads(content)
+
+    async def fetch(self, endpoint, raw=False):
+        """Fetch one endpoint on the request thread pool, bounded by the shared request slots"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.fetch_raw_sync if raw else self.fetch_sync, endpoint)
+
+    async def collect_categories(self, category_limit):
+        # Category listings are paged; stream them on a worker thread
+        loop = asyncio.get_running_loop()
+        categories = await loop.run_in_executor(
+            self.executor, lambda: list(iter_categories(self.fetch_sync, limit=category_limit))
+        )
+        for category in categories:
+            self.results['categories'][category['id']] = category
+            self.count(categories=1)
+            # Already enumerated by an interrupted run - its playlists are checkpointed
+            if self.state and self.state.is_done('categories', category['id']):
+                continue
+            await self.dispatch.add_category(category['id'])
+
+    async def handle_category(self, category_id):
+        data = await self.fetch(f"/browse/categories/{category_id}/playlists?limit={self.playlists_per_category}")
+        if not data or 'playlists' not in data:
+            return False
+        # Spotify returns null entries for removed playlists
+        playlist_ids = [playlist['id'] for playlist in data['playlists']['items'] if playlist]
+        if self.state:
+            for playlist_id in playlist_ids:
+                self.state.add_pending('playlists', playlist_id, category_id)
+        await self.dispatch.add_playlists(category_id, playlist_ids)
+        if self.state:
+            self.state.mark_done('categories', category_id)
+        return True
+
+    async def handle_playlist(self, item):
+        """Crawl one playlist; False if it was left unfinished"""
+        category_id, playlist_id = item
+        if playlist_id in self.seen_playlists:
+            return True
+        self.seen_playlists.add(playlist_id)
+        finished = False
+        try:
+            finished = await self.crawl_playlist(category_id, playlist_id)
+        finally:
+            if not finished:
+                # Not seen after all - a retry (e.g. a released work-queue task) must crawl it again
+                self.seen_playlists.discard(playlist_id)
+        return finished
+
+    async def crawl_playlist(self, category_id, playlist_id):
+        if self.state and self.state.is_done('playlists', playlist_id):
+            return True
+
+        playlist = await self.fetch(f"/playlists/{playlist_id}?fields=id,name,description,followers,owner,snapshot_id,tracks.total")
+        if not playlist:
+            return False
+        self.snapshots['playlists'][playlist_id] = {'followers': (playlist.get('followers') or {}).get('total')}
+        snapshot_id = playlist.get('snapshot_id')
+        if self.state and snapshot_id and not self.state.playlist_changed(playlist_id, snapshot_id):
+            # Same version as last crawl - nothing new to collect
+            self.state.mark_done('playlists', playlist_id, category_id)
+            self.count(unchanged_playlists=1)
+            return True
+
+        self.sink.add_playlist(playlist_id, playlist, category_id)
+        self.count(playlists=1)
+
+        offset = self.state.get_offset('playlists', playlist_id) if self.state else 0
+        if self.store and offset == 0:
+            self.store.append('playlists', playlist, category_id)
+
+        endpoint = with_query(f"/playlists/{playlist_id}/tracks", limit=self.tracks_page_size, offset=offset)
+        while endpoint:
+            if self.normalizer:
+                page = await self.normalized_page(category_id, playlist_id, endpoint)
+            else:
+                page = await self.page(category_id, playlist_id, endpoint, offset)
+            if page is None:
+                # Left unfinished - the next run resumes from the saved offset
+                return False
+
+            offset = (page['offset'] if page['offset'] is not None else offset) + page['items']
+            endpoint = page['next']
+            if self.state:
+                self.checkpoint('offset', playlist_id, offset, category_id)
+
+        if self.state:
+            self.checkpoint('done', playlist_id, snapshot_id, category_id)
+        return True
+
+    def checkpoint(self, kind, playlist_id, value, category_id):
+        """Queue a playlist checkpoint; they're saved in groups, once the rows they cover are flushed"""
+        self.pending_checkpoints.append((kind, playlist_id, value, category_id))
+        if len(self.pending_checkpoints) >= self.checkpoint_pages:
+            self.commit_checkpoints()
+
+    def commit_checkpoints(self):
+        """Make buffered rows durable, then save the checkpoints that claim them"""
+        if not self.pending_checkpoints:
+            return
+        self.store.flush()
+        for kind, playlist_id, value, category_id in self.pending_checkpoints:
+            if kind == 'offset':
+                self.state.save_offset('playlists', playlist_id, value, category_id)
+            else:
+                self.state.record_snapshot(playlist_id, value, category_id)
+                self.state.mark_done('playlists', playlist_id, category_id)
+        self.pending_checkpoints = []
+
+    def fresh(self, kind, item_id):
+        """True if the seen-ID index says this entity was fetched recently enough to skip"""
+        if self.seen_index and self.seen_index.is_fresh(kind, item_id):
+            self.count(fresh_skipped=1)
+            return True
+        return False
+
+    def mark_seen(self, kind, item_ids):
+        if self.seen_index:
+            self.seen_index.mark(kind, item_ids)
+
+    def new_track(self, category_id, track_id):
+        """Record a first sighting; False if the track was already collected"""
+        if track_id in self.seen_tracks:
+            return False
+        self.seen_tracks.add(track_id)
+        self.count(tracks=1)
+        # Tracks (and their features/artists) are filed under the first category they appear in
+        self.entity_categories[track_id] = category_id
+        return True
+
+    async def page(self, category_id, playlist_id, endpoint, offset):
+        """Fetch and process one page of playlist tracks in this process"""
+        page = await self.fetch(endpoint)
+        if not page:
+            return None
+        stored = []
+        for position, entry in enumerate(page['items'], page.get('offset', offset)):
+            track = entry.get('track') if entry else None
+            if not track or not track.get('id'):
+                continue
+            self.snapshots['tracks'][track['id']] = {'popularity': track.get('popularity')}
+            self.sink.add_playlist_track(playlist_id, position, track)
+            if self.store:
+                self.store.append_row('playlist_tracks', playlist_track_row(playlist_id, position, entry), category_id)
+            if not self.new_track(category_id, track['id']):
+                continue
+            self.sink.add_track(track)
+            # Stored by an earlier crawl - still fanned out, handle_track checks its features/artists
+            if self.store and not self.fresh('tracks', track['id']):
+                self.store.append('tracks', track, category_id)
+                stored.append(track['id'])
+                album = track.get('album')
+                if album and album.get('id') and album['id'] not in self.seen_albums:
+                    self.seen_albums.add(album['id'])
+                    self.store.append('albums', album, category_id)
+            await self.queues['tracks'].put((category_id, track))
+        self.mark_seen('tracks', stored)
+        return {'offset': page.get('offset', offset), 'next': page.get('next'), 'items': len(page['items'])}
+
+    async def normalized_page(self, category_id, playlist_id, endpoint):
+        """Fetch one page as raw bytes and have the normalizer pool flatten it"""
+        content = await self.fetch(endpoint, raw=True)
+        if content is None:
+            return None
+        tables, page = await self.normalizer.normalize('playlist_tracks', content, {'playlist_id': playlist_id})
+
+        membership = tables.get('playlist_tracks')
+        if membership is not None:
+            self.results['playlist_tracks'].extend(zip(
+                membership.column('playlist_id').to_pylist(),
+                membership.column('track_id').to_pylist(),
+                membership.column('position').to_pylist(),
+            ))
+            if self.store:
+                self.store.append_table('playlist_tracks', membership, category_id)
+
+        tracks = tables.get('tracks')
+        if tracks is None:
+            return page
+        new_rows = []
+        track_ids = tracks.column('track_id').to_pylist()
+        for track_id, popularity in zip(track_ids, tracks.column('popularity').to_pylist()):
+            self.snapshots['tracks'][track_id] = {'popularity': popularity}
+        artist_ids = tracks.column('artist_ids').to_pylist()
+        for row, (track_id, artists) in enumerate(zip(track_ids, artist_ids)):
+            if not self.new_track(category_id, track_id):
+                continue
+            if not self.fresh('tracks', track_id):
+                new_rows.append(row)
+            self.results['tracks'][track_id] = category_id
+            # handle_track only needs the IDs to fan out
+            await self.queues['tracks'].put((category_id, {'id': track_id, 'artists': [{'id': a} for a in artists or []]}))
+
+        if self.store and new_rows:
+            self.store.append_table('tracks', tracks.take(new_rows), category_id)
+            self.mark_seen('tracks', tracks.column('track_id').take(new_rows).to_pylist())
+            albums = tables.get('albums')
+            if albums is not None:
+                fresh = []
+                for row, album_id in enumerate(albums.column('album_id').to_pylist()):
+                    if album_id not in self.seen_albums:
+                        self.seen_albums.add(album_id)
+                        fresh.append(row)
+                if fresh:
+                    self.store.append_table('albums', albums.take(fresh), category_id)
+        return page
+
+    async def handle_track(self, item):
+        # Fan a newly seen track out to the enrichment stages
+        category_id, track = item
+        if not self.fresh('audio_features', track['id']):
+            await self.queues['audio_features'].put(track['id'])
+        for artist in track.get('artists', []):
+            if artist.get('id') and artist['id'] not in self.seen_artists:
+                self.seen_artists.add(artist['id'])
+                if self.fresh('artists', artist['id']):
+                    continue
+                self.entity_categories[artist['id']] = category_id
+                await self.queues['artists'].put(artist['id'])
+
+    def find_missing_enrichment(self):
+        """Tracks/artists in the store whose audio features or details were never saved"""
+        tracks = self.store.load('tracks', columns=['track_id', 'artist_ids', 'category'])
+        have_features = set(self.store.load('audio_features', columns=['track_id']).column('track_id').to_pylist())
+        have_artists = set(self.store.load('artists', columns=['artist_id']).column('artist_id').to_pylist())
+
+        missing = []
+        for row in tracks.to_pylist():
+            if row['track_id'] not in have_features:
+                missing.append(('audio_features', row['track_id'], row['category']))
+                have_features.add(row['track_id'])
+            for artist_id in row['artist_ids'] or []:
+                if artist_id not in have_artists:
+                    missing.append(('artists', artist_id, row['category']))
+                    have_artists.add(artist_id)
+        return missing
+
+    async def resume(self):
+        """Re-queue whatever an interrupted run left unfinished"""
+        # With a work queue every worker sees the shared state's leftovers; the queue hands each one to a single worker
+        leftovers = {}
+        for playlist_id, category_id, _ in self.state.pending('playlists'):
+            leftovers.setdefault(category_id, []).append(playlist_id)
+        for category_id, playlist_ids in leftovers.items():
+            await self.dispatch.add_playlists(category_id, playlist_ids)
+
+        loop = asyncio.get_running_loop()
+        missing = await loop.run_in_executor(self.executor, self.find_missing_enrichment)
+        for stage, item_id, category_id in missing:
+            self.entity_categories[item_id] = category_id
+            if stage == 'artists':
+                self.seen_artists.add(item_id)
+            await self.queues[stage].put(item_id)
+
+    async def handle_artist(self, artist_id):
+        if self.normalizer:
+            self.queue_enrichment('artists', artist_id)
+            return
+        # Don't await here - awaiting would cap each batch at workers_per_stage IDs
+        self.lookups.append(('artists', artist_id, asyncio.wrap_future(self.batcher.submit('artists', artist_id))))
+
+    async def handle_audio_features(self, track_id):
+        if self.normalizer:
+            self.queue_enrichment('audio_features', track_id)
+            return
+        self.lookups.append(('audio_features', track_id, asyncio.wrap_future(self.batcher.submit('audio_features', track_id))))
+
+    def queue_enrichment(self, stage, item_id):
+        """Normalizer mode: collect IDs into full multi-ID requests"""
+        pending = self.enrichment_pending[stage]
+        pending.append(item_id)
+        if len(pending) >= BATCH_ENDPOINTS[stage][2]:
+            self.dispatch_enrichment(stage)
+
+    def dispatch_enrichment(self, stage):
+        ids = self.enrichment_pending[stage]
+        if ids:
+            self.enrichment_pending[stage] = []
+            self.enrichment_tasks.append(asyncio.ensure_future(self.normalized_lookup(stage, ids)))
+
+    async def normalized_lookup(self, stage, ids):
+        path, _, _ = BATCH_ENDPOINTS[stage]
+        content = await self.fetch(f"{path}?ids={','.join(ids)}", raw=True)
+        if content is None:
+            self.count(errors=len(ids))
+            return
+        tables, _ = await self.normalizer.normalize(stage, content)
+        table = tables.get(stage)
+        found = table.num_rows if table is not None else 0
+        self.count(**{stage: found, 'not_found': len(ids) - found})
+        if not found:
+            return
+        id_column = 'artist_id' if stage == 'artists' else 'track_id'
+        if stage == 'artists':
+            for artist_id, popularity, followers in zip(*(table.column(c).to_pylist() for c in (id_column, 'popularity', 'followers'))):
+                self.snapshots['artists'][artist_id] = {'popularity': popularity, 'followers': followers}
+        for item_id in table.column(id_column).to_pylist():
+            self.results[stage][item_id] = True
+        self.mark_seen(stage, table.column(id_column).to_pylist())
+        if self.store:
+            # A batch mixes IDs from several categories - split it per partition
+            rows_by_category = {}
+            for row, item_id in enumerate(table.column(id_column).to_pylist()):
+                rows_by_category.setdefault(self.entity_categories.get(item_id, 'uncategorized'), []).append(row)
+            for category_id, rows in rows_by_category.items():
+                self.store.append_table(stage, table.take(rows), category_id)
+
+    async def gather_lookups(self):
+        """Flush the coalescer and store every batched artist/audio-feature result"""
+        if self.normalizer:
+            for stage in self.enrichment_pending:
+                self.dispatch_enrichment(stage)
+            await asyncio.gather(*self.enrichment_tasks)
+            self.enrichment_tasks = []
+        self.batcher.flush()
+        results = await asyncio.gather(*(future for _, _, future in self.lookups), return_exceptions=True)
+        fetched = {'artists': [], 'audio_features': []}
+        for (stage, item_id, _), result in zip(self.lookups, results):
+            if isinstance(result, Exception):
+                # The batch request failed - the ID may well exist
+                self.count(errors=1)
+                continue
+            if result is None:
+                self.count(not_found=1)
+                continue
+            self.sink.add_lookup(stage, item_id, result)
+            if stage == 'artists':
+                self.snapshots['artists'][item_id] = {'popularity': result.get('popularity'),
+                                                      'followers': (result.get('followers') or {}).get('total')}
+            self.count(**{stage: 1})
+            fetched[stage].append(item_id)
+            if self.store:
+                self.store.append(stage, result, self.entity_categories.get(item_id, 'uncategorized'))
+        self.lookups = []
+        for stage, item_ids in fetched.items():
+            self.mark_seen(stage, item_ids)
+        if self.store:
+            self.store.flush()
+
+    async def run_task(self, kind, key, parent):
+        """Work-queue mode: run one claimed task, then complete it or hand it back"""
+        try:
+            if kind == 'categories':
+                finished = await self.handle_category(key)
+            else:
+                finished = await self.handle_playlist((parent, key))
+        except Exception as e:
+            finished = False
+            print(f"❌ {kind} task {key} failed: {str(e)}")
+        if self.state:
+            # Rows must be durable before another worker can treat the task as done
+            self.commit_checkpoints()
+        loop = asyncio.get_running_loop()
+        settle = self.work_queue.complete if finished else self.work_queue.release
+        await loop.run_in_executor(self.executor, settle, kind, key)
+
+    async def pull_work(self, poll_interval=1.0):
+        """Work-queue mode: claim tasks until no worker has anything left to do"""
+        loop = asyncio.get_running_loop()
+        running = {}
+        renewed = time.monotonic()
+        while True:
+            free = self.workers_per_stage * 2 - len(running)
+            claimed = []
+            if free > 0:
+                claimed = await loop.run_in_executor(self.executor, self.work_queue.claim, free, ['categories', 'playlists'])
+            for kind, key, parent in claimed:
+                running[(kind, key)] = asyncio.ensure_future(self.run_task(kind, key, parent))
+
+            if running and time.monotonic() - renewed > self.work_queue.lease_seconds / 3:
+                await loop.run_in_executor(self.executor, self.work_queue.renew, list(running))
+                renewed = time.monotonic()
+
+            if not claimed:
+                if running:
+                    await asyncio.wait(running.values(), timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED)
+                elif await loop.run_in_executor(self.executor, self.work_queue.remaining):
+                    # Others still hold leases - their tasks may add playlists or come back on expiry
+                    await asyncio.sleep(poll_interval)
+                else:
+                    return
+            for task in [task for task, future in running.items() if future.done()]:
+                del running[task]
+
+    async def sample_category(self, category_id):
+        """Sampling mode: queue this category's next round of playlists"""
+        stratum = self.sampler.stratum(category_id)
+        limit = self.sampler.next_round(category_id)
+        data = await self.fetch(with_query(f"/browse/categories/{category_id}/playlists", limit=limit, offset=stratum.playlists))
+        if not data or 'playlists' not in data:
+            # Don't keep retrying a category that fails - report what it has
+            stratum.exhausted = True
+            return
+        page = data['playlists']
+        stratum.playlists += len(page['items'])
+        if not page['items'] or not page.get('next'):
+            stratum.exhausted = True
+        for playlist in page['items']:
+            if playlist:
+                await self.queues['playlists'].put((category_id, playlist['id']))
+
+    def update_sampler(self, start):
+        """Feed the tracks collected since results['playlist_tracks'][start] into their strata"""
+        by_category = {}
+        for playlist_id, track_id, _ in self.results['playlist_tracks'][start:]:
+            playlist = self.results['playlists'].get(playlist_id)
+            track = self.results['tracks'].get(track_id)
+            if playlist and track:
+                by_category.setdefault(playlist['category_id'], []).append(track)
+        for category_id, tracks in by_category.items():
+            self.sampler.add_records(category_id, tracks, self.results['audio_features'])
+
+    async def sample_rounds(self):
+        """Sampling mode: crawl active categories round by round until every one has stopped"""
+        while True:
+            active = self.sampler.active()
+            if not active:
+                return
+            start = len(self.results['playlist_tracks'])
+            await asyncio.gather(*(self.sample_category(category_id) for category_id in active))
+            for stage in STAGES:
+                await self.queues[stage].join()
+            # Estimates need this round's audio features
+            await self.gather_lookups()
+            self.update_sampler(start)
+
+    async def refresh_aggregates(self):
+        """Keep the dashboard aggregates current while the crawl runs"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.aggregate_interval)
+            try:
+                await loop.run_in_executor(self.executor, self.aggregates.refresh)
+            except Exception as e:
+                print(f"❌ Aggregate refresh failed: {str(e)}")
+
+    async def worker(self, stage, handler):
+        queue = self.queues[stage]
+        while True:
+            item = await queue.get()
+            try:
+                await handler(item)
+            except Exception as e:
+                self.count(errors=1)
+                print(f"❌ {stage} worker failed: {str(e)}")
+            finally:
+                queue.task_done()
+
+    async def run_async(self, category_limit=20):
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        self.queues = {stage: asyncio.Queue(maxsize=self.queue_size) for stage in STAGES}
+        self.batcher = BatchCoalescer(self.fetch_sync)
+        if self.sampler:
+            # Sampling rounds request each category's playlists a few at a time
+            self.dispatch = SamplerDispatch(self.queues, self.sampler)
+        elif self.work_queue:
+            self.dispatch = WorkQueueDispatch(self.work_queue)
+        else:
+            self.dispatch = LocalDispatch(self.queues)
+
+        handlers = {
+            'categories': self.handle_category,
+            'playlists': self.handle_playlist,
+            'tracks': self.handle_track,
+            'artists': self.handle_artist,
+            'audio_features': self.handle_audio_features,
+        }
+        workers = [
+            asyncio.create_task(self.worker(stage, handler))
+            for stage, handler in handlers.items()
+            for _ in range(self.workers_per_stage)
+        ]
+        if self.aggregates:
+            workers.append(asyncio.create_task(self.refresh_aggregates()))
+
+        try:
+            if self.state:
+                await self.resume()
+            await self.collect_categories(category_limit)
+            if self.work_queue:
+                await self.pull_work()
+            if self.sampler:
+                await self.sample_rounds()
+            # Upstream stages finish first, so joining in order drains everything
+            for stage in STAGES:
+                await self.queues[stage].join()
+            await self.gather_lookups()
+            if self.state:
+                self.commit_checkpoints()
+            if self.aggregates:
+                await asyncio.get_running_loop().run_in_executor(self.executor, self.aggregates.refresh)
+            # Only a crawl with nothing left pending counts as finished
+            if self.state and not self.state.pending('playlists'):
+                self.state.finish_run()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self.batcher.close()
+            self.executor.shutdown(wait=False)
+
+        return self.results
+
+    def run(self, category_limit=20):
+        """Run the full crawl and print a short summary"""
+        print(f"🚀 Starting async collection ({self.concurrency} concurrent requests)...")
+        start = time.perf_counter()
+        results = asyncio.run(self.run_async(category_limit))
+        elapsed = time.perf_counter() - start
+
+        print(f"\n📊 Collection Summary ({elapsed:.1f}s):")
+        for stage in STAGES:
+            print(f"   • {stage}: {self.stats[stage]:,}")
+        print(f"   • Requests: {self.stats['requests']:,} ({self.stats['requests']/max(elapsed, 1e-9):.1f} req/s)")
+        print(f"   • Unchanged playlists skipped: {self.stats['unchanged_playlists']}")
+        print(f"   • Recently fetched entities skipped: {self.stats['fresh_skipped']:,}")
+        print(f"   • Errors: {self.stats['errors']}")
+        print(f"   • IDs Spotify didn't know: {self.stats['not_found']}")
+        if hasattr(self.http, 'metrics'):
+            self.http.metrics.print_stats()
+        if self.normalizer:
+            self.normalizer.print_stats()
+        if self.seen_index:
+            self.seen_index.print_stats()
+        if self.scheduler:
+            self.scheduler.print_stats()
+        if self.sampler:
+            self.sampler.print_report()
+        return results
+
+
+if __name__ == "__main__":
+    from crawl_state import CrawlState
+    from dedup_index import SeenIndex
+    from rate_limits_structure import SpotifyRateLimitAnalyzer
+    from track_store import ColumnarStore
+
+    analyzer = SpotifyRateLimitAnalyzer()
+    if os.getenv('SPOTIFY_METRICS_PORT'):
+        # Scrape live latency/throughput while the crawl runs
+        analyzer.http.metrics.serve(int(os.getenv('SPOTIFY_METRICS_PORT')))
+    sampler = None
+    if os.getenv('SPOTIFY_ADAPTIVE_SAMPLING'):
+        # Sample each category until its estimates converge instead of crawling a fixed number of playlists
+        from adaptive_sampling import AdaptiveSampler
+        sampler = AdaptiveSampler()
+    normalizer = None
+    if os.getenv('SPOTIFY_NORMALIZER_WORKERS') and not sampler:
+        # Decode and flatten responses on this many worker processes
+        from normalize import NormalizerPool
+        normalizer = NormalizerPool(int(os.getenv('SPOTIFY_NORMALIZER_WORKERS')) or None)
+    scheduler = None
+    if os.getenv('SPOTIFY_DEADLINE_MINUTES') or os.getenv('SPOTIFY_REQUEST_BUDGET'):
+        # Best dataset within a time limit and/or request count, highest-value stages first
+        from request_scheduler import RequestScheduler
+        deadline = float(os.getenv('SPOTIFY_DEADLINE_MINUTES', 0)) * 60 or None
+        budget = int(os.getenv('SPOTIFY_REQUEST_BUDGET', 0)) or None
+        scheduler = RequestScheduler(analyzer.http.get, total_budget=budget, deadline=deadline)
+    if analyzer.get_access_token():
+        store = ColumnarStore()
+        # Sampling needs every sampled track's audio features, so nothing is skipped as done or recently seen
+        # Artist popularity only comes from /artists lookups, so the daily series needs them refetched daily
+        seen_index = None if sampler else SeenIndex(ttls={'artists': 20 * 3600})
+        collector = AsyncCollector(analyzer.http, store=store, state=None if sampler else CrawlState(), normalizer=normalizer,
+                                   seen_index=seen_index, scheduler=scheduler, sampler=sampler)
+        collector.run()
+        # Today's popularity/follower values extend the per-entity histories - including
+        # tracks the seen index kept out of the store, since their pages were still read
+        # (but not tracks of unchanged playlists, which aren't paged at all)
+        from popularity_timeseries import PopularityTimeSeries
+        PopularityTimeSeries().record_snapshots(collector.snapshots)
+    if normalizer:
+        normalizer.close()
+    if scheduler:
+        scheduler.close()
@@ -0,0 +1,147 @@
+import numpy as np
+
+from feature_columns import AUDIO_FEATURE_COLUMNS
+
+# (label, feature, threshold, message when above, message when not above)
+LABEL_RULES = [
+    ('party', 'danceability', 0.7, "High danceability - good for party playlists", None),
+    ('workout', 'energy', 0.7, "High energy - good for workout playlists", None),
+    ('upbeat', 'valence', 0.6, "Positive mood - good for happy/upbeat playlists",
+     "Lower valence - might be more emotional/sad"),
+]
+
+
+class AudioFeatureMatrix:
+    """Dense float32 (tracks × features) matrix aligned with track popularity
+
+    Every analysis is a single vectorized pass over the matrix, so the same
+    code answers "what correlates with popularity" for 10 or 100k tracks.
+    """
+
+    def __init__(self, features, popularity, track_ids=None, categories=None, columns=None):
+        features = np.asarray(features, dtype=np.float32)
+        popularity = np.asarray(popularity, dtype=np.float32)
+
+        # Drop tracks with any missing value so every statistic sees the same rows
+        valid = ~np.isnan(features).any(axis=1) & ~np.isnan(popularity)
+        self.features = np.ascontiguousarray(features[valid])
+        self.popularity = popularity[valid]
+        self.columns = list(columns or AUDIO_FEATURE_COLUMNS)
+        self.track_ids = np.asarray(track_ids)[valid] if track_ids is not None else None
+        self.categories = np.asarray(categories)[valid] if categories is not None else None
+
+    @classmethod
+    def from_records(cls, audio_features, popularity_by_id, categories_by_id=None, columns=None):
+        """Build from raw /audio-features objects and a {track_id: popularity} dict"""
+        columns = list(columns or AUDIO_FEATURE_COLUMNS)
+        records = [f for f in audio_features if f and f.get('id') in popularity_by_id]
+        features = np.array(
+            [[np.nan if f.get(c) is None else f[c] for c in columns] for f in records],
+            dtype=np.float32,
+        ).reshape(len(records), len(columns))
+        track_ids = [f['id'] for f in records]
+        popularity = [popularity_by_id[track_id] for track_id in track_ids]
+        categories = None
+        if categories_by_id is not None:
+            categories = [categories_by_id.get(track_id, 'uncategorized') for track_id in track_ids]
+        return cls(features, popularity, track_ids, categories, columns)
+
+    @classmethod
+    def from_store(cls, store, columns=None, **filters):
+        """Build from a ColumnarStore by joining audio features to track popularity"""
+        columns = list(columns or AUDIO_FEATURE_COLUMNS)
+        features = store.load('audio_features', columns=['track_id', 'category'] + columns, **filters)
+        tracks = store.load('tracks', columns=['track_id', 'popularity'], **filters)
+        # A track can be stored under several partitions; one row per track is enough
+        tracks = tracks.group_by('track_id').aggregate([('popularity', 'max')])
+        joined = features.join(tracks, 'track_id')
+
+        matrix = np.column_stack([
+            joined.column(c).to_numpy(zero_copy_only=False) for c in columns
+        ]).astype(np.float32) if joined.num_rows else np.empty((0, len(columns)), dtype=np.float32)
+        return cls(
+            matrix,
+            joined.column('popularity_max').to_numpy(zero_copy_only=False),
+            joined.column('track_id').to_numpy(zero_copy_only=False),
+            joined.column('category').to_numpy(zero_copy_only=False),
+            columns,
+        )
+
+    def __len__(self):
+        return self.features.shape[0]
+
+    def column(self, name):
+        return self.features[:, self.columns.index(name)]
+
+    def popularity_correlations(self):
+        """Pearson correlation of every feature with popularity, in one matrix product"""
+        if len(self) < 2:
+            return {c: float('nan') for c in self.columns}
+        x = self.features - self.features.mean(axis=0)
+        y = self.popularity - self.popularity.mean()
+        denominator = np.sqrt((x * x).sum(axis=0) * (y * y).sum())
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = (x.T @ y) / denominator
+        return dict(zip(self.columns, r.astype(float)))
+
+    def feature_correlations(self):
+        """Feature × feature correlation matrix"""
+        return np.corrcoef(self.features, rowvar=False)
+
+    def category_aggregates(self):
+        """Per-category track count, mean popularity and mean of every feature"""
+        if self.categories is None:
+            raise ValueError("No categories attached to this matrix")
+        names, index = np.unique(self.categories, return_inverse=True)
+        counts = np.bincount(index, minlength=len(names))
+
+        # Group sums for all features at once: scatter rows into their category
+        sums = np.zeros((len(names), self.features.shape[1]), dtype=np.float64)
+        np.add.at(sums, index, self.features)
+        popularity_sums = np.bincount(index, weights=self.popularity, minlength=len(names))
+
+        aggregates = {}
+        for i, name in enumerate(names):
+            aggregates[str(name)] = {
+                'tracks': int(counts[i]),
+                'mean_popularity': float(popularity_sums[i] / counts[i]),
+                **{c: float(v) for c, v in zip(self.columns, sums[i] / counts[i])},
+            }
+        return aggregates
+
+    def quantile_bins(self, feature, bins=5):
+        """Split tracks into equal-count bins of a feature and report popularity per bin"""
+        values = self.column(feature)
+        if not len(values):
+            # e.g. every audio-feature batch was shed or failed
+            return []
+        edges = np.quantile(values, np.linspace(0, 1, bins + 1))
+        index = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, bins - 1)
+        counts = np.bincount(index, minlength=bins)
+        popularity = np.bincount(index, weights=self.popularity, minlength=bins)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_popularity = popularity / counts
+        return [
+            {'low': float(edges[i]), 'high': float(edges[i + 1]),
+             'tracks': int(counts[i]), 'mean_popularity': float(mean_popularity[i])}
+            for i in range(bins)
+        ]
+
+    def labels(self):
+        """Boolean mask per LABEL_RULES label, computed for every track at once"""
+        return {
+            label: self.column(feature) > threshold
+            for label, feature, threshold, _, _ in LABEL_RULES
+            if feature in self.columns
+        }
+
+
+def describe_audio_features(features_data):
+    """Plain-language notes for one track, using the same rules as AudioFeatureMatrix.labels"""
+    notes = []
+    for _, feature, threshold, above, otherwise in LABEL_RULES:
+        if features_data[feature] > threshold:
+            notes.append(above)
+        elif otherwise:
+            notes.append(otherwise)
+    return notes
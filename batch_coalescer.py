@@ -0,0 +1,120 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# kind -> (multi-ID endpoint, response key, max IDs per request)
+BATCH_ENDPOINTS = {
+    'audio_features': ('/audio-features', 'audio_features', 100),
+    'tracks': ('/tracks', 'tracks', 50),
+    'artists': ('/artists', 'artists', 50),
+}
+
+
+class BatchRequestFailed(Exception):
+    """The multi-ID request carrying a lookup failed - unlike None, says nothing about the ID"""
+
+
+class BatchCoalescer:
+    """Collects single-ID lookups from many callers and sends them as multi-ID requests
+
+    A batch is flushed as soon as it reaches the endpoint's maximum size, or
+    once the oldest pending ID has waited max_wait seconds. Each caller gets
+    a Future resolving to its own object (None if Spotify doesn't know the
+    ID), or raising BatchRequestFailed (or fetch's own exception) if the
+    request failed. Use as a context manager, or close() it, to stop its
+    threads.
+    """
+
+    def __init__(self, fetch, max_wait=0.05, max_in_flight=4, batch_endpoints=None):
+        # fetch(endpoint) -> parsed JSON dict or None, e.g. SpotifyAPIExplorer.make_request
+        self.fetch = fetch
+        self.max_wait = max_wait
+        self.batch_endpoints = batch_endpoints or BATCH_ENDPOINTS
+        self.pending = {kind: {} for kind in self.batch_endpoints}
+        self.deadlines = {kind: None for kind in self.batch_endpoints}
+        self.stats = {'lookups': 0, 'requests': 0}
+        self.closed = False
+
+        self.cond = threading.Condition()
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self.flusher = threading.Thread(target=self._flush_on_deadline, daemon=True)
+        self.flusher.start()
+
+    def submit(self, kind, item_id):
+        """Queue one ID lookup and return a Future for its result"""
+        future = Future()
+        with self.cond:
+            if self.closed:
+                raise RuntimeError("BatchCoalescer is closed")
+            self.stats['lookups'] += 1
+            pending = self.pending[kind]
+            # Duplicate IDs share one slot in the batch
+            pending.setdefault(item_id, []).append(future)
+
+            if self.deadlines[kind] is None:
+                self.deadlines[kind] = time.monotonic() + self.max_wait
+                self.cond.notify()
+            if len(pending) >= self.batch_endpoints[kind][2]:
+                self._dispatch(kind)
+        return future
+
+    def get(self, kind, item_id, timeout=None):
+        """Blocking single-ID lookup through the coalescer"""
+        return self.submit(kind, item_id).result(timeout)
+
+    def flush(self, kind=None):
+        """Send everything pending now instead of waiting for the deadline"""
+        with self.cond:
+            for k in ([kind] if kind else list(self.pending)):
+                if self.pending[k]:
+                    self._dispatch(k)
+
+    def close(self):
+        self.flush()
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _dispatch(self, kind):
+        # Caller holds self.cond
+        batch = self.pending[kind]
+        self.pending[kind] = {}
+        self.deadlines[kind] = None
+        self.stats['requests'] += 1
+        self.executor.submit(self._send, kind, batch)
+
+    def _flush_on_deadline(self):
+        with self.cond:
+            while not self.closed:
+                now = time.monotonic()
+                for kind, deadline in self.deadlines.items():
+                    if deadline is not None and deadline <= now:
+                        self._dispatch(kind)
+
+                upcoming = [d for d in self.deadlines.values() if d is not None]
+                self.cond.wait(min(upcoming) - now if upcoming else None)
+
+    def _send(self, kind, batch):
+        path, key, _ = self.batch_endpoints[kind]
+        ids = list(batch)
+        try:
+            data = self.fetch(f"{path}?ids={','.join(ids)}")
+            if data is None:
+                raise BatchRequestFailed(f"{path} request for {len(ids)} IDs failed")
+            # Spotify returns objects in request order, with null for unknown IDs
+            results = dict(zip(ids, data.get(key, [])))
+            for item_id, futures in batch.items():
+                for future in futures:
+                    future.set_result(results.get(item_id))
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
@@ -0,0 +1,419 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+try:
+    import resource
+except ImportError:  # Windows - peak RSS isn't reported
+    resource = None
+
+# Dataset sizes are measured in playlist-track entries crawled. The synthetic
+# catalog has 20 categories; playlist lengths are drawn from 10..max_playlist_tracks.
+DATASETS = {
+    '1k': {'tracks': 1000, 'playlists_per_category': 1, 'max_playlist_tracks': 90},
+    '10k': {'tracks': 10000, 'playlists_per_category': 5, 'max_playlist_tracks': 190},
+    '100k': {'tracks': 100000, 'playlists_per_category': 20, 'max_playlist_tracks': 490},
+}
+# Single-ID lookups are capped so the 100k run doesn't spend minutes on them
+MAX_LOOKUPS = 5000
+TOKEN_REFRESHES = 50
+# The client's limiter would otherwise pace every benchmark at the real API's rate
+UNLIMITED_RATE = 1e6
+
+# metric -> True if higher is better
+COMPARED_METRICS = {
+    'wall_time_s': False,
+    'requests_per_second': True,
+    'items_per_second': True,
+    'peak_rss_mb': False,
+    'alloc_peak_mb': False,
+}
+
+
+class BenchmarkContext:
+    """Clients, token managers and scratch space for one benchmark run"""
+
+    def __init__(self, base_url, token_url, dataset, workdir):
+        self.base_url = base_url
+        self.token_url = token_url
+        self.dataset = dataset
+        self.workdir = workdir
+        self.clients = []
+        self.token_managers = []
+
+    def client(self):
+        from rate_limiter import AdaptiveRateLimiter
+        from spotify_client import SpotifyHTTPClient
+
+        limiter = AdaptiveRateLimiter(initial_rate=UNLIMITED_RATE, capacity=UNLIMITED_RATE, max_rate=UNLIMITED_RATE)
+        client = SpotifyHTTPClient(base_url=self.base_url, rate_limiter=limiter)
+        client.token_manager = self.token_manager(client)
+        self.clients.append(client)
+        return client
+
+    def token_manager(self, client):
+        from token_manager import TokenManager
+
+        manager = TokenManager(
+            'benchmark', 'benchmark', http_client=client, token_url=self.token_url,
+            cache_path=os.path.join(self.workdir, f"token_{len(self.token_managers)}.json"),
+            background_refresh=False,
+        )
+        self.token_managers.append(manager)
+        return manager
+
+    def fetch(self, client):
+        def fetch(endpoint):
+            response = client.get(endpoint)
+            return response.json() if response.status_code == 200 else None
+        return fetch
+
+    def requests_sent(self):
+        return sum(c.metrics.requests for c in self.clients) + sum(m.refresh_count for m in self.token_managers)
+
+    def close(self):
+        for client in self.clients:
+            client.close()
+
+
+def track_ids(count):
+    from mock_spotify_server import spotify_id
+    return [spotify_id('track', i) for i in range(count)]
+
+
+def bench_token_acquisition(ctx, prepared):
+    client = ctx.client()
+    for _ in range(TOKEN_REFRESHES):
+        # A fresh manager with an empty cache has to hit the token endpoint
+        manager = ctx.token_manager(client)
+        manager.get_token()
+        # Followed by the cached path every request takes
+        for _ in range(100):
+            manager.get_token()
+    return TOKEN_REFRESHES
+
+
+def bench_single_track_lookups(ctx, prepared):
+    fetch = ctx.fetch(ctx.client())
+    ids = track_ids(min(ctx.dataset['tracks'], MAX_LOOKUPS))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        found = sum(1 for track in executor.map(lambda i: fetch(f"/tracks/{i}"), ids) if track)
+    return found
+
+
+def bench_batched_track_lookups(ctx, prepared):
+    from batch_coalescer import BatchCoalescer
+
+    with BatchCoalescer(ctx.fetch(ctx.client())) as batcher:
+        futures = [batcher.submit('tracks', i) for i in track_ids(min(ctx.dataset['tracks'], MAX_LOOKUPS))]
+        batcher.flush()
+        return sum(1 for future in futures if not future.exception() and future.result())
+
+
+def bench_playlist_pagination(ctx, prepared):
+    from mock_spotify_server import CATEGORIES, spotify_id
+    from pagination import iter_playlist_tracks
+
+    fetch = ctx.fetch(ctx.client())
+    target = ctx.dataset['tracks']
+    count = 0
+    position = 0
+    while count < target:
+        playlist_id = spotify_id('playlist', f"{CATEGORIES[position % len(CATEGORIES)]}:{position // len(CATEGORIES)}")
+        for _ in iter_playlist_tracks(fetch, playlist_id):
+            count += 1
+        position += 1
+    return count
+
+
+def bench_full_crawl(ctx, prepared):
+    from async_collector import AsyncCollector
+    from track_store import ColumnarStore
+
+    collector = AsyncCollector(
+        ctx.client(),
+        playlists_per_category=ctx.dataset['playlists_per_category'],
+        store=ColumnarStore(os.path.join(ctx.workdir, 'store')),
+    )
+    results = asyncio.run(collector.run_async())
+    return len(results['playlist_tracks'])
+
+
+def bench_full_crawl_normalized(ctx, prepared):
+    from async_collector import AsyncCollector
+    from normalize import NormalizerPool
+    from track_store import ColumnarStore
+
+    normalizer = NormalizerPool()
+    collector = AsyncCollector(
+        ctx.client(),
+        playlists_per_category=ctx.dataset['playlists_per_category'],
+        store=ColumnarStore(os.path.join(ctx.workdir, 'store')),
+        normalizer=normalizer,
+    )
+    try:
+        results = asyncio.run(collector.run_async())
+    finally:
+        normalizer.close()
+    return len(results['playlist_tracks'])
+
+
+def prepare_track_payloads(ctx):
+    from mock_spotify_server import SyntheticCatalog, spotify_id
+
+    # A thousand distinct track bodies, re-decoded with fresh IDs, keep setup cheap at 100k
+    catalog = SyntheticCatalog(tracks=ctx.dataset['tracks'])
+    return [json.dumps(catalog.track(spotify_id('track', i))) for i in range(1000)]
+
+
+def decoded_tracks(payloads, count):
+    from mock_spotify_server import spotify_id
+
+    for i in range(count):
+        track = json.loads(payloads[i % len(payloads)])
+        track['id'] = spotify_id('track', f"corpus:{i}")
+        yield track
+
+
+def bench_raw_entities(ctx, payloads):
+    # Baseline for compact_entities: what holding response.json() dicts costs
+    tracks = {track['id']: track for track in decoded_tracks(payloads, ctx.dataset['tracks'])}
+    return len(tracks)
+
+
+def bench_compact_entities(ctx, payloads):
+    from entities import EntityCorpus
+
+    corpus = EntityCorpus()
+    for position, track in enumerate(decoded_tracks(payloads, ctx.dataset['tracks'])):
+        corpus.add_playlist_track('benchmark', position, track)
+    return len(corpus.tracks)
+
+
+def request_records(count):
+    start = datetime(2025, 1, 1)
+    endpoints = ['/search?q=top%20hits&type=playlist&limit=50', '/playlists/abc/tracks?offset=100&limit=100', '/audio-features?ids=a,b']
+    for i in range(count):
+        status = 429 if i % 97 == 0 else 200
+        yield {
+            'endpoint': endpoints[i % len(endpoints)],
+            'description': 'benchmark',
+            'status_code': status,
+            'response_time_ms': 50.0 + (i * 7919) % 400,
+            'timestamp': (start + timedelta(milliseconds=100 * i)).isoformat(),
+            'rate_limit_headers': {'Retry-After': '2'} if status == 429 else {},
+        }
+
+
+def write_request_log(ctx, count):
+    from request_log import RequestLogSink
+
+    sink = RequestLogSink(directory=os.path.join(ctx.workdir, 'logs'), max_bytes=8 * 1024 * 1024)
+    for record in request_records(count):
+        sink.append(record)
+    return sink.close()
+
+
+def bench_log_persistence(ctx, prepared):
+    write_request_log(ctx, ctx.dataset['tracks'])
+    return ctx.dataset['tracks']
+
+
+def prepare_log_analysis(ctx):
+    return write_request_log(ctx, ctx.dataset['tracks'])
+
+
+def bench_log_analysis(ctx, files):
+    from log_analyzer import RequestLogAnalyzer
+
+    analyzer = RequestLogAnalyzer()
+    for path in files:
+        analyzer.add_file(path)
+    analyzer.report()
+    return analyzer.total
+
+
+# name -> (untimed setup or None, timed benchmark returning the number of items processed)
+BENCHMARKS = {
+    'token_acquisition': (None, bench_token_acquisition),
+    'single_track_lookups': (None, bench_single_track_lookups),
+    'batched_track_lookups': (None, bench_batched_track_lookups),
+    'playlist_pagination': (None, bench_playlist_pagination),
+    'full_crawl': (None, bench_full_crawl),
+    'full_crawl_normalized': (None, bench_full_crawl_normalized),
+    'raw_entities': (prepare_track_payloads, bench_raw_entities),
+    'compact_entities': (prepare_track_payloads, bench_compact_entities),
+    'log_persistence': (None, bench_log_persistence),
+    'log_analysis': (prepare_log_analysis, bench_log_analysis),
+}
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_pass(name, base_url, token_url, dataset, trace_allocations=False):
+    prepare, bench = BENCHMARKS[name]
+    workdir = tempfile.mkdtemp(prefix=f"bench_{name}_")
+    ctx = BenchmarkContext(base_url, token_url, dataset, workdir)
+    try:
+        prepared = prepare(ctx) if prepare else None
+        if trace_allocations:
+            tracemalloc.start()
+        start = time.perf_counter()
+        items = bench(ctx, prepared)
+        wall_time = time.perf_counter() - start
+        alloc_peak = tracemalloc.get_traced_memory()[1] if trace_allocations else None
+        return wall_time, items, ctx.requests_sent(), alloc_peak
+    finally:
+        if trace_allocations:
+            tracemalloc.stop()
+        ctx.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_benchmark(name, base_url, token_url, dataset, trace_allocations=True):
+    """Run one benchmark in this (fresh) process and measure it
+
+    Timing and peak RSS come from an untraced pass; allocations from a
+    second pass under tracemalloc, which would otherwise distort the timing.
+    """
+    wall_time, items, requests, _ = run_pass(name, base_url, token_url, dataset)
+    result = {
+        'wall_time_s': wall_time,
+        'items': items,
+        'items_per_second': items / wall_time if wall_time else 0.0,
+        'requests': requests,
+        'requests_per_second': requests / wall_time if wall_time else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    if trace_allocations:
+        result['alloc_peak_mb'] = run_pass(name, base_url, token_url, dataset, trace_allocations=True)[3] / (1024 * 1024)
+    return result
+
+
+class BenchmarkSuite:
+    """Runs each benchmark against a local mock API, one fresh process per benchmark
+
+    A separate process per run keeps peak RSS and allocation numbers from
+    leaking between benchmarks, and keeps the mock server's threads off the
+    client's GIL.
+    """
+
+    def __init__(self, sizes=('1k', '10k'), benchmarks=None, latency='none', trace_allocations=True):
+        self.sizes = list(sizes)
+        self.benchmarks = list(benchmarks or BENCHMARKS)
+        self.latency = latency
+        self.trace_allocations = trace_allocations
+        self.results = {}
+
+    def run(self):
+        from mock_spotify_server import LatencyModel, MockSpotifyAPI, MockSpotifyServer, SyntheticCatalog
+
+        context = multiprocessing.get_context('spawn')
+        for size in self.sizes:
+            dataset = DATASETS[size]
+            catalog = SyntheticCatalog(
+                tracks=dataset['tracks'],
+                playlists_per_category=dataset['playlists_per_category'],
+                max_playlist_tracks=dataset['max_playlist_tracks'],
+            )
+            api = MockSpotifyAPI(catalog=catalog, latency=LatencyModel.parse(self.latency, seed=0), seed=0)
+            with MockSpotifyServer(api) as server:
+                for name in self.benchmarks:
+                    print(f"⏱️  {name} [{size}]...", end=' ', flush=True)
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                        result = pool.submit(run_benchmark, name, server.base_url, server.token_url,
+                                             dataset, self.trace_allocations).result()
+                    self.results[f"{name}[{size}]"] = result
+                    print(f"{result['wall_time_s']:.2f}s, {result['requests_per_second']:.0f} req/s, "
+                          f"{result['items_per_second']:.0f} items/s, peak RSS {result['peak_rss_mb'] or 0:.0f}MB")
+        return self.results
+
+    def report(self):
+        return {
+            'created_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'latency': self.latency,
+            'results': self.results,
+        }
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        print(f"💾 Benchmark results saved to '{path}'")
+
+
+def compare_to_baseline(results, baseline, tolerance=0.10):
+    """[(benchmark, metric, baseline, current, change)] for every metric that got worse than tolerance"""
+    regressions = []
+    print(f"\n📊 Comparison with baseline (tolerance {tolerance*100:.0f}%):")
+    for key, current in sorted(results.items()):
+        previous = baseline.get(key)
+        if not previous:
+            print(f"   • {key}: no baseline")
+            continue
+        changes = []
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if not previous.get(metric) or current.get(metric) is None:
+                continue
+            change = (current[metric] - previous[metric]) / previous[metric]
+            worse = -change if higher_is_better else change
+            changes.append(f"{metric} {change*100:+.1f}%")
+            if worse > tolerance:
+                regressions.append((key, metric, previous[metric], current[metric], change))
+        print(f"   • {key}: {', '.join(changes)}")
+
+    if regressions:
+        print(f"\n⚠️  {len(regressions)} regression(s):")
+        for key, metric, previous, current, change in regressions:
+            print(f"   • {key} {metric}: {previous:.3f} → {current:.3f} ({change*100:+.1f}%)")
+    else:
+        print("\n✅ No regressions")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark collection throughput against a local mock Spotify API")
+    parser.add_argument('--sizes', nargs='+', default=['1k', '10k'], choices=list(DATASETS))
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), help="default: all")
+    parser.add_argument('--latency', default='none', help="mock server latency model, e.g. fixed:20 or lognormal:80:0.5")
+    parser.add_argument('--no-allocations', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('--output', default=f"benchmark_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    parser.add_argument('--baseline', default='benchmark_baseline.json', help="results file to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="relative change that counts as a regression")
+    args = parser.parse_args(argv)
+
+    print("🏁 SPOTIFY COLLECTION BENCHMARKS")
+    print("="*60)
+    suite = BenchmarkSuite(args.sizes, args.benchmarks, args.latency, not args.no_allocations)
+    suite.run()
+    suite.save(args.output)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(suite.results, json.load(f)['results'], args.tolerance)
+    if args.save_baseline:
+        suite.save(args.baseline)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
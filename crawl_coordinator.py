@@ -0,0 +1,404 @@
+import argparse
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+
+from rate_limiter import AdaptiveRateLimiter, endpoint_family
+
+DEFAULT_QUEUE_PATH = 'data/work_queue.sqlite'
+DEFAULT_BUDGET_PATH = 'data/rate_budget.sqlite'
+# Bucket row every request draws from on top of its endpoint family's
+APP_FAMILY = '__app__'
+
+
+def connect(path):
+    """Autocommit connection for a database several processes on this host write to
+
+    WAL mode coordinates writers through shared memory, so the file must be
+    on a local disk - not NFS/SMB shared between machines.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # isolation_level=None: transactions are opened explicitly with BEGIN IMMEDIATE
+    db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    """Durable task queue shared by crawl workers through one SQLite file
+
+    Tasks are (kind, key) pairs - e.g. ('categories', 'pop') or
+    ('playlists', <id>) - added idempotently, so every worker may seed the
+    same categories. claim() leases tasks to one worker for lease_seconds;
+    a worker that crashes simply stops renewing, and once the lease expires
+    the task is handed to someone else. Tasks that keep failing are parked
+    as 'failed' after max_attempts. Done tasks stay done until reset(), so
+    the next crawl against the same file starts with reset().
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH, worker_id=None, lease_seconds=120, max_attempts=5):
+        self.path = path
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.db = connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                parent TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (kind, key)
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks(status, lease_expires);
+        """)
+        self.stats = {'claimed': 0, 'completed': 0, 'released': 0, 'reclaimed': 0}
+
+    def _transaction(self, work):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers can't claim the same rows
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self.db)
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+            return result
+
+    def add(self, kind, keys, parent=None):
+        """Queue tasks (no-op for ones already known, whatever their status)"""
+        now = time.time()
+        rows = [(kind, key, parent, now) for key in keys]
+        self._transaction(lambda db: db.executemany(
+            "INSERT OR IGNORE INTO tasks (kind, key, parent, updated_at) VALUES (?, ?, ?, ?)", rows
+        ))
+
+    def claim(self, limit=1, kinds=None):
+        """Lease up to limit pending (or abandoned) tasks -> [(kind, key, parent)]
+
+        Earlier kinds in `kinds` are claimed first, so a worker finishes
+        enumerating categories before it starts on playlists.
+        """
+        def work(db):
+            now = time.time()
+            order = "attempts, updated_at"
+            params = [now]
+            kind_filter = ""
+            if kinds:
+                kind_filter = f"AND kind IN ({', '.join('?' * len(kinds))})"
+                order = f"CASE kind {' '.join(f'WHEN ? THEN {i}' for i in range(len(kinds)))} END, " + order
+                params = [now] + list(kinds) + list(kinds)
+            rows = db.execute(f"""
+                SELECT kind, key, parent, status FROM tasks
+                WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?)) {kind_filter}
+                ORDER BY {order} LIMIT ?
+            """, params + [limit]).fetchall()
+            db.executemany(
+                "UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE kind = ? AND key = ?",
+                [(self.worker_id, now + self.lease_seconds, now, kind, key) for kind, key, _, _ in rows]
+            )
+            return rows
+
+        rows = self._transaction(work)
+        self.stats['claimed'] += len(rows)
+        self.stats['reclaimed'] += sum(1 for row in rows if row[3] == 'leased')
+        return [(kind, key, parent) for kind, key, parent, _ in rows]
+
+    def renew(self, tasks):
+        """Extend this worker's leases on [(kind, key)]"""
+        expires = time.time() + self.lease_seconds
+        self._transaction(lambda db: db.executemany(
+            "UPDATE tasks SET lease_expires = ? WHERE kind = ? AND key = ? AND lease_owner = ? AND status = 'leased'",
+            [(expires, kind, key, self.worker_id) for kind, key in tasks]
+        ))
+
+    def complete(self, kind, key):
+        self._transaction(lambda db: db.execute(
+            "UPDATE tasks SET status = 'done', lease_owner = NULL, lease_expires = NULL, updated_at = ? WHERE kind = ? AND key = ?",
+            (time.time(), kind, key)
+        ))
+        self.stats['completed'] += 1
+
+    def release(self, kind, key):
+        """Give a task back (e.g. after a failed request); parked as failed after max_attempts"""
+        self._transaction(lambda db: db.execute(
+            """UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                   lease_owner = NULL, lease_expires = NULL, updated_at = ?
+               WHERE kind = ? AND key = ? AND lease_owner = ?""",
+            (self.max_attempts, time.time(), kind, key, self.worker_id)
+        ))
+        self.stats['released'] += 1
+
+    def reset(self):
+        """Forget every task, done or not (e.g. before the next day's crawl)"""
+        self._transaction(lambda db: db.execute("DELETE FROM tasks"))
+
+    def remaining(self):
+        """Tasks not yet done or failed, including ones leased to other workers"""
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM tasks WHERE status IN ('pending', 'leased')").fetchone()[0]
+
+    def summary(self):
+        with self.lock:
+            rows = self.db.execute("SELECT kind, status, COUNT(*) FROM tasks GROUP BY kind, status").fetchall()
+        summary = {}
+        for kind, status, count in rows:
+            summary.setdefault(kind, {})[status] = count
+        return summary
+
+    def workers(self):
+        """{worker_id: leased task count} for leases that haven't expired"""
+        with self.lock:
+            return dict(self.db.execute(
+                "SELECT lease_owner, COUNT(*) FROM tasks WHERE status = 'leased' AND lease_expires >= ? GROUP BY lease_owner",
+                (time.time(),)
+            ).fetchall())
+
+    def print_stats(self):
+        print(f"\n📋 Work Queue ({self.path}):")
+        for kind, statuses in sorted(self.summary().items()):
+            print(f"   • {kind}: " + ', '.join(f"{count:,} {status}" for status, count in sorted(statuses.items())))
+        print(f"   • This worker ({self.worker_id}): {self.stats['claimed']} claimed "
+              f"({self.stats['reclaimed']} from expired leases), {self.stats['completed']} completed, {self.stats['released']} released")
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class SharedTokenBucket:
+    """TokenBucket whose state lives in SQLite, so every worker process draws from it
+
+    Same reserve/on_success/on_rate_limited contract as
+    rate_limiter.TokenBucket, with wall-clock time because monotonic clocks
+    aren't comparable across processes. A 429 seen by any worker pauses
+    and slows all of them.
+    """
+
+    def __init__(self, db, lock, family, rate=2.0, capacity=5, min_rate=0.5, max_rate=20.0,
+                 increase_step=0.1, decrease_factor=0.5, clock=time.time):
+        self.db = db
+        self.lock = lock
+        self.family = family
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.clock = clock
+        self._transaction(lambda now: self.db.execute(
+            "INSERT OR IGNORE INTO buckets (family, rate, tokens, updated, blocked_until) VALUES (?, ?, ?, ?, 0)",
+            (family, rate, float(capacity), now)
+        ))
+
+    def _transaction(self, work):
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self.clock())
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+            return result
+
+    def _load(self):
+        return self.db.execute(
+            "SELECT rate, tokens, updated, blocked_until FROM buckets WHERE family = ?", (self.family,)
+        ).fetchone()
+
+    @property
+    def rate(self):
+        with self.lock:
+            return self._load()[0]
+
+    def reserve(self):
+        """Take one token from the shared budget and return how long to wait before sending"""
+        def work(now):
+            rate, tokens, updated, blocked_until = self._load()
+            if now > updated:
+                tokens = min(self.capacity, tokens + (now - updated) * rate)
+                updated = now
+            tokens -= 1
+            self.db.execute("UPDATE buckets SET tokens = ?, updated = ? WHERE family = ?", (tokens, updated, self.family))
+            # During a pause `updated` is the pause's end, so workers queued behind it
+            # leave one at a time at `rate` rather than all at once when it ends
+            return max(updated - now, 0.0) + max(-tokens, 0.0) / rate
+
+        return self._transaction(work)
+
+    def on_success(self):
+        self._transaction(lambda now: self.db.execute(
+            "UPDATE buckets SET rate = MIN(?, rate + ?) WHERE family = ?",
+            (self.max_rate, self.increase_step, self.family)
+        ))
+
+    def on_rate_limited(self, retry_after):
+        def work(now):
+            _, _, _, blocked_until = self._load()
+            blocked_until = max(blocked_until, now + retry_after)
+            # No refill while blocked - refilling starts once the pause ends
+            self.db.execute(
+                "UPDATE buckets SET rate = MAX(?, rate * ?), tokens = 0, updated = ?, blocked_until = ? WHERE family = ?",
+                (self.min_rate, self.decrease_factor, blocked_until, blocked_until, self.family)
+            )
+
+        self._transaction(work)
+
+
+class SharedRateLimiter(AdaptiveRateLimiter):
+    """AdaptiveRateLimiter whose per-family buckets are shared by every process using `path`
+
+    Drop-in for SpotifyHTTPClient(rate_limiter=...): N workers together stay
+    inside one application's budget instead of each pacing itself as if it
+    were alone. Spotify throttles per app, so besides its family bucket
+    every request also draws from one application-wide bucket (app_rate,
+    defaulting to max_rate) and a 429 on any family pauses that too.
+    Retry/backoff counters stay per process.
+    """
+
+    def __init__(self, path=DEFAULT_BUDGET_PATH, app_rate=None, **settings):
+        super().__init__(**settings)
+        self.path = path
+        self.db = connect(path)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                family TEXT PRIMARY KEY,
+                rate REAL NOT NULL,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL,
+                blocked_until REAL NOT NULL
+            )
+        """)
+        self.db_lock = threading.Lock()
+        self.app_settings = dict(self.bucket_settings)
+        if app_rate is not None:
+            self.app_settings['max_rate'] = app_rate
+            self.app_settings['rate'] = min(self.app_settings['rate'], app_rate)
+        self.app_bucket = SharedTokenBucket(self.db, self.db_lock, APP_FAMILY, **self.app_settings)
+
+    def bucket(self, endpoint):
+        family = endpoint_family(endpoint)
+        with self.lock:
+            if family not in self.buckets:
+                self.buckets[family] = SharedTokenBucket(self.db, self.db_lock, family, **self.bucket_settings)
+            return self.buckets[family]
+
+    def reserve(self, endpoint):
+        """Take a token from the family bucket and the app bucket; wait for the later of the two"""
+        delay = max(self.bucket(endpoint).reserve(), self.app_bucket.reserve())
+        if delay > 0:
+            with self.lock:
+                self.total_wait_seconds += delay
+        return delay
+
+    def record_success(self, endpoint):
+        super().record_success(endpoint)
+        self.app_bucket.on_success()
+
+    def record_rate_limited(self, endpoint, retry_after):
+        super().record_rate_limited(endpoint, retry_after)
+        self.app_bucket.on_rate_limited(retry_after)
+
+    def stats(self):
+        stats = super().stats()
+        stats['rates']['app'] = self.app_bucket.rate
+        return stats
+
+    def reset(self):
+        """Forget shared rates and pauses (e.g. before a fresh crawl)"""
+        with self.db_lock:
+            self.db.execute("DELETE FROM buckets")
+        self.app_bucket = SharedTokenBucket(self.db, self.db_lock, APP_FAMILY, **self.app_settings)
+        with self.lock:
+            self.buckets = {}
+
+
+def run_worker(queue_path=DEFAULT_QUEUE_PATH, budget_path=DEFAULT_BUDGET_PATH, worker_id=None,
+               category_limit=20, max_rate=20.0, app_rate=None, store_root='data/store', state_path=None):
+    """One crawl worker: AsyncCollector fed from the shared queue, paced by the shared budget"""
+    from async_collector import AsyncCollector
+    from crawl_state import CrawlState
+    from rate_limits_structure import SpotifyRateLimitAnalyzer
+    from track_store import ColumnarStore
+
+    analyzer = SpotifyRateLimitAnalyzer()
+    analyzer.http.rate_limiter = SharedRateLimiter(budget_path, app_rate=app_rate, max_rate=max_rate)
+    if not analyzer.get_access_token():
+        return None
+    queue = WorkQueue(queue_path, worker_id)
+    # A shared CrawlState lets a worker resume a reclaimed playlist from its saved offset
+    state = CrawlState(state_path) if state_path else None
+    try:
+        collector = AsyncCollector(analyzer.http, store=ColumnarStore(store_root), state=state, work_queue=queue)
+        collector.run(category_limit)
+        queue.print_stats()
+        return collector.stats
+    finally:
+        queue.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Coordinate several crawl workers through a shared SQLite work queue")
+    parser.add_argument('command', choices=['work', 'status'])
+    parser.add_argument('--queue', default=DEFAULT_QUEUE_PATH)
+    parser.add_argument('--budget', default=DEFAULT_BUDGET_PATH)
+    parser.add_argument('--processes', type=int, default=1, help="Worker processes to start on this machine")
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--max-rate', type=float, default=20.0, help="Requests/s per endpoint family, across all workers")
+    parser.add_argument('--app-rate', type=float, default=None,
+                        help="Requests/s for the whole application, across all families and workers (default: --max-rate)")
+    parser.add_argument('--store', default='data/store')
+    parser.add_argument('--state', default='data/crawl_state.sqlite')
+    parser.add_argument('--fresh', action='store_true',
+                        help="Start a new crawl: forget the previous crawl's tasks and shared rate state first")
+    args = parser.parse_args(argv)
+
+    if args.command == 'status':
+        queue = WorkQueue(args.queue)
+        queue.print_stats()
+        for worker, leased in sorted(queue.workers().items()):
+            print(f"   • {worker}: {leased} leased")
+        queue.close()
+        return 0
+
+    if args.fresh:
+        # Once, before any worker starts - a worker resetting mid-crawl would wipe the others' tasks
+        queue = WorkQueue(args.queue)
+        queue.reset()
+        queue.close()
+        SharedRateLimiter(args.budget).reset()
+    options = dict(queue_path=args.queue, budget_path=args.budget, category_limit=args.categories,
+                   max_rate=args.max_rate, app_rate=args.app_rate, store_root=args.store, state_path=args.state)
+    if args.processes == 1:
+        run_worker(**options)
+        return 0
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=run_worker, kwargs=options) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return max(process.exitcode or 0 for process in processes)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
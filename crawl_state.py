@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class CrawlState:
+    """Durable crawl progress: per-stage checkpoints plus playlist snapshot IDs
+
+    Checkpoints describe the crawl in progress (which categories were
+    enumerated, which playlists are pending or done, and the page offset
+    reached inside each playlist). They are cleared when a crawl finishes.
+    Playlist snapshot_ids persist across crawls, so a refresh can skip
+    playlists Spotify reports as unchanged.
+    """
+
+    def __init__(self, path='data/crawl_state.sqlite'):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                stage TEXT NOT NULL,
+                key TEXT NOT NULL,
+                parent TEXT,
+                page_offset INTEGER NOT NULL DEFAULT 0,
+                done INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (stage, key)
+            );
+            CREATE TABLE IF NOT EXISTS playlist_snapshots (
+                playlist_id TEXT PRIMARY KEY,
+                snapshot_id TEXT NOT NULL,
+                category_id TEXT,
+                collected_at REAL NOT NULL
+            );
+        """)
+        self.db.commit()
+
+    def _execute(self, sql, params=()):
+        with self.lock:
+            rows = self.db.execute(sql, params).fetchall()
+            self.db.commit()
+            return rows
+
+    def has_checkpoints(self):
+        """True if an earlier crawl stopped before finishing"""
+        return bool(self._execute("SELECT 1 FROM checkpoints LIMIT 1"))
+
+    def add_pending(self, stage, key, parent=None):
+        """Record work discovered but not done yet (no-op if already known)"""
+        self._execute(
+            "INSERT OR IGNORE INTO checkpoints (stage, key, parent, updated_at) VALUES (?, ?, ?, ?)",
+            (stage, key, parent, time.time())
+        )
+
+    def pending(self, stage):
+        """[(key, parent, page_offset)] for everything in a stage that isn't done"""
+        return self._execute(
+            "SELECT key, parent, page_offset FROM checkpoints WHERE stage = ? AND done = 0 ORDER BY updated_at",
+            (stage,)
+        )
+
+    def is_done(self, stage, key):
+        return bool(self._execute(
+            "SELECT 1 FROM checkpoints WHERE stage = ? AND key = ? AND done = 1", (stage, key)
+        ))
+
+    def get_offset(self, stage, key):
+        rows = self._execute("SELECT page_offset FROM checkpoints WHERE stage = ? AND key = ?", (stage, key))
+        return rows[0][0] if rows else 0
+
+    def save_offset(self, stage, key, offset, parent=None):
+        self._execute(
+            """INSERT INTO checkpoints (stage, key, parent, page_offset, updated_at) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(stage, key) DO UPDATE SET page_offset = excluded.page_offset, updated_at = excluded.updated_at""",
+            (stage, key, parent, offset, time.time())
+        )
+
+    def mark_done(self, stage, key, parent=None):
+        self._execute(
+            """INSERT INTO checkpoints (stage, key, parent, done, updated_at) VALUES (?, ?, ?, 1, ?)
+               ON CONFLICT(stage, key) DO UPDATE SET done = 1, updated_at = excluded.updated_at""",
+            (stage, key, parent, time.time())
+        )
+
+    def playlist_changed(self, playlist_id, snapshot_id):
+        """True unless we already collected this exact playlist version"""
+        rows = self._execute("SELECT snapshot_id FROM playlist_snapshots WHERE playlist_id = ?", (playlist_id,))
+        return not rows or rows[0][0] != snapshot_id
+
+    def record_snapshot(self, playlist_id, snapshot_id, category_id=None):
+        self._execute(
+            "INSERT OR REPLACE INTO playlist_snapshots VALUES (?, ?, ?, ?)",
+            (playlist_id, snapshot_id, category_id, time.time())
+        )
+
+    def finish_run(self):
+        """The crawl completed - drop checkpoints, keep snapshots for the next refresh"""
+        self._execute("DELETE FROM checkpoints")
+
+    def summary(self):
+        rows = self._execute(
+            "SELECT stage, SUM(done), COUNT(*) FROM checkpoints GROUP BY stage ORDER BY stage"
+        )
+        return {stage: {'done': done, 'total': total} for stage, done, total in rows}
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,434 @@
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from feature_columns import AUDIO_FEATURE_COLUMNS
+
+try:
+    from flask import Flask, Response, request
+except ImportError:  # The aggregates work without it; only create_app needs Flask
+    Flask = None
+
+# Category key for corpus-wide aggregates
+ALL = '*'
+
+AGGREGATE_SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS agg_category_summary (
+        category TEXT PRIMARY KEY,
+        playlists INTEGER,
+        tracks INTEGER,
+        artists INTEGER,
+        avg_popularity REAL,
+        refreshed_at REAL,
+        version INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS agg_popularity (
+        category TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        tracks INTEGER NOT NULL,
+        PRIMARY KEY (category, bucket)
+    ) WITHOUT ROWID;
+    -- Running sums per (category, feature) against track popularity; enough for mean, spread and Pearson r
+    CREATE TABLE IF NOT EXISTS agg_features (
+        category TEXT NOT NULL,
+        feature TEXT NOT NULL,
+        n INTEGER, sum_x REAL, sum_xx REAL, sum_y REAL, sum_yy REAL, sum_xy REAL,
+        PRIMARY KEY (category, feature)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS agg_artist_reach (
+        artist_id TEXT PRIMARY KEY,
+        name TEXT,
+        popularity INTEGER,
+        categories INTEGER,
+        playlists INTEGER,
+        tracks INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_agg_artist_reach ON agg_artist_reach(categories DESC, playlists DESC);
+    -- What each track last contributed to the corpus-wide rows, so refreshes apply only the difference
+    CREATE TABLE IF NOT EXISTS agg_all_tracks (
+        track_id TEXT PRIMARY KEY,
+        popularity INTEGER,
+        {', '.join(f'{feature} REAL' for feature in AUDIO_FEATURE_COLUMNS)}
+    );
+    CREATE TABLE IF NOT EXISTS agg_all_totals (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        tracks INTEGER NOT NULL,
+        artists INTEGER NOT NULL,
+        rated_tracks INTEGER NOT NULL,
+        sum_popularity INTEGER NOT NULL
+    );
+"""
+
+# Distinct (category, track) pairs; the {where} filter narrows it to the categories being refreshed
+CATEGORY_TRACKS = """
+    SELECT DISTINCT p.category AS category, pt.track_id AS track_id
+    FROM playlists p JOIN playlist_tracks pt ON pt.playlist_id = p.playlist_id
+    {where}
+"""
+
+
+class LRUCache:
+    """Thread-safe LRU of rendered responses, keyed (endpoint, category, version, params)"""
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidated': 0}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, categories):
+        """Drop every entry for these categories (and the corpus-wide ones)"""
+        categories = set(categories) | {ALL}
+        with self.lock:
+            stale = [key for key in self.entries if key[1] in categories]
+            for key in stale:
+                del self.entries[key]
+            self.stats['invalidated'] += len(stale)
+
+
+class DashboardAggregates:
+    """Materialized dashboard aggregates kept next to the data in a RelationalStore
+
+    RelationalStore marks every category it writes as dirty; refresh()
+    recomputes the summary, popularity histogram, feature sums and artist
+    reach for just those categories. The corpus-wide rows are updated by
+    difference: agg_all_tracks remembers what each track contributed, and
+    only tracks in the refreshed categories whose values changed are
+    subtracted and re-added. Endpoints are served from the aggregate tables
+    through an LRU of rendered JSON keyed by the aggregate version, each
+    with an ETag of the rendered body so unchanged aggregates answer
+    conditional requests with 304.
+    """
+
+    def __init__(self, store, cache_size=512):
+        self.store = store
+        self.cache = LRUCache(cache_size)
+        self.refresher = None
+        with store.lock:
+            store.db.executescript(AGGREGATE_SCHEMA)
+            store.db.commit()
+        self.stats = {'refreshes': 0, 'categories_refreshed': 0, 'refresh_seconds': 0.0}
+
+    def dirty_categories(self):
+        return [category for category, in self.store.query("SELECT category FROM dirty_categories")]
+
+    def refresh(self, categories=None):
+        """Recompute aggregates for the given (default: dirty) categories; returns them"""
+        self.store.flush()
+        started = time.time()
+        categories = list(categories) if categories is not None else self.dirty_categories()
+        if not categories:
+            return []
+
+        start = time.perf_counter()
+        db = self.store.db
+        with self.store.lock:
+            with db:
+                db.execute("CREATE TEMP TABLE IF NOT EXISTS refresh_categories (category TEXT PRIMARY KEY)")
+                db.execute("DELETE FROM refresh_categories")
+                db.executemany("INSERT OR IGNORE INTO refresh_categories VALUES (?)", [(c,) for c in categories])
+                self._refresh_categories(db)
+                artists_added = self._refresh_artist_reach(db)
+                self._refresh_all(db, artists_added)
+                # Anything written while we were computing stays dirty for the next pass
+                db.execute(
+                    "DELETE FROM dirty_categories WHERE marked_at <= ? AND category IN (SELECT category FROM refresh_categories)",
+                    (started,)
+                )
+        self.cache.invalidate(categories)
+
+        self.stats['refreshes'] += 1
+        self.stats['categories_refreshed'] += len(categories)
+        self.stats['refresh_seconds'] += time.perf_counter() - start
+        return categories
+
+    def _refresh_categories(self, db):
+        pairs = CATEGORY_TRACKS.format(where="WHERE p.category IN (SELECT category FROM refresh_categories)")
+        for table in ('agg_popularity', 'agg_features'):
+            db.execute(f"DELETE FROM {table} WHERE category IN (SELECT category FROM refresh_categories)")
+
+        db.execute(f"""
+            INSERT OR REPLACE INTO agg_category_summary (category, playlists, tracks, artists, avg_popularity, refreshed_at, version)
+            SELECT c.category,
+                   (SELECT COUNT(*) FROM playlists p WHERE p.category = c.category),
+                   COUNT(DISTINCT c.track_id),
+                   COUNT(DISTINCT ta.artist_id),
+                   (SELECT AVG(t.popularity) FROM ({pairs}) x JOIN tracks t ON t.track_id = x.track_id WHERE x.category = c.category),
+                   ?,
+                   COALESCE((SELECT version FROM agg_category_summary s WHERE s.category = c.category), 0) + 1
+            FROM ({pairs}) c LEFT JOIN track_artists ta ON ta.track_id = c.track_id
+            GROUP BY c.category
+        """, (time.time(),))
+        db.execute(f"""
+            INSERT INTO agg_popularity (category, bucket, tracks)
+            SELECT c.category, (t.popularity / 10) * 10, COUNT(*)
+            FROM ({pairs}) c JOIN tracks t ON t.track_id = c.track_id
+            WHERE t.popularity IS NOT NULL
+            GROUP BY c.category, (t.popularity / 10) * 10
+        """)
+
+        sums = ', '.join(
+            f"COUNT(f.{f} * t.popularity), SUM(f.{f}), SUM(f.{f} * f.{f}), "
+            f"SUM(CASE WHEN f.{f} IS NOT NULL THEN t.popularity END), "
+            f"SUM(CASE WHEN f.{f} IS NOT NULL THEN t.popularity * t.popularity END), SUM(f.{f} * t.popularity)"
+            for f in AUDIO_FEATURE_COLUMNS
+        )
+        rows = db.execute(f"""
+            SELECT c.category, {sums}
+            FROM ({pairs}) c
+            JOIN tracks t ON t.track_id = c.track_id
+            JOIN audio_features f ON f.track_id = c.track_id
+            WHERE t.popularity IS NOT NULL
+            GROUP BY c.category
+        """).fetchall()
+        db.executemany(
+            "INSERT INTO agg_features (category, feature, n, sum_x, sum_xx, sum_y, sum_yy, sum_xy) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(row[0], feature) + row[1 + 6 * i:7 + 6 * i] for row in rows for i, feature in enumerate(AUDIO_FEATURE_COLUMNS)]
+        )
+
+    def _refresh_artist_reach(self, db):
+        # Reach spans categories, so recompute every artist that appears in a refreshed one
+        db.execute("CREATE TEMP TABLE IF NOT EXISTS refresh_artists (artist_id TEXT PRIMARY KEY)")
+        db.execute("DELETE FROM refresh_artists")
+        db.execute("""
+            INSERT OR IGNORE INTO refresh_artists
+            SELECT DISTINCT ta.artist_id
+            FROM playlists p
+            JOIN playlist_tracks pt ON pt.playlist_id = p.playlist_id
+            JOIN track_artists ta ON ta.track_id = pt.track_id
+            WHERE p.category IN (SELECT category FROM refresh_categories)
+        """)
+        removed = db.execute("DELETE FROM agg_artist_reach WHERE artist_id IN (SELECT artist_id FROM refresh_artists)").rowcount
+        added = db.execute("""
+            INSERT INTO agg_artist_reach (artist_id, name, popularity, categories, playlists, tracks)
+            SELECT r.artist_id, a.name, a.popularity,
+                   COUNT(DISTINCT p.category), COUNT(DISTINCT pt.playlist_id), COUNT(DISTINCT ta.track_id)
+            FROM refresh_artists r
+            JOIN track_artists ta ON ta.artist_id = r.artist_id
+            JOIN playlist_tracks pt ON pt.track_id = ta.track_id
+            JOIN playlists p ON p.playlist_id = pt.playlist_id
+            LEFT JOIN artists a ON a.artist_id = r.artist_id
+            GROUP BY r.artist_id
+        """).rowcount
+        return added - removed
+
+    def _refresh_all(self, db, artists_added):
+        """Apply the refreshed categories' changes to the corpus-wide ('*') rows"""
+        features = ', '.join(f"f.{feature}" for feature in AUDIO_FEATURE_COLUMNS)
+        where = "WHERE p.category IN (SELECT category FROM refresh_categories)"
+        if db.execute("SELECT 1 FROM agg_all_totals").fetchone() is None:
+            # First refresh (or aggregates built before agg_all_tracks existed): fold in every track
+            for table in ('agg_popularity', 'agg_features'):
+                db.execute(f"DELETE FROM {table} WHERE category = ?", (ALL,))
+            db.execute("DELETE FROM agg_all_tracks")
+            db.execute("INSERT INTO agg_all_totals VALUES (0, 0, (SELECT COUNT(*) FROM agg_artist_reach), 0, 0)")
+            where = ""
+            artists_added = 0
+
+        # Tracks whose popularity or features differ from what they last contributed (or never did)
+        db.execute("CREATE TEMP TABLE IF NOT EXISTS all_changes AS SELECT * FROM agg_all_tracks WHERE 0")
+        db.execute("DELETE FROM all_changes")
+        db.execute(f"""
+            INSERT INTO all_changes
+            SELECT x.track_id, t.popularity, {features}
+            FROM (SELECT DISTINCT pt.track_id FROM playlists p JOIN playlist_tracks pt ON pt.playlist_id = p.playlist_id {where}) x
+            LEFT JOIN tracks t ON t.track_id = x.track_id
+            LEFT JOIN audio_features f ON f.track_id = x.track_id
+            EXCEPT SELECT * FROM agg_all_tracks
+        """)
+        # +1 rows add the new contribution, -1 rows take back the old one
+        deltas = """
+            SELECT 1 AS sign, * FROM all_changes
+            UNION ALL
+            SELECT -1, s.* FROM agg_all_tracks s JOIN all_changes c ON c.track_id = s.track_id
+        """
+
+        tracks, rated, popularity = db.execute(f"""
+            SELECT TOTAL(sign), TOTAL(CASE WHEN popularity IS NOT NULL THEN sign END), TOTAL(sign * popularity) FROM ({deltas})
+        """).fetchone()
+        db.execute(
+            "UPDATE agg_all_totals SET tracks = tracks + ?, artists = artists + ?, rated_tracks = rated_tracks + ?, sum_popularity = sum_popularity + ?",
+            (int(tracks), artists_added, int(rated), int(popularity))
+        )
+
+        db.executemany(
+            """INSERT INTO agg_popularity (category, bucket, tracks) VALUES (?, ?, ?)
+               ON CONFLICT(category, bucket) DO UPDATE SET tracks = tracks + excluded.tracks""",
+            [(ALL,) + row for row in db.execute(
+                f"SELECT (popularity / 10) * 10, SUM(sign) FROM ({deltas}) WHERE popularity IS NOT NULL GROUP BY 1"
+            )]
+        )
+        db.execute("DELETE FROM agg_popularity WHERE category = ? AND tracks = 0", (ALL,))
+
+        # Same per-feature sums as _refresh_categories, counted only where feature and popularity are both known
+        sums = ', '.join(
+            f"TOTAL(CASE WHEN {f} IS NOT NULL AND popularity IS NOT NULL THEN sign END), "
+            f"TOTAL(CASE WHEN popularity IS NOT NULL THEN sign * {f} END), "
+            f"TOTAL(CASE WHEN popularity IS NOT NULL THEN sign * {f} * {f} END), "
+            f"TOTAL(CASE WHEN {f} IS NOT NULL THEN sign * popularity END), "
+            f"TOTAL(CASE WHEN {f} IS NOT NULL THEN sign * popularity * popularity END), "
+            f"TOTAL(sign * {f} * popularity)"
+            for f in AUDIO_FEATURE_COLUMNS
+        )
+        row = db.execute(f"SELECT {sums} FROM ({deltas})").fetchone()
+        db.executemany(
+            """INSERT INTO agg_features (category, feature, n, sum_x, sum_xx, sum_y, sum_yy, sum_xy) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(category, feature) DO UPDATE SET n = n + excluded.n, sum_x = sum_x + excluded.sum_x,
+                   sum_xx = sum_xx + excluded.sum_xx, sum_y = sum_y + excluded.sum_y,
+                   sum_yy = sum_yy + excluded.sum_yy, sum_xy = sum_xy + excluded.sum_xy""",
+            [(ALL, feature, int(row[6 * i])) + row[6 * i + 1:6 * i + 6] for i, feature in enumerate(AUDIO_FEATURE_COLUMNS)]
+        )
+
+        db.execute("INSERT OR REPLACE INTO agg_all_tracks SELECT * FROM all_changes")
+        db.execute("""
+            INSERT OR REPLACE INTO agg_category_summary (category, playlists, tracks, artists, avg_popularity, refreshed_at, version)
+            SELECT ?, (SELECT COUNT(*) FROM playlists), tracks, artists,
+                   CASE WHEN rated_tracks THEN CAST(sum_popularity AS REAL) / rated_tracks END, ?,
+                   COALESCE((SELECT version FROM agg_category_summary WHERE category = ?), 0) + 1
+            FROM agg_all_totals
+        """, (ALL, time.time(), ALL))
+
+    def start_refresher(self, interval=30):
+        """Refresh dirty categories from a background thread every interval seconds"""
+        if self.refresher is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"❌ Aggregate refresh failed: {str(e)}")
+
+        self.refresher = threading.Thread(target=loop, daemon=True)
+        self.refresher.start()
+
+    # Endpoint payloads, read from the aggregate tables only
+
+    def categories(self):
+        rows = self.store.query(
+            "SELECT category, playlists, tracks, artists, avg_popularity, refreshed_at FROM agg_category_summary ORDER BY tracks DESC"
+        )
+        return [dict(zip(('category', 'playlists', 'tracks', 'artists', 'avg_popularity', 'refreshed_at'), row)) for row in rows]
+
+    def popularity(self, category=ALL):
+        rows = self.store.query("SELECT bucket, tracks FROM agg_popularity WHERE category = ? ORDER BY bucket", (category,))
+        return {'category': category, 'buckets': [{'bucket': bucket, 'tracks': tracks} for bucket, tracks in rows]}
+
+    def features(self, category=ALL):
+        """Mean, standard deviation and correlation with popularity for each audio feature"""
+        features = {}
+        for feature, n, sum_x, sum_xx, sum_y, sum_yy, sum_xy in self.store.query(
+                "SELECT feature, n, sum_x, sum_xx, sum_y, sum_yy, sum_xy FROM agg_features WHERE category = ?", (category,)):
+            if not n:
+                continue
+            var_x = max(sum_xx / n - (sum_x / n) ** 2, 0.0)
+            var_y = max(sum_yy / n - (sum_y / n) ** 2, 0.0)
+            covariance = sum_xy / n - (sum_x / n) * (sum_y / n)
+            features[feature] = {
+                'n': n,
+                'mean': sum_x / n,
+                'std': math.sqrt(var_x),
+                'popularity_r': covariance / math.sqrt(var_x * var_y) if var_x > 0 and var_y > 0 else None,
+            }
+        return {'category': category, 'features': features}
+
+    def artist_reach(self, limit=50, max_popularity=100):
+        rows = self.store.query("""
+            SELECT artist_id, name, popularity, categories, playlists, tracks FROM agg_artist_reach
+            WHERE COALESCE(popularity, 0) <= ? ORDER BY categories DESC, playlists DESC LIMIT ?
+        """, (max_popularity, limit))
+        return [dict(zip(('artist_id', 'name', 'popularity', 'categories', 'playlists', 'tracks'), row)) for row in rows]
+
+    def version(self, category):
+        rows = self.store.query("SELECT version FROM agg_category_summary WHERE category = ?", (category,))
+        return rows[0][0] if rows else 0
+
+    def response(self, endpoint, category=ALL, **params):
+        """(JSON bytes, ETag) for an endpoint, rendered once per aggregate version"""
+        # The version is read before rendering: a body rendered from pre-refresh rows is
+        # cached under the old version, which no reader asks for once the refresh commits
+        version = self.version(category if endpoint in ('popularity', 'features') else ALL)
+        key = (endpoint, category, version, tuple(sorted(params.items())))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        if endpoint == 'categories':
+            payload = self.categories()
+        elif endpoint == 'popularity':
+            payload = self.popularity(category)
+        elif endpoint == 'features':
+            payload = self.features(category)
+        elif endpoint == 'artist_reach':
+            payload = self.artist_reach(**params)
+        else:
+            raise ValueError(f"Unknown dashboard endpoint: {endpoint}")
+        body = json.dumps(payload).encode('utf-8')
+        etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        self.cache.put(key, (body, etag))
+        return body, etag
+
+    def print_stats(self):
+        cache = self.cache.stats
+        print(f"\n📈 Dashboard Aggregates:")
+        print(f"   • Refreshes: {self.stats['refreshes']} ({self.stats['categories_refreshed']} categories, {self.stats['refresh_seconds']:.2f}s)")
+        print(f"   • Pending dirty categories: {len(self.dirty_categories())}")
+        print(f"   • Response cache: {cache['hits']:,} hits, {cache['misses']:,} misses, {cache['invalidated']:,} invalidated")
+
+
+def create_app(aggregates, max_age=60, refresh_interval=30):
+    """Flask app serving the dashboard JSON endpoints from the aggregate cache"""
+    if Flask is None:
+        raise RuntimeError("Flask is not installed - pip install flask")
+    app = Flask(__name__)
+    if refresh_interval:
+        aggregates.start_refresher(refresh_interval)
+
+    def respond(endpoint, category=ALL, **params):
+        body, etag = aggregates.response(endpoint, category, **params)
+        headers = {'ETag': etag, 'Cache-Control': f'public, max-age={max_age}'}
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=304, headers=headers)
+        return Response(body, mimetype='application/json', headers=headers)
+
+    @app.route('/api/categories')
+    def categories():
+        return respond('categories')
+
+    @app.route('/api/popularity', defaults={'category': ALL})
+    @app.route('/api/categories/<category>/popularity')
+    def popularity(category):
+        return respond('popularity', category)
+
+    @app.route('/api/features', defaults={'category': ALL})
+    @app.route('/api/categories/<category>/features')
+    def features(category):
+        return respond('features', category)
+
+    @app.route('/api/artists/reach')
+    def artist_reach():
+        return respond('artist_reach', limit=request.args.get('limit', 50, type=int),
+                       max_popularity=request.args.get('max_popularity', 100, type=int))
+
+    return app
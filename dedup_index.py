@@ -0,0 +1,137 @@
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+
+# How long a fetched entity counts as current, in seconds. Audio features
+# never change; artist popularity and followers drift week to week.
+DEFAULT_TTLS = {
+    'tracks': 7 * 24 * 3600,
+    'artists': 7 * 24 * 3600,
+    'audio_features': 90 * 24 * 3600,
+}
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over a bytearray (no false negatives)"""
+
+    def __init__(self, capacity=1000000, error_rate=0.01):
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class SeenIndex:
+    """Persistent record of which tracks, artists and audio features were already fetched
+
+    SQLite holds every (kind, ID) with the time it was fetched; a Bloom
+    filter rebuilt from it on open answers "never seen" without touching
+    disk, which is the common case on a first crawl. Entries older than the
+    kind's TTL count as stale so they get fetched again. Past `capacity`
+    entries the filter only lets more lookups through to SQLite - answers
+    stay correct.
+    """
+
+    def __init__(self, path='data/seen_index.sqlite', ttls=None, capacity=1000000, error_rate=0.01):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS seen (
+                kind TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (kind, item_id)
+            ) WITHOUT ROWID
+        """)
+        self.db.commit()
+        self.stats = {'bloom_negatives': 0, 'disk_lookups': 0, 'false_positives': 0, 'fresh': 0, 'stale': 0, 'marked': 0}
+
+        self.bloom = BloomFilter(capacity, error_rate)
+        for kind, item_id in self.db.execute("SELECT kind, item_id FROM seen"):
+            self.bloom.add(f"{kind}:{item_id}")
+
+    def is_fresh(self, kind, item_id):
+        """True if this entity was fetched within its TTL and can be skipped"""
+        key = f"{kind}:{item_id}"
+        with self.lock:
+            if key not in self.bloom:
+                self.stats['bloom_negatives'] += 1
+                return False
+            self.stats['disk_lookups'] += 1
+            row = self.db.execute(
+                "SELECT fetched_at FROM seen WHERE kind = ? AND item_id = ?", (kind, item_id)
+            ).fetchone()
+            if row is None:
+                self.stats['false_positives'] += 1
+                return False
+            fresh = row[0] + self.ttls.get(kind, 0) > time.time()
+            self.stats['fresh' if fresh else 'stale'] += 1
+            return fresh
+
+    def mark(self, kind, item_ids):
+        """Record that these entities were just fetched"""
+        item_ids = list(item_ids)
+        if not item_ids:
+            return
+        now = time.time()
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO seen (kind, item_id, fetched_at) VALUES (?, ?, ?)",
+                [(kind, item_id, now) for item_id in item_ids]
+            )
+            self.db.commit()
+            for item_id in item_ids:
+                self.bloom.add(f"{kind}:{item_id}")
+            self.stats['marked'] += len(item_ids)
+
+    def forget(self, kind=None, older_than=None):
+        """Drop entries (e.g. to force a full refresh); the filter is rebuilt on next open"""
+        conditions, params = [], []
+        if kind is not None:
+            conditions.append("kind = ?")
+            params.append(kind)
+        if older_than is not None:
+            conditions.append("fetched_at < ?")
+            params.append(time.time() - older_than)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self.lock:
+            self.db.execute(f"DELETE FROM seen{where}", params)
+            self.db.commit()
+
+    def counts(self):
+        with self.lock:
+            return dict(self.db.execute("SELECT kind, COUNT(*) FROM seen GROUP BY kind").fetchall())
+
+    def print_stats(self):
+        print(f"\n🧷 Seen-ID Index Stats:")
+        for kind, count in sorted(self.counts().items()):
+            print(f"   • {kind}: {count:,} known")
+        print(f"   • Ruled out by Bloom filter: {self.stats['bloom_negatives']:,}")
+        print(f"   • Checked on disk: {self.stats['disk_lookups']:,} ({self.stats['false_positives']:,} false positives)")
+        print(f"   • Skipped as fresh: {self.stats['fresh']:,}")
+        print(f"   • Stale, refetched: {self.stats['stale']:,}")
+
+    def close(self):
+        with self.lock:
+            self.db.close()
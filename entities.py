@@ -0,0 +1,393 @@
+import sys
+from array import array
+
+from feature_columns import AUDIO_FEATURE_COLUMNS
+
+# Spotify IDs are 22 base62 characters
+ID_WIDTH = 22
+NAN = float('nan')
+
+
+class StringPool:
+    """Stores each distinct string once; rows refer to it by a 32-bit index"""
+
+    def __init__(self):
+        self.strings = []
+        self.index = {}
+
+    def add(self, value):
+        if value is None:
+            return -1
+        position = self.index.get(value)
+        if position is None:
+            position = len(self.strings)
+            value = sys.intern(value)
+            self.strings.append(value)
+            self.index[value] = position
+        return position
+
+    def get(self, position):
+        return None if position < 0 else self.strings[position]
+
+    def __len__(self):
+        return len(self.strings)
+
+
+class IdColumn:
+    """Fixed-width IDs packed into one bytearray, with an ID -> row lookup
+
+    The lookup is an open-addressing hash table of 32-bit row numbers that
+    compares candidates against the packed bytes, so each ID is stored once:
+    its width in data plus 8-16 bytes of slots.
+    """
+
+    def __init__(self, width=ID_WIDTH):
+        self.width = width
+        self.data = bytearray()
+        self.count = 0
+        # -1 marks an empty slot; the table is kept at most half full
+        self.slots = array('i', [-1]) * 16
+
+    def _key(self, item_id):
+        key = item_id.encode('ascii')
+        if len(key) > self.width:
+            raise ValueError(f"ID longer than {self.width} bytes: {item_id}")
+        return key.ljust(self.width, b'\0')
+
+    def _slot(self, key):
+        """Slot holding key, or the empty slot where it would go"""
+        mask = len(self.slots) - 1
+        slot = hash(key) & mask
+        width = self.width
+        while True:
+            row = self.slots[slot]
+            if row < 0 or self.data[row * width:row * width + width] == key:
+                return slot
+            slot = (slot + 1) & mask
+
+    def find(self, item_id):
+        row = self.slots[self._slot(self._key(item_id))]
+        return None if row < 0 else row
+
+    def append(self, item_id):
+        key = self._key(item_id)
+        row = self.count
+        self.data += key
+        self.count += 1
+        if self.count * 2 > len(self.slots):
+            self._grow()
+        else:
+            self.slots[self._slot(key)] = row
+        return row
+
+    def _grow(self):
+        self.slots = array('i', [-1]) * (len(self.slots) * 2)
+        width = self.width
+        for row in range(self.count):
+            self.slots[self._slot(bytes(self.data[row * width:row * width + width]))] = row
+
+    def get(self, row):
+        start = row * self.width
+        return self.data[start:start + self.width].rstrip(b'\0').decode('ascii')
+
+    def nbytes(self):
+        return len(self.data) + self.slots.itemsize * len(self.slots)
+
+    def __len__(self):
+        return self.count
+
+
+class Artist:
+    __slots__ = ('id', 'name', 'popularity', 'followers', 'genres')
+
+    def __init__(self, id, name, popularity, followers, genres):
+        self.id = id
+        self.name = name
+        self.popularity = popularity
+        self.followers = followers
+        self.genres = genres
+
+    def __repr__(self):
+        return f"Artist({self.id!r}, {self.name!r})"
+
+
+class Track:
+    __slots__ = ('id', 'name', 'popularity', 'duration_ms', 'explicit', 'album_name',
+                 'release_date', 'artist_ids', 'artist_names', 'audio_features')
+
+    def __init__(self, id, name, popularity, duration_ms, explicit, album_name,
+                 release_date, artist_ids, artist_names, audio_features):
+        self.id = id
+        self.name = name
+        self.popularity = popularity
+        self.duration_ms = duration_ms
+        self.explicit = explicit
+        self.album_name = album_name
+        self.release_date = release_date
+        self.artist_ids = artist_ids
+        self.artist_names = artist_names
+        self.audio_features = audio_features
+
+    def __repr__(self):
+        return f"Track({self.id!r}, {self.name!r})"
+
+
+class Playlist:
+    __slots__ = ('id', 'name', 'description', 'owner', 'followers', 'total_tracks',
+                 'public', 'snapshot_id', 'category')
+
+    def __init__(self, id, name, description, owner, followers, total_tracks, public, snapshot_id, category):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.owner = owner
+        self.followers = followers
+        self.total_tracks = total_tracks
+        self.public = public
+        self.snapshot_id = snapshot_id
+        self.category = category
+
+    @classmethod
+    def from_api(cls, playlist, strings, category=None):
+        return cls(
+            playlist['id'],
+            playlist.get('name'),
+            playlist.get('description'),
+            strings.get(strings.add((playlist.get('owner') or {}).get('display_name'))),
+            (playlist.get('followers') or {}).get('total'),
+            (playlist.get('tracks') or {}).get('total'),
+            playlist.get('public'),
+            playlist.get('snapshot_id'),
+            strings.get(strings.add(category)),
+        )
+
+    def __repr__(self):
+        return f"Playlist({self.id!r}, {self.name!r})"
+
+
+class ArtistTable:
+    """Column-per-field artists; unknown numbers are -1 until the full object arrives
+
+    Tracks only carry simplified artists (ID and name), so an artist is first
+    registered as a stub and filled in by a later /artists lookup.
+    """
+
+    def __init__(self, strings):
+        self.strings = strings
+        self.ids = IdColumn()
+        self.names = array('i')
+        self.popularity = array('b')
+        self.followers = array('q')
+        # Tuples of interned genre strings; the shared empty tuple costs nothing
+        self.genres = []
+
+    def ref(self, artist_id, name=None):
+        """Row for an artist, registering a stub if it's new"""
+        row = self.ids.find(artist_id)
+        if row is None:
+            row = self.ids.append(artist_id)
+            self.names.append(self.strings.add(name))
+            self.popularity.append(-1)
+            self.followers.append(-1)
+            self.genres.append(())
+        elif name is not None and self.names[row] < 0:
+            self.names[row] = self.strings.add(name)
+        return row
+
+    def add(self, artist):
+        """Store (or complete) a full artist object"""
+        row = self.ref(artist['id'], artist.get('name'))
+        if artist.get('popularity') is not None:
+            self.popularity[row] = artist['popularity']
+        followers = (artist.get('followers') or {}).get('total')
+        if followers is not None:
+            self.followers[row] = followers
+        genres = artist.get('genres')
+        if genres:
+            self.genres[row] = tuple(self.strings.get(self.strings.add(genre)) for genre in genres)
+        return row
+
+    def __getitem__(self, row):
+        return Artist(
+            self.ids.get(row),
+            self.strings.get(self.names[row]),
+            None if self.popularity[row] < 0 else self.popularity[row],
+            None if self.followers[row] < 0 else self.followers[row],
+            self.genres[row],
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nbytes(self):
+        arrays = (self.names, self.popularity, self.followers)
+        return (self.ids.nbytes() + sum(a.itemsize * len(a) for a in arrays)
+                + sys.getsizeof(self.genres) + sum(sys.getsizeof(g) for g in self.genres if g))
+
+
+class TrackTable:
+    """Column-per-field tracks: packed IDs, typed arrays and pooled strings
+
+    Artists are stored as row references into the ArtistTable (CSR layout:
+    artist_offsets[i]:artist_offsets[i + 1] slices artist_rows), and audio
+    features live in float32 columns aligned with the track rows (NaN until
+    fetched), so they can be handed to NumPy without copying.
+    """
+
+    def __init__(self, strings, artists):
+        self.strings = strings
+        self.artists = artists
+        self.ids = IdColumn()
+        self.names = []
+        self.popularity = array('b')
+        self.duration_ms = array('i')
+        self.explicit = array('b')
+        self.album_names = array('i')
+        self.release_dates = array('i')
+        self.artist_offsets = array('i', [0])
+        self.artist_rows = array('i')
+        self.audio_features = {column: array('f') for column in AUDIO_FEATURE_COLUMNS}
+
+    def add(self, track):
+        """Store a track object; returns its row (existing row if already known)"""
+        row = self.ids.find(track['id'])
+        if row is not None:
+            return row
+        row = self.ids.append(track['id'])
+        album = track.get('album') or {}
+        self.names.append(track.get('name'))
+        self.popularity.append(track.get('popularity') if track.get('popularity') is not None else -1)
+        self.duration_ms.append(track.get('duration_ms') or 0)
+        self.explicit.append(1 if track.get('explicit') else 0)
+        self.album_names.append(self.strings.add(album.get('name')))
+        self.release_dates.append(self.strings.add(album.get('release_date')))
+        for artist in track.get('artists', []):
+            if artist.get('id'):
+                self.artist_rows.append(self.artists.ref(artist['id'], artist.get('name')))
+        self.artist_offsets.append(len(self.artist_rows))
+        for values in self.audio_features.values():
+            values.append(NAN)
+        return row
+
+    def set_audio_features(self, features):
+        row = self.ids.find(features['id'])
+        if row is None:
+            return None
+        for column, values in self.audio_features.items():
+            value = features.get(column)
+            values[row] = NAN if value is None else value
+        return row
+
+    def __getitem__(self, row):
+        artist_rows = self.artist_rows[self.artist_offsets[row]:self.artist_offsets[row + 1]]
+        return Track(
+            self.ids.get(row),
+            self.names[row],
+            None if self.popularity[row] < 0 else self.popularity[row],
+            self.duration_ms[row],
+            bool(self.explicit[row]),
+            self.strings.get(self.album_names[row]),
+            self.strings.get(self.release_dates[row]),
+            [self.artists.ids.get(a) for a in artist_rows],
+            [self.strings.get(self.artists.names[a]) for a in artist_rows],
+            {column: values[row] for column, values in self.audio_features.items()},
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nbytes(self):
+        arrays = [self.popularity, self.duration_ms, self.explicit, self.album_names,
+                  self.release_dates, self.artist_offsets, self.artist_rows]
+        arrays += list(self.audio_features.values())
+        return (self.ids.nbytes() + sum(a.itemsize * len(a) for a in arrays)
+                + sys.getsizeof(self.names) + sum(sys.getsizeof(name) for name in self.names if name))
+
+
+class EntityCorpus:
+    """Compact in-memory model of a crawl: tracks, artists, playlists and membership
+
+    Only the fields used by the analyses are kept. Repeated strings (genres,
+    artist/album names, release dates, owners) are pooled, IDs are packed
+    fixed-width bytes, and numeric fields are typed arrays - a track costs
+    a couple of hundred bytes instead of the kilobytes its JSON dict takes.
+    """
+
+    def __init__(self):
+        self.strings = StringPool()
+        self.artists = ArtistTable(self.strings)
+        self.tracks = TrackTable(self.strings, self.artists)
+        self.playlists = {}
+        self.playlist_ids = StringPool()
+        self.membership = {'playlist': array('i'), 'track': array('i'), 'position': array('i')}
+
+    def add_track(self, track):
+        return self.tracks.add(track)
+
+    def add_artist(self, artist):
+        return self.artists.add(artist)
+
+    def add_audio_features(self, features):
+        return self.tracks.set_audio_features(features)
+
+    def add_playlist(self, playlist, category=None):
+        self.playlists[playlist['id']] = Playlist.from_api(playlist, self.strings, category)
+
+    def add_playlist_track(self, playlist_id, position, track):
+        """Record that track sits at position in playlist (storing the track if new)"""
+        row = self.tracks.add(track)
+        self.membership['playlist'].append(self.playlist_ids.add(playlist_id))
+        self.membership['track'].append(row)
+        self.membership['position'].append(position)
+        return row
+
+    def track(self, track_id):
+        row = self.tracks.ids.find(track_id)
+        return None if row is None else self.tracks[row]
+
+    def artist(self, artist_id):
+        row = self.artists.ids.find(artist_id)
+        return None if row is None else self.artists[row]
+
+    def iter_tracks(self):
+        for row in range(len(self.tracks)):
+            yield self.tracks[row]
+
+    def playlist_tracks(self, playlist_id):
+        """Track IDs of a playlist, in position order"""
+        playlist_row = self.playlist_ids.index.get(playlist_id)
+        rows = [(position, track) for p, track, position in zip(*self.membership.values()) if p == playlist_row]
+        return [self.tracks.ids.get(track) for _, track in sorted(rows)]
+
+    def audio_feature_matrix(self):
+        """AudioFeatureMatrix over every track that has features
+
+        The feature columns are read in place with np.frombuffer, but
+        column_stack copies them into one row-major matrix.
+        """
+        import numpy as np
+
+        from audio_analytics import AudioFeatureMatrix
+
+        features = np.column_stack([np.frombuffer(self.tracks.audio_features[c], dtype=np.float32)
+                                    for c in AUDIO_FEATURE_COLUMNS])
+        popularity = np.frombuffer(self.tracks.popularity, dtype=np.int8).astype(np.float32)
+        popularity[popularity < 0] = np.nan
+        track_ids = [self.tracks.ids.get(row) for row in range(len(self.tracks))]
+        return AudioFeatureMatrix(features, popularity, track_ids=track_ids)
+
+    def nbytes(self):
+        """Approximate memory held by the corpus"""
+        membership = sum(a.itemsize * len(a) for a in self.membership.values())
+        pools = sum(sys.getsizeof(s) for s in self.strings.strings) + sys.getsizeof(self.strings.index)
+        playlists = sum(sys.getsizeof(p) for p in self.playlists.values()) + sys.getsizeof(self.playlists)
+        return self.tracks.nbytes() + self.artists.nbytes() + membership + pools + playlists
+
+    def print_stats(self):
+        print(f"\n🧬 Entity Corpus:")
+        print(f"   • Tracks: {len(self.tracks):,}")
+        print(f"   • Artists: {len(self.artists):,}")
+        print(f"   • Playlists: {len(self.playlists):,}")
+        print(f"   • Playlist entries: {len(self.membership['track']):,}")
+        print(f"   • Distinct pooled strings: {len(self.strings):,}")
+        print(f"   • Approximate size: {self.nbytes() / (1024 * 1024):.1f}MB")
@@ -0,0 +1,6 @@
+# Audio-feature columns analysed throughout the project, in storage order.
+# Kept free of imports so compact in-memory code doesn't pull in pyarrow.
+AUDIO_FEATURE_COLUMNS = [
+    'danceability', 'energy', 'valence', 'tempo', 'acousticness',
+    'speechiness', 'loudness', 'instrumentalness', 'liveness',
+]
@@ -0,0 +1,298 @@
+import argparse
+import glob
+import gzip
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from metrics import LatencyHistogram, endpoint_template
+
+SEPARATORS = re.compile(r'[\s\[,]*')
+# Longest undecodable stretch iter_json_array buffers before calling the array malformed
+MAX_RECORD_CHARS = 1024 * 1024
+
+
+def open_log(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def iter_json_array(f, chunk_size=1024 * 1024, max_record=MAX_RECORD_CHARS):
+    """Yield the objects of a top-level JSON array without loading the whole file
+
+    An object that still doesn't decode with max_record characters buffered
+    is malformed, not cut off at a chunk boundary - that raises right away
+    instead of reading the rest of the file first.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    while True:
+        # Skip whitespace, the opening bracket and separators between objects
+        position = SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        if position < len(buffer):
+            try:
+                obj, position = decoder.raw_decode(buffer, position)
+                yield obj
+                continue
+            except json.JSONDecodeError:
+                if eof or len(buffer) - position >= max_record:
+                    raise
+        if eof:
+            return
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        # Drop what's been decoded once per chunk rather than once per object
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def iter_records(path):
+    """Stream request records from a .json array log or a (gzipped) JSON Lines log"""
+    with open_log(path) as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        if first == '[':
+            records = iter_json_array(f)
+        else:
+            records = (json.loads(line) for line in _prepend(first, f) if line.strip())
+        for record in records:
+            # Logs can sit next to other JSON Lines files - keep request records only
+            if isinstance(record, dict) and 'endpoint' in record and 'status_code' in record:
+                yield record
+
+
+def _prepend(first, f):
+    line = first + f.readline()
+    yield line
+    yield from f
+
+
+def _column(frame, name, default=np.nan):
+    return frame[name] if name in frame else pd.Series(default, index=frame.index)
+
+
+def _header_float(frame, name):
+    """A rate-limit header as floats, NaN where it's missing or not a number"""
+    return pd.to_numeric(_column(frame, f'rate_limit_headers.{name}'), errors='coerce').to_numpy(np.float64)
+
+
+class RequestLogAnalyzer:
+    """Aggregates any number of request logs in fixed-size vectorized chunks
+
+    Records are decoded one chunk at a time into NumPy columns (template
+    index, status, latency, timestamp, rate-limit headers) with
+    pd.json_normalize; everything kept between chunks is a small aggregate,
+    so memory doesn't grow with log size. Records without a usable
+    timestamp are dropped and counted in skipped.
+    """
+
+    def __init__(self, chunk_size=100000, window_seconds=60):
+        self.chunk_size = chunk_size
+        self.window_seconds = window_seconds
+        self.templates = {}
+        self.histograms = {}
+        self.requests = {}
+        self.errors = {}
+        self.requests_per_window = {}
+        self.rate_limited_per_window = {}
+        self.retry_after = LatencyHistogram(minimum=0.001)
+        self.limit_headers = {}
+        self.total = 0
+        self.skipped = 0
+        self.files = 0
+
+    def add_file(self, path):
+        self.files += 1
+        chunk = []
+        for record in iter_records(path):
+            chunk.append(record)
+            if len(chunk) >= self.chunk_size:
+                self.add_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.add_chunk(chunk)
+
+    def _template_ids(self, endpoints):
+        # Templated once per distinct endpoint in the chunk, then broadcast back
+        codes, uniques = pd.factorize(endpoints)
+        ids = np.fromiter((self.templates.setdefault(endpoint_template(endpoint), len(self.templates)) for endpoint in uniques),
+                          dtype=np.int32, count=len(uniques))
+        return ids[codes]
+
+    def _accumulate(self, target, keys, counts):
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            target[key] = target.get(key, 0) + count
+
+    def add_chunk(self, records):
+        frame = pd.json_normalize(records)
+        timestamps = pd.to_datetime(_column(frame, 'timestamp', None), errors='coerce', utc=True, format='ISO8601')
+        # Without a timestamp a record can't be placed in a window
+        dated = timestamps.notna().to_numpy()
+        self.skipped += int((~dated).sum())
+        frame, timestamps = frame[dated], timestamps[dated]
+        self.total += len(frame)
+        if not len(frame):
+            return
+
+        template_ids = self._template_ids(frame['endpoint'])
+        status = frame['status_code'].to_numpy(np.int16)
+        latency = pd.to_numeric(_column(frame, 'response_time_ms'), errors='coerce').to_numpy(np.float64)
+        seconds = ((timestamps - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)).to_numpy(np.int64)
+        windows = seconds // self.window_seconds
+
+        # Per-template latency histograms, request counts and error counts
+        order = np.argsort(template_ids, kind='stable')
+        sorted_ids = template_ids[order]
+        boundaries = np.flatnonzero(np.diff(sorted_ids)) + 1
+        for group in np.split(order, boundaries):
+            template_id = int(template_ids[group[0]])
+            values = latency[group]
+            self.histograms.setdefault(template_id, LatencyHistogram()).record_many(values[~np.isnan(values)])
+            self.requests[template_id] = self.requests.get(template_id, 0) + len(group)
+            self.errors[template_id] = self.errors.get(template_id, 0) + int((status[group] >= 400).sum())
+
+        # Requests and 429s per time window
+        self._accumulate(self.requests_per_window, *np.unique(windows, return_counts=True))
+        limited = status == 429
+        if limited.any():
+            self._accumulate(self.rate_limited_per_window, *np.unique(windows[limited], return_counts=True))
+
+        retry_after = _header_float(frame, 'Retry-After')
+        self.retry_after.record_many(retry_after[~np.isnan(retry_after)])
+        limits = _header_float(frame, 'X-RateLimit-Limit')
+        limits = limits[~np.isnan(limits)]
+        if limits.size:
+            self._accumulate(self.limit_headers, *np.unique(limits, return_counts=True))
+
+    def rate_limit_clusters(self):
+        """Runs of consecutive windows that saw at least one 429"""
+        clusters = []
+        for window in sorted(self.rate_limited_per_window):
+            count = self.rate_limited_per_window[window]
+            if clusters and window - clusters[-1]['end'] <= 1:
+                clusters[-1]['end'] = window
+                clusters[-1]['rate_limited'] += count
+            else:
+                clusters.append({'start': window, 'end': window, 'rate_limited': count})
+        for cluster in clusters:
+            cluster['start'] = str(np.datetime64(cluster['start'] * self.window_seconds, 's'))
+            cluster['end'] = str(np.datetime64((cluster['end'] + 1) * self.window_seconds, 's'))
+        return clusters
+
+    def rate_limit_ceiling(self):
+        """Estimate the sustainable request rate from where 429s did and didn't happen"""
+        windows = np.array(sorted(self.requests_per_window), dtype=np.int64)
+        if not windows.size:
+            return {}
+        counts = np.array([self.requests_per_window[w] for w in windows.tolist()], dtype=np.float64)
+        limited = np.isin(windows, np.fromiter(self.rate_limited_per_window, dtype=np.int64))
+        rates = counts / self.window_seconds
+
+        estimate = {
+            'highest_rate_without_429': float(rates[~limited].max()) if (~limited).any() else None,
+            'lowest_rate_with_429': float(rates[limited].min()) if limited.any() else None,
+            'retry_after': self.retry_after.summary() if self.retry_after.count else None,
+            'x_ratelimit_limit': {float(k): v for k, v in self.limit_headers.items()} or None,
+        }
+        # With no throttling observed, the ceiling is only known to be above our peak
+        safe, limited_rate = estimate['highest_rate_without_429'], estimate['lowest_rate_with_429']
+        if limited_rate is None:
+            estimate['ceiling_req_per_s'] = f">= {safe:.2f}"
+        elif safe is None or safe >= limited_rate:
+            estimate['ceiling_req_per_s'] = f"~{limited_rate:.2f}"
+        else:
+            estimate['ceiling_req_per_s'] = f"{safe:.2f}-{limited_rate:.2f}"
+        return estimate
+
+    def report(self):
+        names = {template_id: template for template, template_id in self.templates.items()}
+        templates = {}
+        for template_id, histogram in self.histograms.items():
+            summary = histogram.summary()
+            summary['requests'] = self.requests[template_id]
+            summary['error_rate'] = self.errors[template_id] / self.requests[template_id]
+            templates[names[template_id]] = summary
+        return {
+            'files': self.files,
+            'requests': self.total,
+            'skipped_without_timestamp': self.skipped,
+            'templates': templates,
+            'rate_limit_clusters': self.rate_limit_clusters(),
+            'rate_limit_estimate': self.rate_limit_ceiling(),
+        }
+
+    def print_report(self):
+        report = self.report()
+        print("\n" + "="*70)
+        print("📜 REQUEST LOG ANALYSIS")
+        print("="*70)
+        print(f"   • Files analyzed: {report['files']}")
+        print(f"   • Requests: {report['requests']:,}")
+        if report['skipped_without_timestamp']:
+            print(f"   • Skipped (no timestamp): {report['skipped_without_timestamp']:,}")
+
+        print("\n⏱️  Latency by endpoint template:")
+        for template, summary in sorted(report['templates'].items(), key=lambda item: -item[1]['requests']):
+            print(f"   • {template}")
+            print(f"      {summary['requests']:,} requests, {summary['error_rate']*100:.1f}% errors")
+            print(f"      p50 {summary['p50']:.1f}ms | p95 {summary['p95']:.1f}ms | p99 {summary['p99']:.1f}ms | max {summary['max']:.1f}ms")
+
+        clusters = report['rate_limit_clusters']
+        print(f"\n⚠️  429 clusters: {len(clusters)}")
+        for cluster in clusters[:20]:
+            print(f"   • {cluster['start']} → {cluster['end']}: {cluster['rate_limited']} rate-limited requests")
+
+        estimate = report['rate_limit_estimate']
+        if estimate:
+            print("\n🚦 Rate-limit ceiling estimate:")
+            print(f"   • Estimated ceiling: {estimate['ceiling_req_per_s']} req/s")
+            if estimate['retry_after']:
+                print(f"   • Retry-After: mean {estimate['retry_after']['mean']:.1f}s, max {estimate['retry_after']['max']:.1f}s")
+            if estimate['x_ratelimit_limit']:
+                print(f"   • X-RateLimit-Limit values seen: {estimate['x_ratelimit_limit']}")
+        return report
+
+
+def default_log_paths():
+    paths = sorted(glob.glob('request_log_*.json') + glob.glob('request_log_*.jsonl*'))
+    if os.path.exists('requests.jsonl'):
+        paths.append('requests.jsonl')
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze historical Spotify request logs")
+    parser.add_argument('paths', nargs='*', help="request_log_*.json / *.jsonl / *.jsonl.gz files (default: all in the current directory)")
+    parser.add_argument('--window', type=int, default=60, help="time window in seconds for 429 clustering and rate estimates")
+    parser.add_argument('--json', dest='json_path', help="also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    paths = args.paths or default_log_paths()
+    if not paths:
+        print("❌ No request logs found")
+        return None
+
+    analyzer = RequestLogAnalyzer(window_seconds=args.window)
+    for path in paths:
+        analyzer.add_file(path)
+    report = analyzer.print_report()
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report saved to '{args.json_path}'")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+# Path segments that follow one of these are IDs: /playlists/{id}/tracks
+ID_COLLECTIONS = {'artists', 'albums', 'tracks', 'playlists', 'audio-features', 'categories', 'users', 'shows', 'episodes'}
+# Query parameters whose value defines the endpoint; the rest are masked or dropped
+TEMPLATE_KEEP_VALUES = {'type'}
+TEMPLATE_DROP = {'limit', 'offset', 'market', 'country', 'locale'}
+
+
+def endpoint_template(endpoint):
+    """Normalize an endpoint into a template, e.g. '/search?q=*&type=artist'"""
+    parts = urlsplit(endpoint)
+    path = parts.path
+    if path.startswith('/v1/'):
+        path = path[3:]
+
+    segments = path.split('/')
+    for i in range(1, len(segments)):
+        if segments[i - 1] in ID_COLLECTIONS and segments[i]:
+            segments[i] = '{id}'
+    template = '/'.join(segments)
+
+    query = []
+    for key, value in parse_qsl(parts.query, keep_blank_values=True):
+        if key in TEMPLATE_DROP:
+            continue
+        query.append(f"{key}={value if key in TEMPLATE_KEEP_VALUES else '*'}")
+    if query:
+        template += '?' + '&'.join(query)
+    return template
+
+
+class LatencyHistogram:
+    """Streaming log-bucketed histogram: O(1) inserts, mergeable, ~2% relative error"""
+
+    def __init__(self, precision=0.02, minimum=0.01):
+        self.growth = math.log1p(precision)
+        self.minimum = minimum
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _bucket(self, value):
+        if value <= self.minimum:
+            return 0
+        return int(math.log(value / self.minimum) / self.growth) + 1
+
+    def _bucket_value(self, bucket):
+        # Upper bound of the bucket, so percentiles never under-report
+        return self.minimum * math.exp(bucket * self.growth)
+
+    def record(self, value, count=1):
+        bucket = self._bucket(value)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += count
+        self.total += value * count
+        if value > self.max:
+            self.max = value
+
+    def record_many(self, values):
+        """Vectorized bulk insert of a NumPy array of values"""
+        import numpy as np
+
+        values = np.asarray(values, dtype=np.float64)
+        if not values.size:
+            return
+        with np.errstate(divide='ignore'):
+            buckets = np.where(
+                values <= self.minimum, 0,
+                np.floor(np.log(np.maximum(values, self.minimum) / self.minimum) / self.growth) + 1,
+            ).astype(np.int64)
+        unique, counts = np.unique(buckets, return_counts=True)
+        for bucket, count in zip(unique.tolist(), counts.tolist()):
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += int(values.size)
+        self.total += float(values.sum())
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other):
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, q):
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= target:
+                return min(self._bucket_value(bucket), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': self.max,
+        }
+
+
+class RequestMetrics:
+    """Live request instrumentation: latency histograms, throughput, bytes, limiter waits
+
+    Latencies (ms) are tracked per endpoint template, per status code and per
+    time window; only the last `windows` windows are retained.
+    """
+
+    def __init__(self, window_seconds=60, windows=60):
+        self.window_seconds = window_seconds
+        self.by_template = {}
+        self.by_status = {}
+        self.by_window = deque(maxlen=windows)
+        self.requests = 0
+        self.bytes = 0
+        self.wait_seconds = 0.0
+        self.lock = threading.Lock()
+        self.server = None
+
+    def observe(self, endpoint, status_code, elapsed_seconds, nbytes=0):
+        latency_ms = elapsed_seconds * 1000
+        template = endpoint_template(endpoint)
+        now = time.time()
+        window = int(now // self.window_seconds)
+        with self.lock:
+            self.requests += 1
+            self.bytes += nbytes
+            self.by_template.setdefault(template, LatencyHistogram()).record(latency_ms)
+            self.by_status.setdefault(status_code, LatencyHistogram()).record(latency_ms)
+            if not self.by_window or self.by_window[-1][0] != window:
+                # With when its first request was seen - a run may start mid-window
+                self.by_window.append((window, LatencyHistogram(), now))
+            self.by_window[-1][1].record(latency_ms)
+
+    def observe_wait(self, seconds):
+        """Time a request spent queued behind the rate limiter"""
+        if seconds > 0:
+            with self.lock:
+                self.wait_seconds += seconds
+
+    def overall(self):
+        with self.lock:
+            merged = LatencyHistogram()
+            for histogram in self.by_status.values():
+                merged.merge(histogram)
+            return merged
+
+    def window_summaries(self):
+        """[(window start timestamp, latency summary)] for the retained windows"""
+        with self.lock:
+            return [(window * self.window_seconds, h.summary()) for window, h, _ in self.by_window]
+
+    def requests_per_second(self):
+        """Throughput over the current window"""
+        with self.lock:
+            if not self.by_window:
+                return 0.0
+            _, histogram, first_seen = self.by_window[-1]
+            # Measured from the window's first request, not its start
+            elapsed = max(time.time() - first_seen, 1e-9)
+            return histogram.count / min(elapsed, self.window_seconds)
+
+    def print_stats(self):
+        overall = self.overall().summary()
+        print(f"\n📈 Latency & Throughput:")
+        print(f"   • p50 / p95 / p99: {overall['p50']:.1f} / {overall['p95']:.1f} / {overall['p99']:.1f} ms")
+        print(f"   • Max latency: {overall['max']:.1f}ms")
+        print(f"   • Throughput: {self.requests_per_second():.2f} req/s")
+        print(f"   • Bytes received: {self.bytes:,}")
+        print(f"   • Time waiting on rate limiter: {self.wait_seconds:.2f}s")
+        with self.lock:
+            templates = {t: h.summary() for t, h in self.by_template.items()}
+        for template, summary in sorted(templates.items()):
+            print(f"   • {template}: p50 {summary['p50']:.1f}ms, p99 {summary['p99']:.1f}ms ({summary['count']} requests)")
+
+    def prometheus_text(self):
+        """Snapshot in the Prometheus text exposition format
+
+        Latency is a summary per endpoint template, status codes are a
+        separate counter, and each retained time window is exported as its
+        own gauge series labeled with the window's start timestamp.
+        """
+        lines = [
+            '# TYPE spotify_request_latency_ms summary',
+        ]
+        with self.lock:
+            for template, histogram in sorted(self.by_template.items()):
+                labels = 'template="{}"'.format(template.replace('\\', '\\\\').replace('"', '\\"'))
+                for q in (0.5, 0.95, 0.99):
+                    lines.append(f'spotify_request_latency_ms{{{labels},quantile="{q}"}} {histogram.percentile(q):.3f}')
+                lines.append(f'spotify_request_latency_ms_sum{{{labels}}} {histogram.total:.3f}')
+                lines.append(f'spotify_request_latency_ms_count{{{labels}}} {histogram.count}')
+            lines.append('# TYPE spotify_responses_total counter')
+            for status, histogram in sorted(self.by_status.items()):
+                lines.append(f'spotify_responses_total{{status="{status}"}} {histogram.count}')
+            lines += [
+                '# TYPE spotify_requests_total counter',
+                f'spotify_requests_total {self.requests}',
+                '# TYPE spotify_response_bytes_total counter',
+                f'spotify_response_bytes_total {self.bytes}',
+                '# TYPE spotify_rate_limiter_wait_seconds_total counter',
+                f'spotify_rate_limiter_wait_seconds_total {self.wait_seconds:.3f}',
+            ]
+        windows = self.window_summaries()
+        lines.append('# TYPE spotify_window_latency_ms gauge')
+        for start, summary in windows:
+            for q, key in ((0.5, 'p50'), (0.95, 'p95'), (0.99, 'p99')):
+                lines.append(f'spotify_window_latency_ms{{window_start="{start}",quantile="{q}"}} {summary[key]:.3f}')
+        lines.append('# TYPE spotify_window_requests gauge')
+        for start, summary in windows:
+            lines.append(f'spotify_window_requests{{window_start="{start}"}} {summary["count"]}')
+        lines += [
+            '# TYPE spotify_requests_per_second gauge',
+            f'spotify_requests_per_second {self.requests_per_second():.3f}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Write a snapshot file (e.g. for node_exporter's textfile collector)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def serve(self, port=9108, host='127.0.0.1'):
+        """Expose /metrics on a local port from a background thread"""
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server
@@ -0,0 +1,608 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from pagination import with_query
+from rate_limiter import endpoint_family
+
+BASE62 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+RECORDED_BASE_URL = 'https://api.spotify.com/v1'
+TOKEN_PATH = '/api/token'
+
+CATEGORIES = [
+    'toplists', 'pop', 'hiphop', 'rock', 'latin', 'dance', 'indie', 'rnb', 'country', 'jazz',
+    'classical', 'kpop', 'chill', 'workout', 'mood', 'party', 'focus', 'sleep', 'decades', 'metal',
+]
+GENRES = ['pop', 'dance pop', 'hip hop', 'rap', 'rock', 'indie rock', 'latin', 'r&b', 'country', 'edm', 'k-pop', 'jazz', 'lo-fi']
+WORDS = [
+    'midnight', 'summer', 'golden', 'electric', 'velvet', 'neon', 'echo', 'wild', 'silver', 'ocean',
+    'fire', 'dream', 'city', 'heart', 'river', 'static', 'paper', 'glass', 'honey', 'thunder',
+]
+# Real track and album objects list every market they're available in
+MARKETS = [
+    'AD', 'AE', 'AR', 'AT', 'AU', 'BE', 'BG', 'BO', 'BR', 'CA', 'CH', 'CL', 'CO', 'CR', 'CY', 'CZ', 'DE', 'DK',
+    'DO', 'EC', 'EE', 'EG', 'ES', 'FI', 'FR', 'GB', 'GR', 'GT', 'HK', 'HN', 'HU', 'ID', 'IE', 'IL', 'IN', 'IS',
+    'IT', 'JP', 'KR', 'LT', 'LU', 'LV', 'MA', 'MT', 'MX', 'MY', 'NI', 'NL', 'NO', 'NZ', 'PA', 'PE', 'PH', 'PL',
+    'PT', 'PY', 'RO', 'SA', 'SE', 'SG', 'SK', 'SV', 'TH', 'TR', 'TW', 'US', 'UY', 'VN', 'ZA',
+]
+# Spotify's caps on ?limit= and ?ids= per endpoint family
+MAX_LIMIT = {'playlists': 100, 'default': 50}
+MAX_IDS = {'audio-features': 100, 'default': 50}
+
+
+def spotify_id(kind, key):
+    """Deterministic 22-character base62 ID, shaped like Spotify's"""
+    number = int.from_bytes(hashlib.sha1(f"{kind}:{key}".encode('utf-8')).digest(), 'big')
+    chars = []
+    for _ in range(22):
+        number, digit = divmod(number, 62)
+        chars.append(BASE62[digit])
+    return ''.join(chars)
+
+
+def images(kind, item_id):
+    return [{'url': f"https://i.scdn.co/image/{spotify_id(f'{kind}-image-{size}', item_id)}", 'height': size, 'width': size}
+            for size in (640, 300, 64)]
+
+
+def fixture_key(endpoint):
+    """Normalize an endpoint or URL so recorded and live requests match"""
+    parts = urlsplit(endpoint)
+    path = parts.path
+    if path.startswith('/v1/'):
+        path = path[3:]
+    query = sorted(parse_qsl(parts.query, keep_blank_values=True))
+    return f"{path}?{urlencode(query, safe=',:')}" if query else path
+
+
+def load_fixtures(path):
+    """Load recorded responses from a ResponseCache directory or a JSON file
+
+    A JSON fixture file maps endpoints ('/artists/abc', '/search?q=...') to
+    response bodies. A cache directory (e.g. .spotify_cache) replays every
+    response the real API returned while the cache was enabled.
+    """
+    fixtures = {}
+    index = os.path.join(path, 'index.sqlite')
+    if os.path.isdir(path) and os.path.exists(index):
+        db = sqlite3.connect(index)
+        try:
+            rows = db.execute("SELECT url, body_hash FROM entries").fetchall()
+        finally:
+            db.close()
+        for url, body_hash in rows:
+            try:
+                with open(os.path.join(path, 'objects', body_hash[:2], body_hash[2:]), 'rb') as f:
+                    fixtures[fixture_key(url)] = f.read()
+            except OSError:
+                continue
+    else:
+        with open(path) as f:
+            for endpoint, body in json.load(f).items():
+                content = body if isinstance(body, str) else json.dumps(body)
+                fixtures[fixture_key(endpoint)] = content.encode('utf-8')
+    return fixtures
+
+
+class LatencyModel:
+    """Simulated server latency: none, fixed, uniform or lognormal (milliseconds)"""
+
+    def __init__(self, kind='lognormal', median_ms=80.0, sigma=0.5, low_ms=20.0, high_ms=200.0, seed=None):
+        if kind not in ('none', 'fixed', 'uniform', 'lognormal'):
+            raise ValueError(f"Unknown latency model: {kind}")
+        self.kind = kind
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.low_ms = low_ms
+        self.high_ms = high_ms
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec, seed=None):
+        """Build a model from 'none', 'fixed:50', 'uniform:20:200' or 'lognormal:80:0.5'"""
+        kind, *params = spec.split(':')
+        params = [float(p) for p in params]
+        if kind == 'fixed':
+            return cls(kind, median_ms=params[0], seed=seed)
+        if kind == 'uniform':
+            return cls(kind, low_ms=params[0], high_ms=params[1], seed=seed)
+        if kind == 'lognormal':
+            return cls(kind, *params[:2], seed=seed)
+        return cls(kind, seed=seed)
+
+    def sample(self):
+        """One latency draw, in seconds"""
+        if self.kind == 'none':
+            return 0.0
+        if self.kind == 'fixed':
+            return self.median_ms / 1000
+        with self.lock:
+            if self.kind == 'uniform':
+                return self.rng.uniform(self.low_ms, self.high_ms) / 1000
+            return self.rng.lognormvariate(math.log(self.median_ms), self.sigma) / 1000
+
+
+class SyntheticCatalog:
+    """Deterministic fake Spotify objects: the same ID always yields the same object
+
+    Nothing is stored up front - every artist, track, playlist and audio
+    feature is derived from its ID and the seed, so any ID a client asks
+    for exists and repeated runs see identical data.
+    """
+
+    def __init__(self, seed=0, artists=2000, tracks=50000, playlists_per_category=60, max_playlist_tracks=300):
+        self.seed = seed
+        self.artists = artists
+        self.tracks = tracks
+        self.playlists_per_category = playlists_per_category
+        self.max_playlist_tracks = max_playlist_tracks
+        # Names of top search results, so a search for 'Taylor Swift' finds 'Taylor Swift'
+        self.names = {}
+
+    def _rng(self, *parts):
+        return random.Random(':'.join(str(part) for part in (self.seed,) + parts))
+
+    def _name(self, rng, words=2):
+        return ' '.join(rng.choice(WORDS).title() for _ in range(words))
+
+    def _pick(self, *parts):
+        digest = hashlib.sha1(':'.join(str(part) for part in (self.seed,) + parts).encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big')
+
+    def artist(self, artist_id):
+        rng = self._rng('artist', artist_id)
+        return {
+            'id': artist_id,
+            'type': 'artist',
+            'uri': f"spotify:artist:{artist_id}",
+            'name': self.names.get(artist_id) or self._name(rng),
+            'popularity': rng.randint(0, 100),
+            'followers': {'href': None, 'total': int(rng.lognormvariate(10, 2))},
+            'genres': rng.sample(GENRES, rng.randint(0, 3)),
+            'images': images('artist', artist_id),
+            'href': f"https://api.spotify.com/v1/artists/{artist_id}",
+            'external_urls': {'spotify': f"https://open.spotify.com/artist/{artist_id}"},
+        }
+
+    def album(self, album_id):
+        rng = self._rng('album', album_id)
+        return {
+            'id': album_id,
+            'type': 'album',
+            'uri': f"spotify:album:{album_id}",
+            'name': self._name(rng, 3),
+            'album_type': rng.choice(['album', 'single', 'compilation']),
+            'release_date': f"{rng.randint(1970, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            'release_date_precision': 'day',
+            'total_tracks': rng.randint(1, 20),
+            'images': images('album', album_id),
+            'available_markets': list(MARKETS),
+            'href': f"https://api.spotify.com/v1/albums/{album_id}",
+            'external_urls': {'spotify': f"https://open.spotify.com/album/{album_id}"},
+        }
+
+    def track(self, track_id):
+        rng = self._rng('track', track_id)
+        artist_ids = [spotify_id('artist', rng.randrange(self.artists)) for _ in range(rng.choice([1, 1, 1, 2, 3]))]
+        return {
+            'id': track_id,
+            'type': 'track',
+            'uri': f"spotify:track:{track_id}",
+            'name': self.names.get(track_id) or self._name(rng),
+            'popularity': rng.randint(0, 100),
+            'duration_ms': rng.randint(90000, 360000),
+            'explicit': rng.random() < 0.2,
+            'track_number': rng.randint(1, 12),
+            'disc_number': 1,
+            'is_local': False,
+            'preview_url': f"https://p.scdn.co/mp3-preview/{spotify_id('preview', track_id)}",
+            'available_markets': list(MARKETS),
+            'external_ids': {'isrc': f"US{spotify_id('isrc', track_id)[:10].upper()}"},
+            'href': f"https://api.spotify.com/v1/tracks/{track_id}",
+            'external_urls': {'spotify': f"https://open.spotify.com/track/{track_id}"},
+            'album': self.album(spotify_id('album', rng.randrange(self.tracks // 10))),
+            'artists': [{'id': a, 'name': self.artist(a)['name'], 'type': 'artist'} for a in artist_ids],
+        }
+
+    def audio_features(self, track_id):
+        rng = self._rng('audio-features', track_id)
+        return {
+            'id': track_id,
+            'type': 'audio_features',
+            'uri': f"spotify:track:{track_id}",
+            'danceability': rng.random(),
+            'energy': rng.random(),
+            'key': rng.randint(-1, 11),
+            'loudness': rng.uniform(-20.0, 0.0),
+            'mode': rng.randint(0, 1),
+            'speechiness': rng.random() ** 3,
+            'acousticness': rng.random() ** 2,
+            'instrumentalness': rng.random() ** 4,
+            'liveness': rng.random() ** 2,
+            'valence': rng.random(),
+            'tempo': rng.uniform(60.0, 200.0),
+            'duration_ms': self.track(track_id)['duration_ms'],
+            'time_signature': rng.choice([3, 4, 4, 4, 5]),
+        }
+
+    def playlist_size(self, playlist_id):
+        return self._rng('playlist', playlist_id).randint(10, self.max_playlist_tracks)
+
+    def playlist_track_id(self, playlist_id, position):
+        return spotify_id('track', self._pick('playlist-track', playlist_id, position) % self.tracks)
+
+    def playlist_item(self, playlist_id, position):
+        return {
+            'added_at': '2025-01-01T00:00:00Z',
+            'is_local': False,
+            'track': self.track(self.playlist_track_id(playlist_id, position)),
+        }
+
+    def playlist(self, playlist_id, tracks=None):
+        """Simplified playlist object; pass a paging object as tracks for the full one"""
+        rng = self._rng('playlist', playlist_id)
+        return {
+            'id': playlist_id,
+            'type': 'playlist',
+            'uri': f"spotify:playlist:{playlist_id}",
+            'name': self.names.get(playlist_id) or self._name(rng, 3),
+            'description': f"The best {rng.choice(WORDS)} tracks, updated weekly.",
+            'owner': {'id': 'spotify', 'display_name': 'Spotify'},
+            'followers': {'href': None, 'total': int(rng.lognormvariate(11, 2))},
+            'public': True,
+            'collaborative': False,
+            'snapshot_id': spotify_id('snapshot', f"{self.seed}:{playlist_id}"),
+            'tracks': tracks or {'href': None, 'total': self.playlist_size(playlist_id)},
+            'images': [],
+        }
+
+    def category(self, category_id):
+        return {'id': category_id, 'name': category_id.replace('_', ' ').title(), 'icons': []}
+
+    def category_playlist_id(self, category_id, position):
+        return spotify_id('playlist', f"{category_id}:{position}")
+
+    def search_id(self, search_type, query, position):
+        item_id = spotify_id(search_type, f"{query.lower()}:{position}")
+        if position == 0:
+            self.names[item_id] = query
+        return item_id
+
+    def search_item(self, search_type, query, position):
+        item_id = self.search_id(search_type, query, position)
+        if search_type == 'artist':
+            return self.artist(item_id)
+        if search_type == 'track':
+            return self.track(item_id)
+        if search_type == 'playlist':
+            return self.playlist(item_id)
+        return self.album(item_id)
+
+
+class MockSpotifyAPI:
+    """Request handling for the local Spotify stand-in, independent of the socket layer
+
+    Serves recorded fixtures when one matches the request and synthetic data
+    otherwise, with paging that follows Spotify's offset/limit/next format.
+    Latency, sliding-window 429s, scheduled 429 bursts and 5xx errors are
+    injected according to the configuration, and every response is counted.
+    """
+
+    def __init__(self, fixtures=None, catalog=None, latency=None, family_latency=None,
+                 rate_limit=None, rate_window=30.0, burst_every=None, burst_length=5.0,
+                 error_rate=0.0, error_codes=(500, 502, 503), require_auth=True, token_ttl=3600, seed=None):
+        self.fixtures = fixtures or {}
+        self.catalog = catalog or SyntheticCatalog(seed=seed or 0)
+        self.latency = latency or LatencyModel('none')
+        self.family_latency = family_latency or {}
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.error_rate = error_rate
+        self.error_codes = error_codes
+        self.require_auth = require_auth
+        self.token_ttl = token_ttl
+        self.base_url = RECORDED_BASE_URL
+
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tokens = {}
+        self.window_hits = deque()
+        self.started = time.monotonic()
+        self.stats = {'requests': 0, 'by_status': {}, 'by_family': {}, 'fixture_hits': 0}
+
+    def _error(self, status, message, headers=None):
+        return status, headers or {}, {'error': {'status': status, 'message': message}}
+
+    def _count(self, family, status):
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['by_status'][status] = self.stats['by_status'].get(status, 0) + 1
+            self.stats['by_family'][family] = self.stats['by_family'].get(family, 0) + 1
+
+    def retry_after(self):
+        """Seconds the caller must wait if this request is rate limited, else 0"""
+        now = time.monotonic()
+        if self.burst_every:
+            into_cycle = (now - self.started) % self.burst_every
+            if into_cycle < self.burst_length:
+                return max(math.ceil(self.burst_length - into_cycle), 1)
+        if not self.rate_limit:
+            return 0
+        with self.lock:
+            while self.window_hits and self.window_hits[0] <= now - self.rate_window:
+                self.window_hits.popleft()
+            if len(self.window_hits) >= self.rate_limit:
+                return max(math.ceil(self.window_hits[0] + self.rate_window - now), 1)
+            self.window_hits.append(now)
+        return 0
+
+    def inject_error(self):
+        if not self.error_rate:
+            return None
+        with self.lock:
+            if self.rng.random() < self.error_rate:
+                return self.rng.choice(self.error_codes)
+        return None
+
+    def issue_token(self, body):
+        form = dict(parse_qsl(body.decode('utf-8')))
+        if form.get('grant_type') != 'client_credentials':
+            return 400, {}, {'error': 'unsupported_grant_type'}
+        token = f"mock-{uuid.uuid4().hex}"
+        with self.lock:
+            self.tokens[token] = time.time() + self.token_ttl
+        return 200, {}, {'access_token': token, 'token_type': 'Bearer', 'expires_in': self.token_ttl}
+
+    def authorized(self, headers):
+        scheme, _, token = (headers.get('Authorization') or '').partition(' ')
+        with self.lock:
+            return scheme == 'Bearer' and self.tokens.get(token, 0) > time.time()
+
+    def handle(self, method, path, headers, body=b''):
+        """Return (status, headers, body bytes) for one HTTP request"""
+        family = 'token' if path.startswith(TOKEN_PATH) else endpoint_family(path)
+        time.sleep(self.family_latency.get(family, self.latency).sample())
+
+        if family == 'token':
+            status, extra_headers, payload = self.issue_token(body) if method == 'POST' else self._error(405, 'Method not allowed')
+        elif method != 'GET':
+            status, extra_headers, payload = self._error(405, 'Method not allowed')
+        elif self.require_auth and not self.authorized(headers):
+            status, extra_headers, payload = self._error(401, 'The access token expired')
+        else:
+            wait = self.retry_after()
+            error = None if wait else self.inject_error()
+            if wait:
+                status, extra_headers, payload = self._error(429, 'API rate limit exceeded', {'Retry-After': str(wait)})
+            elif error:
+                status, extra_headers, payload = self._error(error, 'Injected server error')
+            else:
+                status, extra_headers, payload = self.route(path)
+
+        content = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        response_headers = {'Content-Type': 'application/json; charset=utf-8'}
+        response_headers.update(extra_headers)
+        if status == 200 and family != 'token':
+            etag = f'"{hashlib.sha1(content).hexdigest()}"'
+            response_headers['ETag'] = etag
+            if headers.get('If-None-Match') == etag:
+                status, content = 304, b''
+        self._count(family, status)
+        return status, response_headers, content
+
+    def route(self, path):
+        """Recorded fixture if we have one, otherwise the synthetic catalog"""
+        key = fixture_key(path)
+        if key in self.fixtures:
+            with self.lock:
+                self.stats['fixture_hits'] += 1
+            # Recorded 'next' links point at Spotify - keep paging on this server
+            return 200, {}, self.fixtures[key].replace(RECORDED_BASE_URL.encode('utf-8'), self.base_url.encode('utf-8'))
+
+        parts = urlsplit(path)
+        segments = [s for s in parts.path.split('/') if s]
+        if segments and segments[0] == 'v1':
+            segments = segments[1:]
+        query = dict(parse_qsl(parts.query))
+        family = endpoint_family(parts.path)
+        try:
+            offset = max(int(query.get('offset', 0)), 0)
+            limit = int(query.get('limit', 20))
+        except ValueError:
+            return self._error(400, 'Invalid offset or limit')
+        if not 0 < limit <= MAX_LIMIT.get(family, MAX_LIMIT['default']):
+            return self._error(400, 'Invalid limit')
+        ids = [i for i in query.get('ids', '').split(',') if i]
+        if len(ids) > MAX_IDS.get(family, MAX_IDS['default']):
+            return self._error(400, 'Too many ids requested')
+
+        catalog = self.catalog
+        href = f"{self.base_url}/{'/'.join(segments)}"
+        match segments:
+            case ['search']:
+                if not query.get('q') or not query.get('type'):
+                    return self._error(400, 'No search query')
+                # Spotify caps search paging at offset 1000
+                return 200, {}, {
+                    f"{search_type}s": self.paging(
+                        with_query(href, q=query['q'], type=search_type), 1000, offset, limit,
+                        lambda i, t=search_type: catalog.search_item(t, query['q'], i))
+                    for search_type in query['type'].split(',')
+                }
+            case ['artists']:
+                return 200, {}, {'artists': [catalog.artist(i) for i in ids]}
+            case ['artists', artist_id]:
+                return 200, {}, catalog.artist(artist_id)
+            case ['artists', artist_id, 'top-tracks']:
+                return 200, {}, {'tracks': [catalog.track(spotify_id('track', f"{artist_id}:top:{i}")) for i in range(10)]}
+            case ['tracks']:
+                return 200, {}, {'tracks': [catalog.track(i) for i in ids]}
+            case ['tracks', track_id]:
+                return 200, {}, catalog.track(track_id)
+            case ['audio-features']:
+                return 200, {}, {'audio_features': [catalog.audio_features(i) for i in ids]}
+            case ['audio-features', track_id]:
+                return 200, {}, catalog.audio_features(track_id)
+            case ['playlists', playlist_id]:
+                tracks = self.paging(f"{href}/tracks", catalog.playlist_size(playlist_id), 0, 100,
+                                     lambda i: catalog.playlist_item(playlist_id, i))
+                return 200, {}, catalog.playlist(playlist_id, tracks)
+            case ['playlists', playlist_id, 'tracks']:
+                return 200, {}, self.paging(href, catalog.playlist_size(playlist_id), offset, limit,
+                                            lambda i: catalog.playlist_item(playlist_id, i))
+            case ['browse', 'categories']:
+                return 200, {}, {'categories': self.paging(href, len(CATEGORIES), offset, limit,
+                                                           lambda i: catalog.category(CATEGORIES[i]))}
+            case ['browse', 'categories', category_id]:
+                return 200, {}, catalog.category(category_id)
+            case ['browse', 'categories', category_id, 'playlists']:
+                return 200, {}, {'playlists': self.paging(
+                    href, catalog.playlists_per_category, offset, limit,
+                    lambda i: catalog.playlist(catalog.category_playlist_id(category_id, i)))}
+        return self._error(404, 'Service not found')
+
+    def paging(self, href, total, offset, limit, item_at):
+        """Spotify paging object; only the requested slice is generated"""
+        end = min(offset + limit, total)
+        return {
+            'href': with_query(href, offset=offset, limit=limit),
+            'items': [item_at(i) for i in range(offset, end)],
+            'limit': limit,
+            'offset': offset,
+            'total': total,
+            'next': with_query(href, offset=end, limit=limit) if end < total else None,
+            'previous': with_query(href, offset=max(offset - limit, 0), limit=limit) if offset else None,
+        }
+
+    def print_stats(self):
+        with self.lock:
+            stats = json.loads(json.dumps(self.stats))
+        print(f"\n🧪 Mock Server Stats:")
+        print(f"   • Requests served: {stats['requests']}")
+        print(f"   • Served from fixtures: {stats['fixture_hits']}")
+        for status, count in sorted(stats['by_status'].items()):
+            print(f"   • HTTP {status}: {count}")
+        for family, count in sorted(stats['by_family'].items()):
+            print(f"   • {family}: {count} requests")
+
+
+class MockSpotifyServer:
+    """Serves a MockSpotifyAPI over keep-alive HTTP/1.1 from a background thread
+
+    Point a client at it with SpotifyHTTPClient(base_url=server.base_url) and
+    TokenManager(token_url=server.token_url, ...). port=0 picks a free port.
+    """
+
+    def __init__(self, api=None, host='127.0.0.1', port=0):
+        self.api = api or MockSpotifyAPI()
+        api = self.api
+
+        class MockHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes - don't let Nagle hold the body back
+            disable_nagle_algorithm = True
+
+            def respond(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                status, headers, content = api.handle(method, self.path, self.headers, body)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def do_GET(self):
+                self.respond('GET')
+
+            def do_POST(self):
+                self.respond('POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), MockHandler)
+        self.httpd.daemon_threads = True
+        self.host, self.port = self.httpd.server_address[:2]
+        self.api.base_url = self.base_url
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/v1"
+
+    @property
+    def token_url(self):
+        return f"http://{self.host}:{self.port}{TOKEN_PATH}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local Spotify API stand-in for repeatable load tests")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--fixtures', help="recorded responses: a .spotify_cache directory or a JSON file")
+    parser.add_argument('--latency', default='lognormal:80:0.5', help="none | fixed:MS | uniform:LOW:HIGH | lognormal:MEDIAN:SIGMA")
+    parser.add_argument('--rate-limit', type=int, help="requests allowed per rate window before 429s")
+    parser.add_argument('--rate-window', type=float, default=30.0, help="rate window in seconds")
+    parser.add_argument('--burst-every', type=float, help="start a 429 burst every N seconds")
+    parser.add_argument('--burst-length', type=float, default=5.0, help="length of each 429 burst in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with a 5xx")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    api = MockSpotifyAPI(
+        fixtures=load_fixtures(args.fixtures) if args.fixtures else None,
+        latency=LatencyModel.parse(args.latency, seed=args.seed),
+        rate_limit=args.rate_limit,
+        rate_window=args.rate_window,
+        burst_every=args.burst_every,
+        burst_length=args.burst_length,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    server = MockSpotifyServer(api, args.host, args.port)
+    print(f"🧪 Mock Spotify API listening on {server.base_url} ({len(api.fixtures)} fixtures)")
+    print("   Point the collectors at it with:")
+    print(f"   export SPOTIFY_API_BASE_URL={server.base_url}")
+    print(f"   export SPOTIFY_TOKEN_URL={server.token_url}")
+    print("   export SPOTIFY_CACHE_DIR=.mock_cache")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        api.print_stats()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+def with_query(endpoint, **params):
+    """Return the endpoint with the given query parameters set or replaced"""
+    parts = urlsplit(endpoint)
+    query = dict(parse_qsl(parts.query))
+    query.update({key: str(value) for key, value in params.items()})
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query, safe=',:'), parts.fragment))
+
+
+def page_of(data):
+    """Find the paging object in a response
+
+    Playlist tracks come back as a bare paging object, while search and
+    browse wrap it (e.g. {'categories': {...}}, {'playlists': {...}}).
+    """
+    if data is None:
+        return None
+    if 'items' in data:
+        return data
+    for value in data.values():
+        if isinstance(value, dict) and 'items' in value:
+            return value
+    return None
+
+
+class PageIterator:
+    """Lazily yields every item of a paged endpoint by following its 'next' links
+
+    Only the current page and the prefetched next page are held in memory.
+    `offset` always points at the next item to be yielded, so it can be
+    saved and passed back as start_offset to resume an interrupted run.
+    With a limit, no page past the limit'th item is requested or prefetched.
+    """
+
+    def __init__(self, fetch, endpoint, start_offset=0, page_size=None, prefetch=True, limit=None):
+        # fetch(endpoint) -> parsed JSON dict or None, e.g. SpotifyAPIExplorer.make_request
+        self.fetch = fetch
+        self.endpoint = endpoint
+        self.offset = start_offset
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.limit = limit
+        self.total = None
+        self.pages = 0
+
+    def __iter__(self):
+        # Items at positions >= end aren't wanted
+        end = self.offset + self.limit if self.limit is not None else None
+        if end is not None and end <= self.offset:
+            return
+        params = {'offset': self.offset}
+        page_size = self.page_size
+        if end is not None:
+            page_size = min(page_size or self.limit, self.limit)
+        if page_size:
+            params['limit'] = page_size
+        next_endpoint = with_query(self.endpoint, **params)
+
+        executor = ThreadPoolExecutor(max_workers=1) if self.prefetch else None
+        pending = None
+        try:
+            while next_endpoint:
+                if pending is not None:
+                    data = pending.result()
+                else:
+                    data = self.fetch(next_endpoint)
+                pending = None
+
+                page = page_of(data)
+                if not page:
+                    return
+                self.pages += 1
+                self.total = page.get('total', self.total)
+                page_offset = page.get('offset', self.offset)
+                next_endpoint = page.get('next')
+                if end is not None and page_offset + len(page['items']) >= end:
+                    next_endpoint = None
+
+                # Start downloading the next page while this one is consumed
+                if executor and next_endpoint:
+                    pending = executor.submit(self.fetch, next_endpoint)
+
+                for position, item in enumerate(page['items'], page_offset):
+                    # Skip anything already yielded before a resume
+                    if position < self.offset:
+                        continue
+                    if end is not None and position >= end:
+                        return
+                    self.offset = position + 1
+                    yield item
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_categories(fetch, start_offset=0, country=None, limit=None, page_size=50):
+    endpoint = "/browse/categories"
+    if country:
+        endpoint = with_query(endpoint, country=country)
+    return PageIterator(fetch, endpoint, start_offset, page_size=page_size, limit=limit)
+
+
+def iter_category_playlists(fetch, category_id, start_offset=0, limit=None, page_size=50):
+    return PageIterator(fetch, f"/browse/categories/{category_id}/playlists", start_offset, page_size=page_size, limit=limit)
+
+
+def iter_playlist_tracks(fetch, playlist_id, start_offset=0):
+    return PageIterator(fetch, f"/playlists/{playlist_id}/tracks", start_offset, page_size=100)
+
+
+def iter_search(fetch, query, search_type, start_offset=0):
+    endpoint = with_query("/search", q=query, type=search_type)
+    return PageIterator(fetch, endpoint, start_offset, page_size=50)
@@ -0,0 +1,328 @@
+import os
+from datetime import date, timedelta
+
+import numpy as np
+
+from entities import IdColumn
+
+# kind -> metric -> column in the ColumnarStore table of the same name
+METRICS = {
+    'artists': {'popularity': 'popularity', 'followers': 'followers'},
+    'tracks': {'popularity': 'popularity'},
+    'playlists': {'followers': 'followers'},
+}
+
+CHANGE = np.dtype([('entity', '<i4'), ('day', '<i4'), ('delta', '<i4')])
+# latest[] value for an entity that was never recorded
+UNSEEN = -1
+# Change-log rows merged into the sorted file once the log grows past this
+COMPACT_THRESHOLD = 1000000
+
+
+def day_number(day):
+    """date, ISO string or None (today) -> proleptic ordinal day"""
+    if day is None:
+        day = date.today()
+    elif isinstance(day, str):
+        day = date.fromisoformat(day)
+    return day.toordinal()
+
+
+class EntityRegistry:
+    """Persistent ID -> dense entity number mapping for one kind (append-only)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.ids = IdColumn()
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = f.read()
+            for start in range(0, len(data), self.ids.width):
+                self.ids.append(data[start:start + self.ids.width].rstrip(b'\0').decode('ascii'))
+        self.saved = len(self.ids)
+
+    def rows(self, item_ids):
+        """Entity numbers for IDs, registering new ones"""
+        rows = np.empty(len(item_ids), dtype=np.int32)
+        for i, item_id in enumerate(item_ids):
+            row = self.ids.find(item_id)
+            rows[i] = self.ids.append(item_id) if row is None else row
+        return rows
+
+    def find(self, item_id):
+        return self.ids.find(item_id)
+
+    def get(self, row):
+        return self.ids.get(row)
+
+    def save(self):
+        # IDs are fixed-width, so new ones are just appended
+        if len(self.ids) > self.saved:
+            with open(self.path, 'ab') as f:
+                f.write(self.ids.data[self.saved * self.ids.width:])
+            self.saved = len(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class MetricSeries:
+    """Change-only, delta-encoded history of one metric for every entity of a kind
+
+    A snapshot writes a row only for entities whose value changed since
+    their previous snapshot (run-length encoding over time: an unchanged
+    value costs nothing), and the row holds the difference from that
+    previous value. New rows are appended to log.bin in arrival order;
+    compact() merges them into changes.npy sorted by (entity, day), which
+    doubles as the per-entity time index: one searchsorted finds an
+    entity's run, or every entity's value on a day at once, after a single
+    cumulative sum decodes the deltas.
+
+    state.npz (replaced atomically) holds each entity's latest value plus
+    how many log and compacted rows it accounts for; a crash between
+    writing rows and the state is repaired from the rows on the next open.
+    """
+
+    def __init__(self, directory, compact_threshold=COMPACT_THRESHOLD):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.compact_threshold = compact_threshold
+        self.decoded = None
+        if os.path.exists(self._path('state.npz')):
+            with np.load(self._path('state.npz')) as state:
+                self.latest = state['latest']
+                self.last_day = int(state['last_day'])
+                log_rows, compacted_rows = int(state['log_rows']), int(state['compacted_rows'])
+        else:
+            # New directory, or one written before state.npz: rebuild from whatever rows exist
+            self.latest = np.empty(0, dtype=np.int64)
+            self.last_day = 0
+            log_rows, compacted_rows = None, None
+        self._recover(log_rows, compacted_rows)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _load(self, name, default):
+        return np.load(self._path(name)) if os.path.exists(self._path(name)) else default
+
+    def log(self):
+        path = self._path('log.bin')
+        return np.fromfile(path, dtype=CHANGE) if os.path.exists(path) else np.empty(0, dtype=CHANGE)
+
+    def _log_rows(self):
+        path = self._path('log.bin')
+        return os.path.getsize(path) // CHANGE.itemsize if os.path.exists(path) else 0
+
+    def _compacted_rows(self):
+        path = self._path('changes.npy')
+        return len(np.load(path, mmap_mode='r')) if os.path.exists(path) else 0
+
+    def _save_state(self):
+        tmp_path = self._path('state.tmp.npz')
+        np.savez(tmp_path, latest=self.latest, last_day=np.array(self.last_day),
+                 log_rows=np.array(self._log_rows()), compacted_rows=np.array(self._compacted_rows()))
+        os.replace(tmp_path, self._path('state.npz'))
+
+    def _recover(self, log_rows, compacted_rows):
+        """Bring the state back in line with the rows after an interrupted record() or compact()"""
+        path = self._path('log.bin')
+        if os.path.exists(path) and os.path.getsize(path) % CHANGE.itemsize:
+            # Torn append - drop the partial row
+            with open(path, 'r+b') as f:
+                f.truncate(self._log_rows() * CHANGE.itemsize)
+        consistent = log_rows is not None
+        if consistent and self._compacted_rows() != compacted_rows:
+            # compact() replaced changes.npy but didn't get to empty the log, whose rows it already holds
+            open(path, 'wb').close()
+            consistent = False
+        if self._log_rows() != log_rows:
+            # record() appended rows the saved latest values don't reflect
+            consistent = False
+        if consistent:
+            return
+        entity, day, _, values = self.decode()
+        if len(entity):
+            last = np.flatnonzero(np.r_[entity[1:] != entity[:-1], True])
+            size = max(len(self.latest), int(entity.max()) + 1)
+            self.latest = np.full(size, UNSEEN, dtype=np.int64)
+            self.latest[entity[last]] = values[last]
+            self.last_day = max(self.last_day, int(day.max()))
+        self._save_state()
+
+    def record(self, rows, values, day):
+        """Record one snapshot: entity rows and their values on `day` (an ordinal)"""
+        if day < self.last_day:
+            raise ValueError("Snapshots must be recorded in date order")
+        rows = np.asarray(rows, dtype=np.int32)
+        values = np.asarray(values, dtype=np.int64)
+        # Missing values (e.g. a lookup that failed) leave the entity's run unchanged
+        known = values >= 0
+        rows, values = rows[known], values[known]
+        # Keep the last value for an entity listed twice in one snapshot
+        rows, last = np.unique(rows[::-1], return_index=True)
+        values = values[::-1][last]
+
+        if len(rows) and rows.max() >= len(self.latest):
+            self.latest = np.concatenate([self.latest, np.full(rows.max() + 1 - len(self.latest), UNSEEN, dtype=np.int64)])
+        previous = self.latest[rows]
+        changed = previous != values
+        changes = np.empty(int(changed.sum()), dtype=CHANGE)
+        changes['entity'] = rows[changed]
+        changes['day'] = day
+        changes['delta'] = values[changed] - np.where(previous[changed] == UNSEEN, 0, previous[changed])
+        with open(self._path('log.bin'), 'ab') as f:
+            changes.tofile(f)
+        self.latest[rows] = values
+        self.last_day = day
+        self._save_state()
+        self.decoded = None
+
+        if os.path.getsize(self._path('log.bin')) // CHANGE.itemsize >= self.compact_threshold:
+            self.compact()
+        return len(changes)
+
+    def compact(self):
+        """Merge the change log into the sorted file and rebuild the per-entity index"""
+        entity, day, delta, _ = self.decode()
+        changes = np.empty(len(entity), dtype=CHANGE)
+        changes['entity'], changes['day'], changes['delta'] = entity, day, delta
+        tmp_path = self._path('changes.tmp.npy')
+        np.save(tmp_path, changes)
+        os.replace(tmp_path, self._path('changes.npy'))
+        open(self._path('log.bin'), 'wb').close()
+        self._save_state()
+
+    def decode(self):
+        """(entity, day, delta, value) arrays for every change, sorted by entity then day"""
+        if self.decoded is None:
+            compacted = self._load('changes.npy', np.empty(0, dtype=CHANGE))
+            log = self.log()
+            changes = np.concatenate([compacted, log]) if len(log) else compacted
+            # Stable: same-day rewrites keep their recording order
+            order = np.lexsort((changes['day'], changes['entity']))
+            entity, day, delta = changes['entity'][order], changes['day'][order], changes['delta'][order]
+            values = np.cumsum(delta, dtype=np.int64)
+            # Restart the running sum at each entity's first change
+            starts = np.flatnonzero(np.r_[True, entity[1:] != entity[:-1]]) if len(entity) else np.empty(0, dtype=np.int64)
+            base = np.where(starts > 0, values[starts - 1], 0)
+            values -= np.repeat(base, np.diff(np.r_[starts, len(entity)]))
+            self.decoded = (entity, day, delta, values)
+        return self.decoded
+
+    def values_at(self, day):
+        """Value of every entity as of `day` (UNSEEN where it had no snapshot yet)"""
+        entity, days, _, values = self.decode()
+        entities = np.arange(len(self.latest), dtype=np.int64)
+        keys = (entity.astype(np.int64) << 32) | days
+        position = np.searchsorted(keys, (entities << 32) | day, side='right') - 1
+        valid = position >= 0
+        valid[valid] = entity[position[valid]] == entities[valid]
+        return np.where(valid, values[np.maximum(position, 0)], UNSEEN)
+
+    def history(self, row):
+        """(days, values) for one entity"""
+        entity, days, _, values = self.decode()
+        start, stop = np.searchsorted(entity, [row, row + 1])
+        return days[start:stop], values[start:stop]
+
+    def nbytes(self):
+        return sum(os.path.getsize(self._path(name)) for name in ('changes.npy', 'log.bin', 'state.npz')
+                   if os.path.exists(self._path(name)))
+
+
+class PopularityTimeSeries:
+    """Daily popularity/follower snapshots for artists, tracks and playlists
+
+    e.g. risers('artists', 'popularity', min_growth=20, days=30) lists the
+    artists whose popularity grew by 20+ points over the last 30 days.
+    """
+
+    def __init__(self, root='data/timeseries', compact_threshold=COMPACT_THRESHOLD):
+        self.root = root
+        self.compact_threshold = compact_threshold
+        self.registries = {}
+        self.series = {}
+
+    def registry(self, kind):
+        if kind not in self.registries:
+            os.makedirs(os.path.join(self.root, kind), exist_ok=True)
+            self.registries[kind] = EntityRegistry(os.path.join(self.root, kind, 'ids.bin'))
+        return self.registries[kind]
+
+    def metric(self, kind, metric):
+        if metric not in METRICS.get(kind, {}):
+            raise ValueError(f"Unknown metric: {kind}.{metric}")
+        if (kind, metric) not in self.series:
+            self.series[(kind, metric)] = MetricSeries(os.path.join(self.root, kind, metric), self.compact_threshold)
+        return self.series[(kind, metric)]
+
+    def record(self, kind, metric, item_ids, values, day=None):
+        """Record one day's values for many entities; returns how many changed"""
+        registry = self.registry(kind)
+        rows = registry.rows(item_ids)
+        registry.save()
+        values = np.array([UNSEEN if value is None else value for value in values], dtype=np.int64)
+        return self.metric(kind, metric).record(rows, values, day_number(day))
+
+    def record_table(self, kind, table, day=None):
+        """Record every metric of a kind from an Arrow table shaped like SCHEMAS[kind]"""
+        item_ids = table.column(f"{kind[:-1]}_id").to_pylist()
+        return {metric: self.record(kind, metric, item_ids, table.column(column).to_pylist(), day)
+                for metric, column in METRICS[kind].items()}
+
+    def record_store(self, store, day=None):
+        """Snapshot the metrics a ColumnarStore collected on `day` (default today)"""
+        day = day or date.today().isoformat()
+        return {kind: self.record_table(kind, store.load(kind, since=day, until=day), day) for kind in METRICS}
+
+    def record_snapshots(self, snapshots, day=None):
+        """Record {kind: {id: {metric: value}}}, e.g. AsyncCollector.snapshots after a crawl"""
+        counts = {}
+        for kind, entities in snapshots.items():
+            item_ids = list(entities)
+            counts[kind] = {metric: self.record(kind, metric, item_ids, [entities[i].get(metric) for i in item_ids], day)
+                            for metric in METRICS[kind]}
+        return counts
+
+    def values_at(self, kind, metric, day=None):
+        """(IDs, values) of every known entity as of a day; UNSEEN (-1) before its first snapshot"""
+        values = self.metric(kind, metric).values_at(day_number(day))
+        registry = self.registry(kind)
+        return [registry.get(row) for row in range(len(values))], values
+
+    def growth(self, kind, metric, start, end=None):
+        """(start values, end values) for every entity; UNSEEN where it had no snapshot by then"""
+        series = self.metric(kind, metric)
+        return series.values_at(day_number(start)), series.values_at(day_number(end))
+
+    def risers(self, kind, metric, min_growth, days=30, as_of=None, limit=None):
+        """[(id, start value, end value)] whose metric grew by at least min_growth over the window
+
+        Only entities already tracked at the start of the window qualify.
+        """
+        end = date.fromordinal(day_number(as_of))
+        before, after = self.growth(kind, metric, end - timedelta(days=days), end)
+        change = after - before
+        rows = np.flatnonzero((before != UNSEEN) & (change >= min_growth))
+        rows = rows[np.argsort(-change[rows], kind='stable')][:limit]
+        registry = self.registry(kind)
+        return [(registry.get(row), int(before[row]), int(after[row])) for row in rows]
+
+    def history(self, kind, metric, item_id):
+        """[(date, value)] for one entity, one point per change"""
+        row = self.registry(kind).find(item_id)
+        if row is None:
+            return []
+        days, values = self.metric(kind, metric).history(row)
+        return [(date.fromordinal(int(d)), int(v)) for d, v in zip(days, values)]
+
+    def print_stats(self):
+        print(f"\n📉 Popularity Time Series ({self.root}):")
+        for kind, metrics in METRICS.items():
+            registry = self.registry(kind)
+            for metric in metrics:
+                series = self.metric(kind, metric)
+                changes = len(series.decode()[0])
+                print(f"   • {kind}.{metric}: {len(registry):,} entities, {changes:,} changes stored, "
+                      f"{series.nbytes() / 1024:.0f}KB")
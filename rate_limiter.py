@@ -0,0 +1,166 @@
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+# Endpoint families share one bucket each - Spotify throttles per app, but
+# search and browse traffic behave very differently from bulk lookups
+ENDPOINT_FAMILIES = [
+    ('search', '/search'),
+    ('audio-features', '/audio-features'),
+    ('playlists', '/playlists'),
+    ('browse', '/browse'),
+    ('artists', '/artists'),
+    ('tracks', '/tracks'),
+]
+
+# Status codes worth retrying with backoff (429 is handled by the buckets)
+RETRYABLE_STATUS_CODES = {500, 502, 503, 504}
+
+
+def endpoint_family(endpoint):
+    """Map an endpoint or full URL to its rate-limit family"""
+    path = urlparse(endpoint).path
+    if path.startswith('/v1/'):
+        path = path[3:]
+    for family, prefix in ENDPOINT_FAMILIES:
+        if path.startswith(prefix):
+            return family
+    return 'default'
+
+
+def parse_retry_after(value, default=1.0):
+    """Read a Retry-After header value in seconds"""
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    """Token bucket whose refill rate grows on success and backs off on 429"""
+
+    def __init__(self, rate=2.0, capacity=5, min_rate=0.5, max_rate=20.0,
+                 increase_step=0.1, decrease_factor=0.5, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Take one token and return how long the caller must wait before sending"""
+        with self.lock:
+            now = self.clock()
+            if now > self.updated:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+            self.tokens -= 1
+            # Refill resumes at self.updated (the end of any Retry-After pause), so
+            # callers queued during a pause are spaced out after it, not released together
+            return max(self.updated - now, 0.0) + max(-self.tokens, 0.0) / self.rate
+
+    def on_success(self):
+        """Additive increase - probe for a higher safe rate"""
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_rate_limited(self, retry_after):
+        """Multiplicative decrease and pause until Retry-After has passed"""
+        with self.lock:
+            now = self.clock()
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+            # No refill while blocked - refilling starts once the pause ends
+            self.tokens = 0.0
+            self.updated = self.blocked_until
+
+
+class AdaptiveRateLimiter:
+    """One adaptive token bucket per endpoint family, plus jittered retry backoff"""
+
+    def __init__(self, initial_rate=2.0, capacity=5, min_rate=0.5, max_rate=20.0,
+                 increase_step=0.1, decrease_factor=0.5, max_retries=5,
+                 backoff_base=0.5, backoff_cap=30.0, sleep=time.sleep):
+        self.bucket_settings = {
+            'rate': initial_rate,
+            'capacity': capacity,
+            'min_rate': min_rate,
+            'max_rate': max_rate,
+            'increase_step': increase_step,
+            'decrease_factor': decrease_factor,
+        }
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.sleep = sleep
+        self.buckets = {}
+        self.rate_limited_count = 0
+        self.retry_count = 0
+        self.total_wait_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def bucket(self, endpoint):
+        """Return (creating if needed) the bucket for an endpoint's family"""
+        family = endpoint_family(endpoint)
+        with self.lock:
+            if family not in self.buckets:
+                self.buckets[family] = TokenBucket(**self.bucket_settings)
+            return self.buckets[family]
+
+    def reserve(self, endpoint):
+        """Reserve a slot and return the delay, without sleeping (for async callers)"""
+        delay = self.bucket(endpoint).reserve()
+        if delay > 0:
+            with self.lock:
+                self.total_wait_seconds += delay
+        return delay
+
+    def acquire(self, endpoint):
+        """Block until a request to this endpoint may be sent; returns seconds waited"""
+        delay = self.reserve(endpoint)
+        if delay > 0:
+            self.sleep(delay)
+        return delay
+
+    def record_success(self, endpoint):
+        self.bucket(endpoint).on_success()
+
+    def record_rate_limited(self, endpoint, retry_after):
+        with self.lock:
+            self.rate_limited_count += 1
+        self.bucket(endpoint).on_rate_limited(retry_after)
+
+    def backoff_delay(self, attempt):
+        """Full-jitter exponential backoff for transient failures"""
+        with self.lock:
+            self.retry_count += 1
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def stats(self):
+        """Current per-family rates and counters"""
+        with self.lock:
+            buckets = dict(self.buckets)
+            stats = {
+                'rate_limited': self.rate_limited_count,
+                'retries': self.retry_count,
+                'wait_seconds': self.total_wait_seconds,
+            }
+        stats['rates'] = {family: bucket.rate for family, bucket in sorted(buckets.items())}
+        return stats
+
+    def print_stats(self):
+        stats = self.stats()
+        print(f"\n🚦 Rate Limiter Stats:")
+        print(f"   • 429 responses: {stats['rate_limited']}")
+        print(f"   • Retries: {stats['retries']}")
+        print(f"   • Time spent waiting: {stats['wait_seconds']:.2f}s")
+        for family, rate in stats['rates'].items():
+            print(f"   • {family}: {rate:.2f} req/s")
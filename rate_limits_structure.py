@@ -1,65 +1,48 @@
-import os
-import requests
-import json
-import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from request_log import RequestLogSink
+from request_scheduler import COLLECTION_PLAN
+from spotify_client import get_shared_client
+from token_manager import TokenManager
 
 # Load environment variables
 load_dotenv()
 
 class SpotifyRateLimitAnalyzer:
-    def __init__(self):
-        self.client_id = os.getenv('SPOTIFY_CLIENT_ID')
-        self.client_secret = os.getenv('SPOTIFY_CLIENT_SECRET')
-        self.access_token = None
-        self.base_url = 'https://api.spotify.com/v1'
-        self.request_log = []  # Track all requests for analysis
+    def __init__(self, http_client=None):
+        self.http = http_client or get_shared_client()
+        if self.http.token_manager is None:
+            self.http.token_manager = TokenManager(http_client=self.http)
+        self.tokens = self.http.token_manager
+        self.base_url = self.http.base_url
+        # Streamed to rotating JSON Lines files; only recent records stay in memory
+        self.request_log = RequestLogSink()
         
     def get_access_token(self):
-        """Get access token for Spotify API"""
+        """Get access token for Spotify API (shared, cached on disk, refreshed before expiry)"""
         print("🔑 Getting access token...")
         
-        auth_url = 'https://accounts.spotify.com/api/token'
-        auth_headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-        auth_data = {
-            'grant_type': 'client_credentials',
-            'client_id': self.client_id,
-            'client_secret': self.client_secret
-        }
-        
-        response = requests.post(auth_url, headers=auth_headers, data=auth_data)
-        
-        if response.status_code == 200:
-            token_data = response.json()
-            self.access_token = token_data['access_token']
+        if self.tokens.get_token():
             print("✅ Access token obtained!")
             return True
-        else:
-            print(f"❌ Failed to get access token: {response.status_code}")
-            return False
+        return False
     
     def make_tracked_request(self, endpoint, description=""):
         """Make a request while tracking rate limit info"""
-        if not self.access_token:
+        if not self.tokens.token:
             return None
-            
-        headers = {'Authorization': f'Bearer {self.access_token}'}
-        url = f"{self.base_url}{endpoint}"
         
-        # Record request start time
-        start_time = datetime.now()
-        
-        try:
-            response = requests.get(url, headers=headers)
+        def log_attempt(response, elapsed_seconds):
+            # Every attempt is logged, including 429s the client retried
             end_time = datetime.now()
+            start_time = end_time - timedelta(seconds=elapsed_seconds)
             
             # Log the request details
             request_info = {
                 'endpoint': endpoint,
                 'description': description,
                 'status_code': response.status_code,
-                'response_time_ms': (end_time - start_time).total_seconds() * 1000,
+                'response_time_ms': elapsed_seconds * 1000,
                 'timestamp': start_time.isoformat(),
                 'rate_limit_headers': {}
             }
@@ -77,10 +60,13 @@ class SpotifyRateLimitAnalyzer:
                     request_info['rate_limit_headers'][header] = response.headers[header]
             
             self.request_log.append(request_info)
+        
+        try:
+            response = self.http.get(endpoint, on_attempt=log_attempt)
             
             if response.status_code == 200:
                 return response.json()
-            elif response.status_code == 429:  # Rate limited
+            elif response.status_code == 429:  # Still rate limited after all retries
                 print(f"⚠️  Rate limited! Endpoint: {endpoint}")
                 if 'Retry-After' in response.headers:
                     retry_after = int(response.headers['Retry-After'])
@@ -108,7 +94,7 @@ class SpotifyRateLimitAnalyzer:
         print("   • The 'Retry-After' header tells you how long to wait")
         
         print("\n🧪 Let's test this with real requests...")
-        print("   (Don't worry - we'll be respectful and not spam the API)")
+        print("   (Don't worry - the adaptive rate limiter paces every request)")
         
         # Test with multiple quick requests to see rate limiting behavior
         print("\n1️⃣ Making several search requests to observe patterns...")
@@ -129,15 +115,13 @@ class SpotifyRateLimitAnalyzer:
                 artist = data['artists']['items'][0] if data['artists']['items'] else None
                 if artist:
                     print(f"   ✅ Found: {artist['name']} ({artist['followers']['total']:,} followers)")
-            
-            # Small delay to be respectful
-            time.sleep(0.5)
         
         print(f"\n📊 Request Analysis:")
         if self.request_log:
-            total_requests = len(self.request_log)
-            successful_requests = len([r for r in self.request_log if r['status_code'] == 200])
-            avg_response_time = sum([r['response_time_ms'] for r in self.request_log]) / total_requests
+            counters = self.request_log.counters
+            total_requests = counters['total']
+            successful_requests = counters['successful']
+            avg_response_time = counters['response_time_ms'] / total_requests
             
             print(f"   • Total requests made: {total_requests}")
             print(f"   • Successful requests: {successful_requests}")
@@ -145,11 +129,19 @@ class SpotifyRateLimitAnalyzer:
             print(f"   • Average response time: {avg_response_time:.1f}ms")
             
             # Check if we got any rate limit info
-            rate_limited = [r for r in self.request_log if r['status_code'] == 429]
+            rate_limited = counters['rate_limited']
             if rate_limited:
-                print(f"   ⚠️  Rate limited {len(rate_limited)} times")
+                print(f"   ⚠️  Rate limited {rate_limited} times")
             else:
                 print("   ✅ No rate limiting encountered (good!)")
+            if counters['dropped']:
+                print(f"   ⚠️  {counters['dropped']} request records could not be written to the log")
+            
+            self.http.metrics.print_stats()
+            self.http.print_connection_stats()
+            self.http.rate_limiter.print_stats()
+            if self.http.cache:
+                self.http.cache.print_stats()
     
     def analyze_data_structure(self):
         """Understand the structure of data returned by different endpoints"""
@@ -267,30 +259,23 @@ class SpotifyRateLimitAnalyzer:
         print("\n📋 Based on our analysis, here's your optimal data collection approach:")
         
         print("\n1️⃣ RATE LIMIT STRATEGY:")
-        print("   • Make requests every 0.5-1 seconds to be respectful")
-        print("   • Batch requests in groups (e.g., 50 requests, then pause)")
-        print("   • Always check for 429 status codes and respect Retry-After headers")
+        print("   • One token bucket per endpoint family (search, playlists, audio-features, browse)")
+        print("   • Rates grow on success and back off on 429, pausing for Retry-After")
+        print("   • Failed requests are retried automatically with jittered backoff")
         print("   • Log all requests to monitor your usage patterns")
         
         print("\n2️⃣ DATA COLLECTION PRIORITY ORDER:")
-        collection_steps = [
-            ("Categories", "Get all available playlist categories", "Low effort, high value"),
-            ("Playlists by Category", "Find popular playlists in each category", "Core data source"),
-            ("Playlist Details", "Get full details for each playlist", "Essential metadata"), 
-            ("Track Lists", "Get all tracks from selected playlists", "Primary analysis data"),
-            ("Artist Info", "Get details for artists in your dataset", "Enrichment data"),
-            ("Audio Features", "Get musical characteristics", "Analysis gold mine")
-        ]
-        
-        for i, (name, description, value) in enumerate(collection_steps, 1):
-            print(f"   {i}. {name}: {description} ({value})")
+        # request_scheduler.RequestScheduler schedules from this same plan
+        for i, step in enumerate(COLLECTION_PLAN, 1):
+            print(f"   {i}. {step['name']}: {step['description']} ({step['value']}) "
+                  f"- priority {step['priority']}, {step['budget_share']:.0%} of request budget")
         
         print("\n3️⃣ DATA STRUCTURE INSIGHTS:")
         insights = [
             "Artists have popularity scores and follower counts - great for trend analysis",
             "Playlists have follower counts and track counts - perfect for engagement metrics", 
             "Tracks have popularity scores and detailed album info - ideal for discovery analysis",
-            "All objects have unique IDs - use these to avoid duplicates and link data",
+            "All objects have unique IDs - use these to avoid duplicates and link data (dedup_index.SeenIndex skips recently fetched ones across runs)",
             "Nested objects (like artist info in tracks) provide rich relationship data"
         ]
         
@@ -308,17 +293,15 @@ class SpotifyRateLimitAnalyzer:
         
         for data_type, size, rationale in sample_sizes:
             print(f"   • {data_type}: {size} ({rationale})")
+        print("   • Or set SPOTIFY_ADAPTIVE_SAMPLING=1: each category stops once its estimates converge (adaptive_sampling.py)")
     
     def save_request_log(self):
-        """Save the request log for analysis"""
+        """Flush the streaming request log and report where it was written"""
         if self.request_log:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"request_log_{timestamp}.json"
-            
             try:
-                with open(filename, 'w') as f:
-                    json.dump(self.request_log, f, indent=2)
-                print(f"\n💾 Request log saved to '{filename}'")
+                files = self.request_log.close()
+                for filename in files:
+                    print(f"\n💾 Request log saved to '{filename}'")
                 print("   You can analyze this to understand your API usage patterns!")
             except Exception as e:
                 print(f"❌ Failed to save request log: {str(e)}")
@@ -340,10 +323,8 @@ class SpotifyRateLimitAnalyzer:
         
         # Run all analyses
         self.understand_spotify_rate_limits()
-        time.sleep(1)
         
         self.analyze_data_structure()
-        time.sleep(1)
         
         self.create_data_collection_strategy()
         
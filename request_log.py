@@ -0,0 +1,145 @@
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+_STOP = object()
+
+
+class RequestLogSink:
+    """Append-only JSON Lines request log with a bounded memory footprint
+
+    append() never touches the disk: records go onto a bounded queue that a
+    background thread drains in batches. Files rotate by size or age and
+    finished segments are gzip-compressed. Only the last ring_size records
+    stay in memory (for live stats); running totals are kept as counters.
+    """
+
+    def __init__(self, directory='.', prefix='request_log', batch_size=500,
+                 flush_interval=1.0, max_bytes=64 * 1024 * 1024, max_age=3600,
+                 compress=True, ring_size=1000, queue_size=10000, put_timeout=5.0):
+        self.directory = directory
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        self.put_timeout = put_timeout
+
+        self.recent = deque(maxlen=ring_size)
+        # dropped: records never written because the sink was closed, its writer died or it stayed full
+        self.counters = {'total': 0, 'successful': 0, 'rate_limited': 0, 'response_time_ms': 0.0, 'dropped': 0}
+        self.files = []
+        self.lock = threading.Lock()
+
+        self.run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.segment = 0
+        self.file = None
+        self.file_opened_at = 0.0
+        self.closed = False
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    def append(self, record):
+        """Queue one request record
+
+        Blocks for at most put_timeout if the writer falls far behind; the
+        record is dropped (and counted) if that runs out, or once the sink is
+        closed or its writer has died.
+        """
+        with self.lock:
+            self.recent.append(record)
+            self.counters['total'] += 1
+            self.counters['response_time_ms'] += record.get('response_time_ms', 0.0)
+            if record.get('status_code') == 200:
+                self.counters['successful'] += 1
+            elif record.get('status_code') == 429:
+                self.counters['rate_limited'] += 1
+            if self.closed or not self.writer.is_alive():
+                self.counters['dropped'] += 1
+                return
+            # Still under the lock: close() can't slip _STOP in ahead of this record.
+            # The writer never takes the lock, so waiting here can't deadlock it.
+            try:
+                self.queue.put(record, timeout=self.put_timeout)
+            except queue.Full:
+                self.counters['dropped'] += 1
+
+    def __len__(self):
+        return self.counters['total']
+
+    def __iter__(self):
+        """Iterate over the most recent records kept in memory"""
+        with self.lock:
+            return iter(list(self.recent))
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.segment += 1
+        path = os.path.join(self.directory, f"{self.prefix}_{self.run_id}_{self.segment:03d}.jsonl")
+        self.file = open(path, 'a', encoding='utf-8')
+        self.file_opened_at = time.monotonic()
+        self.files.append(path)
+
+    def _close_segment(self):
+        if self.file is None:
+            return
+        path = self.file.name
+        self.file.close()
+        self.file = None
+        if self.compress:
+            with open(path, 'rb') as src, gzip.open(f"{path}.gz", 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+            self.files[self.files.index(path)] = f"{path}.gz"
+
+    def _write_batch(self, batch):
+        if self.file is None:
+            self._open_segment()
+        self.file.write(''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in batch))
+        self.file.flush()
+
+        too_big = self.file.tell() >= self.max_bytes
+        too_old = time.monotonic() - self.file_opened_at >= self.max_age
+        if too_big or too_old:
+            self._close_segment()
+
+    def _write_loop(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self.queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                if batch:
+                    self._write_batch(batch)
+                self._close_segment()
+                return
+            if item is not None:
+                batch.append(item)
+
+            if len(batch) >= self.batch_size or (batch and time.monotonic() >= deadline):
+                self._write_batch(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+
+    def close(self):
+        """Write everything still queued, compress the last segment and stop the writer"""
+        with self.lock:
+            self.closed = True
+        if self.writer.is_alive():
+            self.queue.put(_STOP)
+            self.writer.join()
+        return self.files
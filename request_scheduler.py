@@ -0,0 +1,231 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from urllib.parse import urlparse
+
+# The collection plan as data: dependency order, what each stage is worth, its
+# scheduling priority (lower runs first when requests compete) and its share
+# of a total request budget. create_data_collection_strategy prints this table.
+COLLECTION_PLAN = [
+    {'stage': 'categories', 'name': "Categories", 'description': "Get all available playlist categories",
+     'value': "Low effort, high value", 'priority': 0, 'budget_share': 0.01},
+    {'stage': 'category_playlists', 'name': "Playlists by Category", 'description': "Find popular playlists in each category",
+     'value': "Core data source", 'priority': 1, 'budget_share': 0.04},
+    {'stage': 'playlist_details', 'name': "Playlist Details", 'description': "Get full details for each playlist",
+     'value': "Essential metadata", 'priority': 3, 'budget_share': 0.15},
+    {'stage': 'playlist_tracks', 'name': "Track Lists", 'description': "Get all tracks from selected playlists",
+     'value': "Primary analysis data", 'priority': 3, 'budget_share': 0.40},
+    {'stage': 'artists', 'name': "Artist Info", 'description': "Get details for artists in your dataset",
+     'value': "Enrichment data", 'priority': 5, 'budget_share': 0.20},
+    # Batched 100 IDs per request and the core of the analysis - outranks everything past discovery
+    {'stage': 'audio_features', 'name': "Audio Features", 'description': "Get musical characteristics",
+     'value': "Analysis gold mine", 'priority': 2, 'budget_share': 0.20},
+]
+
+# Seconds of history used to estimate throughput and per-stage arrival rates in deadline mode
+RATE_WINDOW = 30.0
+
+
+def request_stage(endpoint):
+    """Map an endpoint to its COLLECTION_PLAN stage"""
+    path = urlparse(endpoint).path
+    if path.startswith('/v1/'):
+        path = path[3:]
+    parts = path.strip('/').split('/')
+    if parts[:2] == ['browse', 'categories']:
+        return 'category_playlists' if len(parts) > 3 else 'categories'
+    if parts[0] == 'playlists':
+        return 'playlist_tracks' if len(parts) > 2 and parts[2] == 'tracks' else 'playlist_details'
+    if parts[0] == 'audio-features':
+        return 'audio_features'
+    if parts[0] == 'artists':
+        return 'artists'
+    return 'other'
+
+
+class RequestScheduler:
+    """Drains requests in plan-priority order under per-stage budgets and an optional deadline
+
+    Callers submit endpoints; a fixed pool of sender threads always takes
+    the highest-priority request waiting, so when the rate limiter is the
+    bottleneck the backlog that builds up is low-value enrichment, not
+    audio features. Each stage may spend at most its budget_share of
+    total_budget requests.
+
+    With a deadline the scheduler estimates how many more requests fit
+    (recent throughput × time left) and how many each stage will still
+    need (queued plus its recent arrival rate × time left), and sheds
+    requests from the lowest-priority stages that don't fit - capacity
+    stays reserved for audio-feature batches that haven't been discovered
+    yet. A shed request's future resolves to None at once, like a failed
+    request, rather than parking its caller: callers are often pooled
+    threads (e.g. BatchCoalescer's) that higher-value requests need. At
+    the deadline everything still waiting is shed.
+    """
+
+    def __init__(self, fetch, plan=None, total_budget=None, deadline=None, workers=8, clock=time.monotonic):
+        # fetch(endpoint) -> response, e.g. SpotifyHTTPClient.get
+        self.fetch = fetch
+        self.plan = {step['stage']: step for step in plan or COLLECTION_PLAN}
+        self.budgets = {}
+        if total_budget is not None:
+            self.budgets = {stage: max(int(total_budget * step.get('budget_share', 0)), 1) for stage, step in self.plan.items()}
+        self.clock = clock
+        self.deadline = clock() + deadline if deadline else None
+        self.queue = []
+        self.sequence = itertools.count()
+        self.queued = {stage: 0 for stage in list(self.plan) + ['other']}
+        self.started = clock()
+        self.completed = deque()
+        self.arrivals = deque()
+        self.arrival_counts = {stage: 0 for stage in self.queued}
+        self.closed = False
+        self.cond = threading.Condition()
+        self.stats = {stage: {'sent': 0, 'shed': 0, 'wait_seconds': 0.0} for stage in self.queued}
+        self.senders = [threading.Thread(target=self._send_loop, daemon=True) for _ in range(workers)]
+        for sender in self.senders:
+            sender.start()
+
+    def priority(self, stage):
+        # Unknown endpoints run after everything in the plan
+        return self.plan[stage]['priority'] if stage in self.plan else max(s['priority'] for s in self.plan.values()) + 1
+
+    def submit(self, endpoint, stage=None):
+        """Queue a request; returns a Future for the response (None if shed)"""
+        stage = stage or request_stage(endpoint)
+        future = Future()
+        with self.cond:
+            if self.closed or self._expired() or self._over_budget(stage) or self._below_cutoff(stage):
+                self._shed(stage, future)
+                return future
+            now = self.clock()
+            heapq.heappush(self.queue, (self.priority(stage), next(self.sequence), stage, endpoint, future, now))
+            self.queued[stage] += 1
+            self.arrivals.append((now, stage))
+            self.arrival_counts[stage] += 1
+            self.cond.notify()
+        return future
+
+    def get(self, endpoint, stage=None):
+        """Blocking request through the scheduler"""
+        return self.submit(endpoint, stage).result()
+
+    def _expired(self):
+        return self.deadline is not None and self.clock() >= self.deadline
+
+    def _over_budget(self, stage):
+        budget = self.budgets.get(stage)
+        return budget is not None and self.stats[stage]['sent'] + self.queued[stage] >= budget
+
+    def _below_cutoff(self, stage):
+        cutoff = self.priority_cutoff()
+        return cutoff is not None and self.priority(stage) > cutoff
+
+    def _shed(self, stage, future):
+        # Caller holds self.cond
+        self.stats[stage]['shed'] += 1
+        future.set_result(None)
+
+    def throughput(self):
+        """Completed requests per second over the recent window"""
+        now = self.clock()
+        while self.completed and self.completed[0] < now - RATE_WINDOW:
+            self.completed.popleft()
+        if len(self.completed) < 2:
+            return None
+        return len(self.completed) / max(now - self.completed[0], 1e-9)
+
+    def priority_cutoff(self):
+        """Lowest-value priority that still fits before the deadline (None = everything fits)"""
+        if self.deadline is None:
+            return None
+        rate = self.throughput()
+        if rate is None:
+            return None
+        now = self.clock()
+        time_left = max(self.deadline - now, 0.0)
+        while self.arrivals and self.arrivals[0][0] < now - RATE_WINDOW:
+            self.arrival_counts[self.arrivals.popleft()[1]] -= 1
+        span = max(min(RATE_WINDOW, now - self.started), 1e-9)
+
+        demand = {stage: queued + self.arrival_counts[stage] / span * time_left for stage, queued in self.queued.items()}
+        capacity = rate * time_left
+        total = 0.0
+        for priority in sorted({self.priority(stage) for stage in demand}):
+            total += sum(count for stage, count in demand.items() if self.priority(stage) == priority)
+            if total > capacity:
+                return priority
+        return None
+
+    def _next(self):
+        # Caller holds self.cond; returns the best sendable entry or None
+        if self._expired():
+            while self.queue:
+                _, _, stage, _, future, _ = heapq.heappop(self.queue)
+                self.queued[stage] -= 1
+                self._shed(stage, future)
+            return None
+        cutoff = self.priority_cutoff()
+        if cutoff is not None:
+            # Higher-value stages are expected to need the remaining capacity
+            kept = []
+            for entry in self.queue:
+                if entry[0] > cutoff:
+                    self.queued[entry[2]] -= 1
+                    self._shed(entry[2], entry[4])
+                else:
+                    kept.append(entry)
+            if len(kept) < len(self.queue):
+                self.queue = kept
+                heapq.heapify(self.queue)
+        if not self.queue:
+            return None
+        entry = heapq.heappop(self.queue)
+        self.queued[entry[2]] -= 1
+        return entry
+
+    def _send_loop(self):
+        while True:
+            with self.cond:
+                entry = self._next()
+                while entry is None:
+                    if self.closed and not self.queue:
+                        return
+                    # Re-check periodically: the deadline, the cutoff and throughput all move with time
+                    self.cond.wait(1.0)
+                    entry = self._next()
+                _, _, stage, endpoint, future, queued_at = entry
+                self.stats[stage]['wait_seconds'] += self.clock() - queued_at
+            try:
+                response = self.fetch(endpoint)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            with self.cond:
+                self.stats[stage]['sent'] += 1
+                self.completed.append(self.clock())
+            future.set_result(response)
+
+    def close(self):
+        """Send what's queued (or shed it, past the deadline) and stop the senders"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        for sender in self.senders:
+            sender.join()
+
+    def print_stats(self):
+        print(f"\n🗓️ Request Scheduler:")
+        if self.deadline is not None:
+            print(f"   • Time left before deadline: {max(self.deadline - self.clock(), 0):.0f}s")
+        for stage in sorted(self.stats, key=self.priority):
+            stats = self.stats[stage]
+            if not stats['sent'] and not stats['shed']:
+                continue
+            budget = self.budgets.get(stage)
+            average_wait = stats['wait_seconds'] / max(stats['sent'], 1)
+            print(f"   • {stage} (priority {self.priority(stage)}): {stats['sent']:,} sent"
+                  f"{f' of {budget:,} budgeted' if budget else ''}, {stats['shed']:,} shed, {average_wait:.2f}s avg queue wait")
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from rate_limiter import endpoint_family
+
+# Freshness per endpoint family, in seconds. Audio features never change,
+# playlists change daily, search results drift slowly.
+DEFAULT_TTLS = {
+    'search': 6 * 3600,
+    'browse': 24 * 3600,
+    'playlists': 3600,
+    'artists': 24 * 3600,
+    'tracks': 7 * 24 * 3600,
+    'audio-features': 30 * 24 * 3600,
+    'default': 3600,
+}
+
+
+class CachedResponse:
+    """The parts of requests.Response our callers use, served from the cache"""
+
+    def __init__(self, url, status_code, content=b'', headers=None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.from_cache = True
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class ResponseCache:
+    """Persistent, content-addressed HTTP response cache with ETag revalidation
+
+    Bodies are stored once per unique content hash under objects/, and an
+    SQLite index maps each URL to its body, ETag and expiry. The cache is
+    bounded by max_bytes and evicts least-recently-used entries. In offline
+    mode nothing goes to the network: hits are served regardless of age and
+    misses come back as 504, like an HTTP only-if-cached request.
+    """
+
+    def __init__(self, directory='.spotify_cache', max_bytes=512 * 1024 * 1024,
+                 ttls=None, offline=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.offline = offline
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'stored': 0, 'evicted': 0}
+
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        self.lock = threading.Lock()
+        # Bodies orphaned by the current write transaction, deleted after it commits
+        self.released = []
+        self.db = sqlite3.connect(os.path.join(directory, 'index.sqlite'), check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                body_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                content_type TEXT,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_entries_body_hash ON entries(body_hash)")
+        # Running byte total of unique bodies, kept in the index so processes sharing the cache agree
+        self.db.execute("CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL)")
+        self.db.execute(
+            "INSERT OR IGNORE INTO totals SELECT 0, COALESCE(SUM(size), 0) FROM (SELECT DISTINCT body_hash, size FROM entries)"
+        )
+        self.db.commit()
+
+    def _key(self, url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _object_path(self, body_hash):
+        return os.path.join(self.directory, 'objects', body_hash[:2], body_hash[2:])
+
+    def lookup(self, url):
+        """Return the cached entry for a URL (fresh or stale) or None"""
+        key = self._key(url)
+        with self.lock:
+            row = self.db.execute(
+                "SELECT body_hash, etag, content_type, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.db.commit()
+
+        body_hash, etag, content_type, expires_at = row
+        try:
+            with open(self._object_path(body_hash), 'rb') as f:
+                content = f.read()
+        except OSError:
+            return None
+        return {
+            'content': content,
+            'etag': etag,
+            'content_type': content_type,
+            'fresh': expires_at > time.time(),
+        }
+
+    def to_response(self, url, entry):
+        headers = {'Content-Type': entry['content_type'] or 'application/json'}
+        if entry['etag']:
+            headers['ETag'] = entry['etag']
+        return CachedResponse(url, 200, entry['content'], headers)
+
+    def get_fresh(self, url):
+        """Serve a response without the network if we can, else return (None, entry)"""
+        entry = self.lookup(url)
+        if entry and (entry['fresh'] or self.offline):
+            self.stats['hits'] += 1
+            return self.to_response(url, entry), entry
+        if self.offline:
+            self.stats['misses'] += 1
+            return CachedResponse(url, 504, b'{"error": "not cached (offline mode)"}'), None
+        self.stats['misses'] += 1
+        return None, entry
+
+    def store(self, url, response):
+        """Save a 200 response body and its validators"""
+        content = response.content
+        body_hash = hashlib.sha256(content).hexdigest()
+        path = self._object_path(body_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+        now = time.time()
+        key = self._key(url)
+
+        def work():
+            previous = self.db.execute("SELECT body_hash, size FROM entries WHERE key = ?", (key,)).fetchone()
+            added = 0 if self._body_used(body_hash) else len(content)
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, body_hash, len(content), response.headers.get('ETag'),
+                 response.headers.get('Content-Type'), now + self.ttl_for(url), now)
+            )
+            if previous and previous[0] != body_hash:
+                added -= self._release_body(*previous)
+            self.db.execute("UPDATE totals SET bytes = bytes + ? WHERE id = 0", (added,))
+            self._evict()
+
+        # Read and update the byte total in one write transaction
+        self._transaction(work)
+        self.stats['stored'] += 1
+
+    def _transaction(self, work):
+        """Run work() in one write transaction; orphaned bodies are deleted only once it commits"""
+        with self.lock:
+            self.released = []
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                work()
+            except BaseException:
+                self.db.rollback()
+                raise
+            self.db.commit()
+            for body_hash in self.released:
+                try:
+                    os.remove(self._object_path(body_hash))
+                except OSError:
+                    pass
+
+    def revalidate(self, url):
+        """A 304 came back - the cached body is good for another TTL"""
+        with self.lock:
+            self.db.execute(
+                "UPDATE entries SET expires_at = ?, last_access = ? WHERE key = ?",
+                (time.time() + self.ttl_for(url), time.time(), self._key(url))
+            )
+            self.db.commit()
+            self.stats['revalidated'] += 1
+
+    def ttl_for(self, url):
+        return self.ttls.get(endpoint_family(url), self.ttls['default'])
+
+    def _body_used(self, body_hash):
+        return self.db.execute("SELECT 1 FROM entries WHERE body_hash = ? LIMIT 1", (body_hash,)).fetchone() is not None
+
+    def _release_body(self, body_hash, size):
+        """Mark a body no entry points at any more for deletion; returns the bytes freed"""
+        if self._body_used(body_hash):
+            return 0
+        self.released.append(body_hash)
+        return size
+
+    def _evict(self):
+        # Caller holds self.lock inside a write transaction. Sizes are counted per unique body.
+        total = self.db.execute("SELECT bytes FROM totals WHERE id = 0").fetchone()[0]
+        freed = 0
+        while total - freed > self.max_bytes:
+            oldest = self.db.execute("SELECT key, body_hash, size FROM entries ORDER BY last_access LIMIT 64").fetchall()
+            if not oldest:
+                break
+            for key, body_hash, size in oldest:
+                self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.stats['evicted'] += 1
+                freed += self._release_body(body_hash, size)
+                if total - freed <= self.max_bytes:
+                    break
+        if freed:
+            self.db.execute("UPDATE totals SET bytes = bytes - ? WHERE id = 0", (freed,))
+
+    def print_stats(self):
+        print(f"\n🗄️  Response Cache Stats:")
+        print(f"   • Hits: {self.stats['hits']}")
+        print(f"   • Misses: {self.stats['misses']}")
+        print(f"   • Revalidated (304): {self.stats['revalidated']}")
+        print(f"   • Stored: {self.stats['stored']}")
+        print(f"   • Evicted: {self.stats['evicted']}")
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,245 @@
+import json
+import os
+
+import numpy as np
+
+from audio_analytics import AudioFeatureMatrix
+from entities import ID_WIDTH
+
+# Rows scored per matrix product in exact search; ~2.4MB of float32 distances per query
+BLOCK_SIZE = 65536
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE = 100000
+
+
+def kmeans(vectors, clusters, iterations=KMEANS_ITERATIONS, sample=KMEANS_SAMPLE, seed=0):
+    """Lloyd's k-means on a random sample; returns float32 centroids"""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample:
+        vectors = vectors[np.sort(rng.choice(len(vectors), sample, replace=False))]
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = nearest_centroids(vectors, centroids, 1)[:, 0]
+        counts = np.bincount(assignment, minlength=clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        occupied = counts > 0
+        # Empty clusters keep their old centroid rather than collapsing to zero
+        centroids[occupied] = sums[occupied] / counts[occupied, None]
+    return centroids
+
+
+def nearest_centroids(vectors, centroids, count):
+    distances = (centroids * centroids).sum(axis=1) - 2 * vectors @ centroids.T
+    if count >= centroids.shape[0]:
+        return np.argsort(distances, axis=1)
+    nearest = np.argpartition(distances, count - 1, axis=1)[:, :count]
+    order = np.take_along_axis(distances, nearest, axis=1).argsort(axis=1)
+    return np.take_along_axis(nearest, order, axis=1)
+
+
+class SimilarityIndex:
+    """k-NN index over standardized audio-feature vectors
+
+    Features are z-scored (tempo and loudness would otherwise swamp the 0-1
+    features) and compared by Euclidean distance, expanded as
+    |x|^2 - 2 q.x so exact search is one matrix product per block of rows.
+    The approximate mode is an inverted file: rows are clustered with
+    k-means and stored grouped by cluster, so a query scans only the
+    nprobe closest clusters, each one a contiguous slice.
+
+    save() writes plain .npy files and load() memory-maps them, so opening
+    an index over millions of tracks takes milliseconds and the OS pages in
+    only the rows a query touches.
+    """
+
+    def __init__(self, vectors, norms, popularity, track_ids, sorted_ids, id_rows, mean, std, columns,
+                 centroids=None, list_offsets=None):
+        self.vectors = vectors
+        self.norms = norms
+        self.popularity = popularity
+        self.track_ids = track_ids
+        # Binary search over sorted IDs instead of a dict, so lookups work straight off the memmap
+        self.sorted_ids = sorted_ids
+        self.id_rows = id_rows
+        self.mean = mean
+        self.std = std
+        self.columns = columns
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+
+    @classmethod
+    def build(cls, matrix, clusters=None, seed=0):
+        """Build from an AudioFeatureMatrix; clusters=0 skips the approximate index
+
+        The default cluster count, about sqrt(n), keeps each cluster and the
+        centroid scan both small.
+        """
+        if matrix.track_ids is None:
+            raise ValueError("The feature matrix needs track IDs")
+        features = matrix.features.astype(np.float32)
+        if len(features):
+            mean = features.mean(axis=0)
+            std = features.std(axis=0)
+        else:
+            mean = np.zeros(features.shape[1], dtype=np.float32)
+            std = np.ones(features.shape[1], dtype=np.float32)
+        std[std == 0] = 1.0
+        vectors = (features - mean) / std
+        popularity = matrix.popularity.astype(np.int8)
+        track_ids = np.asarray(matrix.track_ids).astype(f'S{ID_WIDTH}')
+
+        if clusters is None:
+            clusters = int(np.sqrt(len(vectors))) if len(vectors) >= 1000 else 0
+        centroids = list_offsets = None
+        if clusters:
+            centroids = kmeans(vectors, clusters, seed=seed)
+            assignment = np.concatenate([
+                nearest_centroids(vectors[start:start + BLOCK_SIZE], centroids, 1)[:, 0]
+                for start in range(0, len(vectors), BLOCK_SIZE)
+            ])
+            # Regroup every row by cluster; list i is rows list_offsets[i]:list_offsets[i + 1]
+            order = np.argsort(assignment, kind='stable')
+            vectors, popularity, track_ids = vectors[order], popularity[order], track_ids[order]
+            list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=clusters))])
+
+        vectors = np.ascontiguousarray(vectors)
+        id_rows = np.argsort(track_ids)
+        return cls(vectors, (vectors * vectors).sum(axis=1), popularity, track_ids, track_ids[id_rows], id_rows,
+                   mean, std, list(matrix.columns), centroids, list_offsets)
+
+    @classmethod
+    def from_store(cls, store, clusters=None, **filters):
+        """Index every track in a ColumnarStore that has audio features and a popularity"""
+        return cls.build(AudioFeatureMatrix.from_store(store, **filters), clusters)
+
+    ARRAYS = ('vectors', 'norms', 'popularity', 'track_ids', 'sorted_ids', 'id_rows', 'centroids', 'list_offsets')
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            if array is not None:
+                np.save(os.path.join(directory, f"{name}.npy"), array)
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump({'columns': self.columns, 'mean': self.mean.tolist(), 'std': self.std.tolist()}, f)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        arrays = {}
+        for name in cls.ARRAYS:
+            path = os.path.join(directory, f"{name}.npy")
+            arrays[name] = np.load(path, mmap_mode='r' if mmap else None) if os.path.exists(path) else None
+        return cls(columns=meta['columns'], mean=np.array(meta['mean'], dtype=np.float32),
+                   std=np.array(meta['std'], dtype=np.float32), **arrays)
+
+    def __len__(self):
+        return len(self.track_ids)
+
+    def rows_for(self, track_ids):
+        """Index rows for track IDs (-1 where a track isn't indexed)"""
+        keys = np.asarray(track_ids).astype(f'S{ID_WIDTH}')
+        if len(self.sorted_ids) == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+        position = np.clip(np.searchsorted(self.sorted_ids, keys), 0, len(self.sorted_ids) - 1)
+        found = self.sorted_ids[position] == keys
+        return np.where(found, self.id_rows[position], -1)
+
+    def vectorize(self, features):
+        """Standardize raw feature rows (in self.columns order) like the indexed ones"""
+        return ((np.atleast_2d(np.asarray(features, dtype=np.float32)) - self.mean) / self.std).astype(np.float32)
+
+    def _scan(self, queries, start, stop, best, k, min_popularity, max_popularity, exclude):
+        """Merge rows start:stop into best = (distances, rows), each (queries, k)"""
+        block = np.asarray(self.vectors[start:stop])
+        distances = np.asarray(self.norms[start:stop])[None, :] - 2 * queries @ block.T
+        if min_popularity is not None or max_popularity is not None:
+            popularity = np.asarray(self.popularity[start:stop])
+            allowed = np.ones(stop - start, dtype=bool)
+            if min_popularity is not None:
+                allowed &= popularity >= min_popularity
+            if max_popularity is not None:
+                allowed &= popularity <= max_popularity
+            distances[:, ~allowed] = np.inf
+        if exclude is not None:
+            inside = (exclude >= start) & (exclude < stop)
+            distances[np.nonzero(inside)[0], exclude[inside] - start] = np.inf
+
+        count = min(k, stop - start)
+        candidates = np.argpartition(distances, count - 1, axis=1)[:, :count]
+        merged_distances = np.concatenate([best[0], np.take_along_axis(distances, candidates, axis=1)], axis=1)
+        merged_rows = np.concatenate([best[1], candidates + start], axis=1)
+        keep = np.argpartition(merged_distances, k - 1, axis=1)[:, :k]
+        return np.take_along_axis(merged_distances, keep, axis=1), np.take_along_axis(merged_rows, keep, axis=1)
+
+    def search(self, queries, k=10, approximate=False, nprobe=8, min_popularity=None, max_popularity=None,
+               exclude=None):
+        """Nearest k rows for each standardized query vector -> (distances, rows), nearest first
+
+        exclude holds one row per query to leave out (e.g. the query track
+        itself), or -1. Filtered-out and missing neighbours come back as
+        row -1 with an infinite distance.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        exclude = None if exclude is None else np.asarray(exclude)
+        if approximate and self.centroids is None:
+            raise ValueError("This index was built without clusters - use exact search")
+
+        def empty(count):
+            return np.full((count, k), np.inf, dtype=np.float32), np.full((count, k), -1, dtype=np.int64)
+
+        if not approximate:
+            best = empty(len(queries))
+            for start in range(0, len(self), BLOCK_SIZE):
+                best = self._scan(queries, start, min(start + BLOCK_SIZE, len(self)), best, k,
+                                  min_popularity, max_popularity, exclude)
+            distances, rows = best
+        else:
+            # Each query probes different clusters, so clusters are scanned per query
+            distances, rows = empty(len(queries))
+            probes = nearest_centroids(queries, np.asarray(self.centroids), nprobe)
+            for i, query in enumerate(queries):
+                best = empty(1)
+                query_exclude = None if exclude is None else exclude[i:i + 1]
+                for cluster in probes[i]:
+                    start, stop = int(self.list_offsets[cluster]), int(self.list_offsets[cluster + 1])
+                    if stop > start:
+                        best = self._scan(query[None, :], start, stop, best, k,
+                                          min_popularity, max_popularity, query_exclude)
+                distances[i], rows[i] = best[0][0], best[1][0]
+
+        order = np.argsort(distances, axis=1)
+        distances = np.take_along_axis(distances, order, axis=1)
+        rows = np.take_along_axis(rows, order, axis=1)
+        rows[~np.isfinite(distances)] = -1
+        # Add back |q|^2 so the distances are true squared Euclidean distances
+        return distances + (queries * queries).sum(axis=1)[:, None], rows
+
+    def similar_tracks(self, track_ids, k=10, **options):
+        """{track_id: [(neighbour_id, distance, popularity)]} for indexed tracks, excluding themselves
+
+        e.g. similar_tracks([hit_id], max_popularity=30) finds
+        low-popularity tracks that sound like a hit.
+        """
+        rows = self.rows_for(track_ids)
+        known = rows >= 0
+        queries = np.asarray(self.vectors[rows[known]]) if known.any() else np.empty((0, len(self.columns)), dtype=np.float32)
+        distances, neighbours = self.search(queries, k, exclude=rows[known], **options)
+        results = {}
+        for track_id, row_distances, row_neighbours in zip(np.asarray(track_ids)[known], distances, neighbours):
+            results[str(track_id)] = [
+                (self.track_ids[row].decode('ascii'), float(np.sqrt(max(distance, 0.0))), int(self.popularity[row]))
+                for distance, row in zip(row_distances, row_neighbours) if row >= 0
+            ]
+        return results
+
+    def print_stats(self):
+        print(f"\n🧭 Similarity Index:")
+        print(f"   • Tracks: {len(self):,} × {len(self.columns)} features")
+        if self.centroids is not None:
+            sizes = np.diff(np.asarray(self.list_offsets))
+            print(f"   • Clusters: {len(sizes):,} (median {int(np.median(sizes))} tracks, max {int(sizes.max())})")
+        print(f"   • Vector data: {self.vectors.nbytes / (1024 * 1024):.1f}MB")
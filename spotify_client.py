@@ -0,0 +1,189 @@
+import os
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import RequestMetrics
+from rate_limiter import AdaptiveRateLimiter, RETRYABLE_STATUS_CODES, parse_retry_after
+from response_cache import ResponseCache
+from token_manager import SPOTIFY_TOKEN_URL, TokenManager
+
+SPOTIFY_API_BASE_URL = 'https://api.spotify.com/v1'
+
+
+class SpotifyHTTPClient:
+    """Pooled, keep-alive HTTP session shared by every Spotify API caller"""
+
+    def __init__(self, base_url=SPOTIFY_API_BASE_URL, pool_connections=4,
+                 pool_maxsize=16, pool_block=True, timeout=10, rate_limiter=None, cache=None,
+                 token_manager=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.cache = cache
+        # When set, every GET is authorized automatically and 401s are replayed once
+        self.token_manager = token_manager
+        self.metrics = RequestMetrics()
+
+        # One session = one set of connection pools, so TCP/TLS handshakes
+        # are paid once per connection instead of once per request
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+        })
+
+        # pool_connections = how many hosts we keep pools for,
+        # pool_maxsize = how many open connections we keep per host
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+
+    def build_url(self, endpoint):
+        """Turn an API endpoint (or an absolute 'next' link) into a full URL"""
+        if endpoint.startswith('http://') or endpoint.startswith('https://'):
+            return endpoint
+        return f"{self.base_url}{endpoint}"
+
+    def get(self, endpoint, headers=None, on_attempt=None):
+        """GET an endpoint through the response cache, the rate limiter and the shared pool
+
+        on_attempt(response, elapsed_seconds) is called for every HTTP attempt,
+        including 429s and retried failures, so callers can log them.
+        Returns the final response (which may still be an error after retries).
+        """
+        url = self.build_url(endpoint)
+        if not self.token_manager:
+            return self.cached_get(url, headers, on_attempt)
+
+        token = self.token_manager.get_token()
+        response = self.cached_get(url, self.with_auth(headers, token), on_attempt)
+        if response.status_code == 401:
+            # Expired or revoked token - refresh once and replay the request
+            token = self.token_manager.invalidate(token)
+            if token:
+                response = self.cached_get(url, self.with_auth(headers, token), on_attempt)
+        return response
+
+    def with_auth(self, headers, token):
+        headers = dict(headers or {})
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        return headers
+
+    def cached_get(self, url, headers=None, on_attempt=None):
+        """Serve from the response cache when possible, otherwise send and store"""
+        if not self.cache:
+            return self.send(url, headers, on_attempt)
+
+        cached, entry = self.cache.get_fresh(url)
+        if cached:
+            return cached
+
+        # Stale entry: ask Spotify whether it changed instead of refetching it
+        if entry and entry['etag']:
+            headers = dict(headers or {}, **{'If-None-Match': entry['etag']})
+
+        response = self.send(url, headers, on_attempt)
+        if response.status_code == 304 and entry:
+            self.cache.revalidate(url)
+            return self.cache.to_response(url, entry)
+        if response.status_code == 200:
+            self.cache.store(url, response)
+        return response
+
+    def send(self, url, headers=None, on_attempt=None):
+        """Send one GET over the network, paced and retried by the rate limiter"""
+        limiter = self.rate_limiter
+
+        for attempt in range(limiter.max_retries + 1):
+            self.metrics.observe_wait(limiter.acquire(url))
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except requests.RequestException:
+                if attempt == limiter.max_retries:
+                    raise
+                limiter.sleep(limiter.backoff_delay(attempt))
+                continue
+
+            elapsed = time.perf_counter() - start
+            self.metrics.observe(url, response.status_code, elapsed, len(response.content))
+            if on_attempt:
+                on_attempt(response, elapsed)
+
+            if response.status_code == 429:
+                # The bucket pauses itself until Retry-After has passed
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                limiter.record_rate_limited(url, retry_after)
+            elif response.status_code not in RETRYABLE_STATUS_CODES:
+                limiter.record_success(url)
+                return response
+            elif attempt < limiter.max_retries:
+                limiter.sleep(limiter.backoff_delay(attempt))
+
+        return response
+
+    def post(self, url, data=None, headers=None):
+        """POST through the shared pool (used for the token endpoint)"""
+        return self.session.post(url, data=data, headers=headers, timeout=self.timeout)
+
+    def connection_stats(self):
+        """Report how many requests reused a pooled connection vs. opened a new one"""
+        stats = {'requests': 0, 'new_connections': 0, 'reused_connections': 0, 'hosts': 0}
+
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            stats['hosts'] += 1
+            stats['requests'] += pool.num_requests
+            stats['new_connections'] += pool.num_connections
+
+        stats['reused_connections'] = max(stats['requests'] - stats['new_connections'], 0)
+        if stats['requests']:
+            stats['reuse_rate'] = stats['reused_connections'] / stats['requests']
+        else:
+            stats['reuse_rate'] = 0.0
+        return stats
+
+    def print_connection_stats(self):
+        """Print connection reuse numbers in the same style as the other reports"""
+        stats = self.connection_stats()
+        print(f"\n🔌 Connection Pool Stats:")
+        print(f"   • Requests sent: {stats['requests']}")
+        print(f"   • New connections opened: {stats['new_connections']}")
+        print(f"   • Reused connections: {stats['reused_connections']}")
+        print(f"   • Reuse rate: {stats['reuse_rate']*100:.1f}%")
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+_shared_client = None
+
+
+def get_shared_client():
+    """Return the process-wide client so every caller shares one connection pool"""
+    global _shared_client
+    if _shared_client is None:
+        cache_dir = os.getenv('SPOTIFY_CACHE_DIR', '.spotify_cache')
+        cache = None
+        if os.getenv('SPOTIFY_CACHE', '1') != '0':
+            cache = ResponseCache(directory=cache_dir, offline=os.getenv('SPOTIFY_CACHE_ONLY') == '1')
+        # Point these at mock_spotify_server.py for load tests without real quota
+        _shared_client = SpotifyHTTPClient(
+            base_url=os.getenv('SPOTIFY_API_BASE_URL', SPOTIFY_API_BASE_URL),
+            cache=cache,
+        )
+        _shared_client.token_manager = TokenManager(
+            http_client=_shared_client,
+            cache_path=os.path.join(cache_dir, 'token.json'),
+            token_url=os.getenv('SPOTIFY_TOKEN_URL', SPOTIFY_TOKEN_URL),
+        )
+    return _shared_client
@@ -0,0 +1,319 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+
+import pyarrow as pa
+
+from track_store import AUDIO_FEATURE_COLUMNS, ROW_BUILDERS, SCHEMAS
+
+FEATURE_COLUMNS = AUDIO_FEATURE_COLUMNS + ['key', 'mode', 'time_signature', 'duration_ms']
+
+SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS playlists (
+        playlist_id TEXT PRIMARY KEY,
+        name TEXT,
+        description TEXT,
+        owner TEXT,
+        followers INTEGER,
+        total_tracks INTEGER,
+        snapshot_id TEXT,
+        category TEXT,
+        collected_date TEXT
+    );
+    CREATE TABLE IF NOT EXISTS tracks (
+        track_id TEXT PRIMARY KEY,
+        name TEXT,
+        popularity INTEGER,
+        duration_ms INTEGER,
+        explicit INTEGER,
+        album_id TEXT,
+        album_name TEXT,
+        release_date TEXT,
+        category TEXT,
+        collected_date TEXT
+    );
+    CREATE TABLE IF NOT EXISTS albums (
+        album_id TEXT PRIMARY KEY,
+        name TEXT,
+        album_type TEXT,
+        release_date TEXT,
+        total_tracks INTEGER,
+        category TEXT,
+        collected_date TEXT
+    );
+    CREATE TABLE IF NOT EXISTS artists (
+        artist_id TEXT PRIMARY KEY,
+        name TEXT,
+        popularity INTEGER,
+        followers INTEGER,
+        category TEXT,
+        collected_date TEXT
+    );
+    CREATE TABLE IF NOT EXISTS audio_features (
+        track_id TEXT PRIMARY KEY,
+        {', '.join(f'{column} REAL' if column in AUDIO_FEATURE_COLUMNS else f'{column} INTEGER' for column in FEATURE_COLUMNS)},
+        category TEXT,
+        collected_date TEXT
+    );
+    CREATE TABLE IF NOT EXISTS playlist_tracks (
+        playlist_id TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        track_id TEXT NOT NULL,
+        added_at TEXT,
+        PRIMARY KEY (playlist_id, position)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS track_artists (
+        track_id TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        artist_id TEXT NOT NULL,
+        PRIMARY KEY (track_id, position)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS album_artists (
+        album_id TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        artist_id TEXT NOT NULL,
+        PRIMARY KEY (album_id, position)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS artist_genres (
+        artist_id TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        genre TEXT NOT NULL,
+        PRIMARY KEY (artist_id, position)
+    ) WITHOUT ROWID;
+    -- Categories written since derived tables (e.g. dashboard_cache) last caught up
+    CREATE TABLE IF NOT EXISTS dirty_categories (
+        category TEXT PRIMARY KEY,
+        marked_at REAL NOT NULL
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_playlists_category ON playlists(category);
+    CREATE INDEX IF NOT EXISTS idx_tracks_popularity ON tracks(popularity);
+    CREATE INDEX IF NOT EXISTS idx_tracks_album ON tracks(album_id);
+    CREATE INDEX IF NOT EXISTS idx_artists_popularity ON artists(popularity);
+    CREATE INDEX IF NOT EXISTS idx_playlist_tracks_track ON playlist_tracks(track_id, playlist_id);
+    CREATE INDEX IF NOT EXISTS idx_track_artists_artist ON track_artists(artist_id, track_id);
+    CREATE INDEX IF NOT EXISTS idx_album_artists_artist ON album_artists(artist_id);
+    CREATE INDEX IF NOT EXISTS idx_artist_genres_genre ON artist_genres(genre, artist_id);
+"""
+
+# List-valued row fields live in link tables: (table, field) -> (link table, owner key, value column)
+LINKS = {
+    ('tracks', 'artist_ids'): ('track_artists', 'track_id', 'artist_id'),
+    ('albums', 'artist_ids'): ('album_artists', 'album_id', 'artist_id'),
+    ('artists', 'genres'): ('artist_genres', 'artist_id', 'genre'),
+}
+
+KEYS = {
+    'playlists': 'playlist_id',
+    'tracks': 'track_id',
+    'albums': 'album_id',
+    'artists': 'artist_id',
+    'audio_features': 'track_id',
+}
+
+
+class RelationalStore:
+    """SQLite store of the crawl's current state, indexed for cross-entity joins
+
+    Accepts the same append/append_row/append_table/flush calls as
+    ColumnarStore, so it can be passed to AsyncCollector as its store, and
+    import_columnar() loads an existing Parquet corpus. Writes are buffered
+    and inserted with executemany, one transaction per batch. Entities are
+    upserted (latest values win, the first category seen is kept), while the
+    Parquet store remains the history of every collection date.
+
+    The database runs in WAL mode: query() uses a read-only connection per
+    thread, so dashboard and notebook reads never wait on the writer.
+    """
+
+    def __init__(self, path='data/discovery.sqlite', batch_size=5000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.buffers = {}
+        # Buffers are filled by the crawl and flushed by refreshers on other threads
+        self.buffer_lock = threading.Lock()
+        self.lock = threading.Lock()
+        self.readers = threading.local()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL only risks the last transactions on power loss, never corruption
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+        self.stats = {'rows': 0, 'batches': 0, 'write_seconds': 0.0}
+
+    def append(self, table, obj, category='uncategorized', collected_date=None):
+        """Buffer one raw API object (track, artist, ...)"""
+        self.append_row(table, ROW_BUILDERS[table](obj), category, collected_date)
+
+    def append_row(self, table, row, category='uncategorized', collected_date=None):
+        """Buffer one row shaped like track_store's row builders produce"""
+        with self.buffer_lock:
+            buffer = self.buffers.setdefault(table, [])
+            buffer.append((row, category, collected_date or date.today().isoformat()))
+            rows = self.buffers.pop(table) if len(buffer) >= self.batch_size else None
+        if rows:
+            self._write(table, rows)
+
+    def append_table(self, table, data, category='uncategorized', collected_date=None):
+        """Buffer an Arrow table matching SCHEMAS[table] (e.g. from NormalizerPool)"""
+        for row in data.to_pylist():
+            self.append_row(table, row, category, collected_date)
+
+    def flush(self):
+        with self.buffer_lock:
+            buffers, self.buffers = self.buffers, {}
+        for table, rows in buffers.items():
+            if rows:
+                self._write(table, rows)
+
+    def _write(self, table, rows):
+        start = time.perf_counter()
+        with self.lock:
+            with self.db:
+                if table == 'playlist_tracks':
+                    self.db.executemany(
+                        "INSERT OR REPLACE INTO playlist_tracks (playlist_id, position, track_id, added_at) VALUES (?, ?, ?, ?)",
+                        [(row['playlist_id'], row['position'], row['track_id'], row.get('added_at')) for row, _, _ in rows]
+                    )
+                else:
+                    self._upsert(table, rows)
+                if table == 'playlists':
+                    # A recrawled playlist that got shorter keeps no rows past its new end
+                    self.db.executemany(
+                        "DELETE FROM playlist_tracks WHERE playlist_id = ? AND position >= ?",
+                        [(row['playlist_id'], row['total_tracks']) for row, _, _ in rows if row.get('total_tracks') is not None]
+                    )
+                now = time.time()
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO dirty_categories (category, marked_at) VALUES (?, ?)",
+                    [(category, now) for category in {category for _, category, _ in rows}]
+                )
+            self.stats['rows'] += len(rows)
+            self.stats['batches'] += 1
+            self.stats['write_seconds'] += time.perf_counter() - start
+
+    def _upsert(self, table, rows):
+        key = KEYS[table]
+        links = {field: link for (owner, field), link in LINKS.items() if owner == table}
+        columns = [name for name in SCHEMAS[table].names if name not in links] + ['category', 'collected_date']
+        updates = ', '.join(f"{column} = excluded.{column}" for column in columns if column not in (key, 'category'))
+        self.db.executemany(
+            f"""INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})
+                ON CONFLICT({key}) DO UPDATE SET {updates}""",
+            [tuple(row.get(column) for column in columns[:-2]) + (category, collected_date)
+             for row, category, collected_date in rows]
+        )
+        for field, (link_table, owner_key, value_column) in links.items():
+            ids = [(row[key],) for row, _, _ in rows]
+            self.db.executemany(f"DELETE FROM {link_table} WHERE {owner_key} = ?", ids)
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO {link_table} ({owner_key}, position, {value_column}) VALUES (?, ?, ?)",
+                [(row[key], position, value) for row, _, _ in rows for position, value in enumerate(row.get(field) or [])]
+            )
+
+    def import_columnar(self, store, tables=None, **filters):
+        """Bulk-load a ColumnarStore (filters as in ColumnarStore.load, e.g. since='2025-07-01')"""
+        for table in tables or ['playlists', 'tracks', 'albums', 'artists', 'audio_features', 'playlist_tracks']:
+            data = store.load(table, **filters)
+            for batch in data.to_batches(self.batch_size):
+                columns = batch.to_pydict()
+                categories = columns.pop('category', None) or ['uncategorized'] * batch.num_rows
+                dates = columns.pop('collected_date', None) or [None] * batch.num_rows
+                for i, row in enumerate(zip(*columns.values())):
+                    self.append_row(table, dict(zip(columns, row)), categories[i], dates[i])
+        self.flush()
+        self.optimize()
+
+    def optimize(self):
+        """Refresh the query planner's statistics after a large load"""
+        with self.lock:
+            self.db.execute("ANALYZE")
+            self.db.commit()
+
+    def _reader(self):
+        reader = getattr(self.readers, 'db', None)
+        if reader is None:
+            reader = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self.readers.db = reader
+        return reader
+
+    def query(self, sql, params=()):
+        """Run a read-only query on this thread's reader connection"""
+        return self._reader().execute(sql, params).fetchall()
+
+    def query_df(self, sql, params=()):
+        """Run a read-only query into a pandas DataFrame"""
+        import pandas as pd
+
+        return pd.read_sql_query(sql, self._reader(), params=params)
+
+    def load(self, table, columns=None):
+        """Load a table as an Arrow Table with the Parquet store's schema (plus category)
+
+        Lets collector code that reads back from its store (e.g. the resume
+        pass in AsyncCollector) run against this store too.
+        """
+        schema = SCHEMAS[table].append(pa.field('category', pa.string()))
+        columns = columns or schema.names
+        key = KEYS.get(table)
+        select = []
+        for column in columns:
+            link = LINKS.get((table, column))
+            if link:
+                link_table, owner_key, value_column = link
+                select.append(f"(SELECT json_group_array({value_column}) FROM "
+                              f"(SELECT {value_column} FROM {link_table} WHERE {owner_key} = {table}.{key} ORDER BY position))")
+            else:
+                select.append(column)
+        rows = self.query(f"SELECT {', '.join(select)} FROM {table}")
+        list_columns = [i for i, column in enumerate(columns) if (table, column) in LINKS]
+        data = {column: [] for column in columns}
+        for row in rows:
+            for i, (column, value) in enumerate(zip(columns, row)):
+                data[column].append(json.loads(value) if i in list_columns else value)
+        return pa.Table.from_pydict(data, schema=pa.schema([schema.field(column) for column in columns]))
+
+    def emerging_artists(self, max_popularity=50, min_categories=3, limit=50):
+        """Lower-popularity artists spread across many category playlists"""
+        return self.query_df("""
+            SELECT a.artist_id, a.name, a.popularity, a.followers,
+                   COUNT(DISTINCT p.category) AS categories,
+                   COUNT(DISTINCT pt.playlist_id) AS playlists,
+                   COUNT(DISTINCT ta.track_id) AS tracks
+            FROM artists a
+            JOIN track_artists ta ON ta.artist_id = a.artist_id
+            JOIN playlist_tracks pt ON pt.track_id = ta.track_id
+            JOIN playlists p ON p.playlist_id = pt.playlist_id
+            WHERE a.popularity <= ?
+            GROUP BY a.artist_id
+            HAVING categories >= ?
+            ORDER BY categories DESC, playlists DESC, a.popularity
+            LIMIT ?
+        """, (max_popularity, min_categories, limit))
+
+    def counts(self):
+        return {table: self.query(f"SELECT COUNT(*) FROM {table}")[0][0]
+                for table in list(KEYS) + ['playlist_tracks']}
+
+    def print_stats(self):
+        print(f"\n🗄️ Relational Store ({self.path}):")
+        for table, count in self.counts().items():
+            print(f"   • {table}: {count:,}")
+        if self.stats['batches']:
+            rate = self.stats['rows'] / max(self.stats['write_seconds'], 1e-9)
+            print(f"   • Inserted: {self.stats['rows']:,} rows in {self.stats['batches']} batches ({rate:,.0f} rows/s)")
+
+    def close(self):
+        self.flush()
+        reader = getattr(self.readers, 'db', None)
+        if reader is not None:
+            reader.close()
+        with self.lock:
+            self.db.close()
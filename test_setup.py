@@ -1,6 +1,7 @@
 import os
-import requests
 from dotenv import load_dotenv
+from spotify_client import SpotifyHTTPClient
+from token_manager import TokenManager
 
 # Load environment variables from .env file
 load_dotenv()
@@ -33,37 +34,25 @@ def test_spotify_connection():
     
     print("🔄 Attempting to connect to Spotify API...")
     
-    # Get access token from Spotify
-    auth_url = 'https://accounts.spotify.com/api/token'
-    auth_headers = {
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    auth_data = {
-        'grant_type': 'client_credentials',
-        'client_id': client_id,
-        'client_secret': client_secret
-    }
+    # Get access token through the shared token manager (cached on disk, refreshed before expiry)
+    client = SpotifyHTTPClient()
+    client.token_manager = TokenManager(client_id, client_secret, http_client=client)
     
     try:
         # Request access token
-        response = requests.post(auth_url, headers=auth_headers, data=auth_data)
+        access_token = client.token_manager.get_token()
         
-        if response.status_code == 200:
+        if access_token:
             print("✅ SUCCESS: Connected to Spotify API!")
-            
-            # Get the access token
-            token_data = response.json()
-            access_token = token_data['access_token']
             print(f"🔑 Access token received: {access_token[:20]}...")
             
             # Test getting a popular playlist
             print("🔄 Testing playlist data retrieval...")
-            headers = {'Authorization': f'Bearer {access_token}'}
             
             # Let's try a different approach - search for a popular artist instead
             test_url = 'https://api.spotify.com/v1/search?q=Taylor%20Swift&type=artist&limit=1'
             
-            playlist_response = requests.get(test_url, headers=headers)
+            playlist_response = client.get(test_url)
             
             if playlist_response.status_code == 200:
                 playlist_data = playlist_response.json()
@@ -78,8 +67,10 @@ def test_spotify_connection():
                 
         else:
             print(f"❌ Failed to connect to Spotify API")
-            print(f"Status code: {response.status_code}")
-            print(f"Error: {response.text}")
+            if client.token_manager.last_error:
+                status_code, body = client.token_manager.last_error
+                print(f"Status code: {status_code}")
+                print(f"Error: {body}")
             print("\n🔧 Troubleshooting tips:")
             print("- Double-check your Client ID and Client Secret in the .env file")
             print("- Make sure there are no extra spaces in your .env file")
@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from rate_limiter import AdaptiveRateLimiter
+
+try:
+    import fcntl
+except ImportError:  # Windows - fall back to per-process locking only
+    fcntl = None
+
+SPOTIFY_TOKEN_URL = 'https://accounts.spotify.com/api/token'
+
+
+class TokenManager:
+    """Client-credentials token cached on disk with its expiry and refreshed early
+
+    Every process pointing at the same cache_path shares one token: the file
+    is read under a lock, and only the process that finds it missing or close
+    to expiry calls the token endpoint. A background thread refreshes the
+    token before callers would consider it expiring, and invalidate() lets
+    the HTTP client swap out a token Spotify rejected with 401.
+    """
+
+    def __init__(self, client_id=None, client_secret=None, http_client=None,
+                 cache_path='.spotify_cache/token.json', token_url=SPOTIFY_TOKEN_URL,
+                 refresh_margin=300, background_refresh=True, retry_base=2.0, retry_cap=600.0):
+        self.client_id = client_id or os.getenv('SPOTIFY_CLIENT_ID')
+        self.client_secret = client_secret or os.getenv('SPOTIFY_CLIENT_SECRET')
+        self.http = http_client
+        self.cache_path = cache_path
+        self.token_url = token_url
+        self.refresh_margin = refresh_margin
+        self.background_refresh = background_refresh
+
+        self.token = None
+        self.expires_at = 0.0
+        self.refresh_count = 0
+        # (status code, response body) of the last failed token request
+        self.last_error = None
+        self.lock = threading.Lock()
+        self.refresher = None
+        self.stop_event = threading.Event()
+        # Only its jittered backoff is used: failed background refreshes back off up to retry_cap
+        self.retry_backoff = AdaptiveRateLimiter(backoff_base=retry_base, backoff_cap=retry_cap)
+
+    def _valid(self, expires_at, margin=None):
+        return expires_at - (self.refresh_margin if margin is None else margin) > time.time()
+
+    @contextmanager
+    def _file_lock(self):
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.cache_path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path) as f:
+                data = json.load(f)
+            return data['access_token'], float(data['expires_at'])
+        except (OSError, ValueError, KeyError):
+            return None, 0.0
+
+    def _write_cache(self, token, expires_at):
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        # The token is a credential - keep it private to this user
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'access_token': token, 'expires_at': expires_at}, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _request_token(self):
+        if self.http is None:
+            from spotify_client import get_shared_client
+            self.http = get_shared_client()
+
+        response = self.http.post(
+            self.token_url,
+            headers={'Content-Type': 'application/x-www-form-urlencoded'},
+            data={
+                'grant_type': 'client_credentials',
+                'client_id': self.client_id,
+                'client_secret': self.client_secret,
+            },
+        )
+        if response.status_code != 200:
+            print(f"❌ Failed to get access token: {response.status_code}")
+            self.last_error = (response.status_code, response.text)
+            return None, 0.0
+
+        self.last_error = None
+        token_data = response.json()
+        self.refresh_count += 1
+        return token_data['access_token'], time.time() + token_data.get('expires_in', 3600)
+
+    def refresh(self, rejected_token=None, margin=None):
+        """Load a valid token from disk, or fetch a new one if none is usable
+
+        rejected_token is a token the API refused; it's never reused even if
+        its recorded expiry says it's still valid. margin overrides how much
+        remaining lifetime counts as usable.
+        """
+        with self.lock, self._file_lock():
+            token, expires_at = self._read_cache()
+            # Another process may already have refreshed while we waited for the lock
+            if not token or token == rejected_token or not self._valid(expires_at, margin):
+                token, expires_at = self._request_token()
+                if not token:
+                    return None
+                self._write_cache(token, expires_at)
+            self.token, self.expires_at = token, expires_at
+
+        self._start_refresher()
+        return token
+
+    def get_token(self):
+        """Current valid access token, refreshing if it's missing or about to expire"""
+        if self.token and self._valid(self.expires_at):
+            return self.token
+        return self.refresh()
+
+    def invalidate(self, rejected_token):
+        """Called on a 401 - returns a replacement token (or None)"""
+        with self.lock:
+            # Someone else already replaced it; just use theirs
+            if self.token and self.token != rejected_token and self._valid(self.expires_at):
+                return self.token
+        return self.refresh(rejected_token=rejected_token)
+
+    def _start_refresher(self):
+        if not self.background_refresh or self.refresher is not None:
+            return
+        self.refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+        self.refresher.start()
+
+    def _refresh_loop(self):
+        # Refresh at twice the margin, while get_token still treats the old
+        # token as valid - callers never wait on the token endpoint
+        margin = 2 * self.refresh_margin
+        failures = 0
+        while not self.stop_event.is_set():
+            if failures:
+                # Outage or revoked credentials - don't hammer the token endpoint
+                wait = self.retry_backoff.backoff_delay(failures)
+            else:
+                wait = self.expires_at - margin - time.time()
+            if self.stop_event.wait(max(wait, 1.0)):
+                return
+            if not self._valid(self.expires_at, margin):
+                try:
+                    refreshed = self.refresh(margin=margin) is not None
+                except Exception as e:
+                    refreshed = False
+                    print(f"❌ Background token refresh failed: {str(e)}")
+                failures = 0 if refreshed else failures + 1
+
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,253 @@
+import os
+import uuid
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from feature_columns import AUDIO_FEATURE_COLUMNS
+
+SCHEMAS = {
+    'playlists': pa.schema([
+        ('playlist_id', pa.string()),
+        ('name', pa.string()),
+        ('description', pa.string()),
+        ('owner', pa.string()),
+        ('followers', pa.int64()),
+        ('total_tracks', pa.int32()),
+        ('snapshot_id', pa.string()),
+    ]),
+    'tracks': pa.schema([
+        ('track_id', pa.string()),
+        ('name', pa.string()),
+        ('popularity', pa.int16()),
+        ('duration_ms', pa.int32()),
+        ('explicit', pa.bool_()),
+        ('album_id', pa.string()),
+        ('album_name', pa.string()),
+        ('release_date', pa.string()),
+        ('artist_ids', pa.list_(pa.string())),
+    ]),
+    'albums': pa.schema([
+        ('album_id', pa.string()),
+        ('name', pa.string()),
+        ('album_type', pa.string()),
+        ('release_date', pa.string()),
+        ('total_tracks', pa.int16()),
+        ('artist_ids', pa.list_(pa.string())),
+    ]),
+    # Which track sits at which position of which playlist
+    'playlist_tracks': pa.schema([
+        ('playlist_id', pa.string()),
+        ('track_id', pa.string()),
+        ('position', pa.int32()),
+        ('added_at', pa.string()),
+    ]),
+    'artists': pa.schema([
+        ('artist_id', pa.string()),
+        ('name', pa.string()),
+        ('popularity', pa.int16()),
+        ('followers', pa.int64()),
+        ('genres', pa.list_(pa.string())),
+    ]),
+    'audio_features': pa.schema(
+        [('track_id', pa.string())]
+        + [(column, pa.float32()) for column in AUDIO_FEATURE_COLUMNS]
+        + [('key', pa.int8()), ('mode', pa.int8()), ('time_signature', pa.int8()), ('duration_ms', pa.int32())]
+    ),
+}
+
+# Every table is partitioned the same way on disk:
+#   <table>/category=<id>/collected_date=<YYYY-MM-DD>/part-<uuid>.parquet
+PARTITIONING = ds.partitioning(
+    pa.schema([('category', pa.string()), ('collected_date', pa.string())]),
+    flavor='hive',
+)
+
+
+def playlist_row(playlist):
+    return {
+        'playlist_id': playlist['id'],
+        'name': playlist.get('name'),
+        'description': playlist.get('description'),
+        'owner': (playlist.get('owner') or {}).get('display_name'),
+        'followers': (playlist.get('followers') or {}).get('total'),
+        'total_tracks': (playlist.get('tracks') or {}).get('total'),
+        'snapshot_id': playlist.get('snapshot_id'),
+    }
+
+
+def track_row(track):
+    album = track.get('album') or {}
+    return {
+        'track_id': track['id'],
+        'name': track.get('name'),
+        'popularity': track.get('popularity'),
+        'duration_ms': track.get('duration_ms'),
+        'explicit': track.get('explicit'),
+        'album_id': album.get('id'),
+        'album_name': album.get('name'),
+        'release_date': album.get('release_date'),
+        'artist_ids': [artist['id'] for artist in track.get('artists', []) if artist.get('id')],
+    }
+
+
+def album_row(album):
+    return {
+        'album_id': album['id'],
+        'name': album.get('name'),
+        'album_type': album.get('album_type'),
+        'release_date': album.get('release_date'),
+        'total_tracks': album.get('total_tracks'),
+        'artist_ids': [artist['id'] for artist in album.get('artists', []) if artist.get('id')],
+    }
+
+
+def playlist_track_row(playlist_id, position, entry):
+    return {
+        'playlist_id': playlist_id,
+        'track_id': entry['track']['id'],
+        'position': position,
+        'added_at': entry.get('added_at'),
+    }
+
+
+def artist_row(artist):
+    return {
+        'artist_id': artist['id'],
+        'name': artist.get('name'),
+        'popularity': artist.get('popularity'),
+        'followers': (artist.get('followers') or {}).get('total'),
+        'genres': artist.get('genres', []),
+    }
+
+
+def audio_feature_row(features):
+    row = {'track_id': features['id']}
+    for column in AUDIO_FEATURE_COLUMNS + ['key', 'mode', 'time_signature', 'duration_ms']:
+        row[column] = features.get(column)
+    return row
+
+
+ROW_BUILDERS = {
+    'playlists': playlist_row,
+    'tracks': track_row,
+    'albums': album_row,
+    'artists': artist_row,
+    'audio_features': audio_feature_row,
+}
+
+
+class ColumnarStore:
+    """Typed Parquet store for playlists, tracks, albums, artists and audio features
+
+    Rows are buffered per (table, category, date) partition and written as
+    one Parquet file per batch. Reads go through pyarrow.dataset, so
+    category/date filters prune whole directories and column filters are
+    pushed down to the row groups.
+    """
+
+    def __init__(self, root='data/store', batch_size=5000):
+        self.root = root
+        self.batch_size = batch_size
+        self.buffers = {}
+        # Already-columnar batches (e.g. from normalize.NormalizerPool), per partition
+        self.table_buffers = {}
+
+    def _key(self, table, category, collected_date):
+        return (table, category, collected_date or date.today().isoformat())
+
+    def _buffered(self, key):
+        return len(self.buffers.get(key, ())) + sum(t.num_rows for t in self.table_buffers.get(key, ()))
+
+    def append(self, table, obj, category='uncategorized', collected_date=None):
+        """Buffer one raw API object (track, artist, ...) for the given partition"""
+        self.append_row(table, ROW_BUILDERS[table](obj), category, collected_date)
+
+    def append_row(self, table, row, category='uncategorized', collected_date=None):
+        """Buffer one already-flattened row"""
+        key = self._key(table, category, collected_date)
+        self.buffers.setdefault(key, []).append(row)
+        if self._buffered(key) >= self.batch_size:
+            self._write(key)
+
+    def append_table(self, table, data, category='uncategorized', collected_date=None):
+        """Buffer an Arrow table of rows that already match the table's schema"""
+        if not data.num_rows:
+            return
+        key = self._key(table, category, collected_date)
+        self.table_buffers.setdefault(key, []).append(data)
+        if self._buffered(key) >= self.batch_size:
+            self._write(key)
+
+    def flush(self):
+        """Write every non-empty buffer to disk"""
+        for key in set(self.buffers) | set(self.table_buffers):
+            if self._buffered(key):
+                self._write(key)
+
+    def _write(self, key):
+        table, category, collected_date = key
+        rows = self.buffers.pop(key, [])
+        parts = self.table_buffers.pop(key, [])
+        if rows:
+            parts.insert(0, pa.Table.from_pylist(rows, schema=SCHEMAS[table]))
+        batch = pa.concat_tables(parts) if len(parts) > 1 else parts[0]
+
+        directory = os.path.join(self.root, table, f"category={category}", f"collected_date={collected_date}")
+        os.makedirs(directory, exist_ok=True)
+        pq.write_table(batch, os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet"))
+
+    def schema(self, table):
+        """A table's row schema plus its partition columns, as load() returns it"""
+        return SCHEMAS[table].append(pa.field('category', pa.string())).append(pa.field('collected_date', pa.string()))
+
+    def dataset(self, table):
+        return ds.dataset(
+            os.path.join(self.root, table),
+            schema=self.schema(table),
+            format='parquet',
+            partitioning=PARTITIONING,
+        )
+
+    def load(self, table, columns=None, category=None, since=None, until=None, where=None):
+        """Load a table as an Arrow Table, pruning partitions and pushing filters down
+
+        since/until are ISO dates compared against the collection date.
+        where is any extra pyarrow.dataset expression, e.g. ds.field('popularity') > 70.
+        """
+        expression = where
+        conditions = []
+        if category is not None:
+            categories = [category] if isinstance(category, str) else list(category)
+            conditions.append(ds.field('category').isin(categories))
+        if since is not None:
+            conditions.append(ds.field('collected_date') >= since)
+        if until is not None:
+            conditions.append(ds.field('collected_date') <= until)
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+
+        if not os.path.isdir(os.path.join(self.root, table)):
+            # Nothing written yet - same columns as a load from disk would have
+            schema = self.schema(table)
+            if columns is not None:
+                schema = pa.schema([schema.field(column) for column in columns])
+            return schema.empty_table()
+        return self.dataset(table).to_table(columns=columns, filter=expression)
+
+    def load_audio_features(self, columns=None, **filters):
+        """Return {column: numpy array} for audio features, zero-copy where Arrow allows"""
+        columns = columns or AUDIO_FEATURE_COLUMNS
+        table = self.load('audio_features', columns=['track_id'] + columns, **filters)
+
+        arrays = {'track_id': table.column('track_id').to_numpy()}
+        for column in columns:
+            chunked = table.column(column).combine_chunks()
+            try:
+                arrays[column] = chunked.to_numpy(zero_copy_only=True)
+            except pa.ArrowInvalid:
+                # Nulls (or non-primitive types) force a copy
+                arrays[column] = chunked.to_numpy(zero_copy_only=False)
+        return arrays